@@ -0,0 +1,160 @@
+"""
+Benchmark približnih (ANN) indeksa u odnosu na tačni "flat" indeks.
+
+Za svaku veličinu korpusa meri recall@k prema IndexFlat rezultatima i p50/p99
+latenciju pojedinačnih upita. Vektori su sintetički (mešavina Gausovih
+klastera, normalizovani kao embedding-i modela).
+
+Za kvantizovane kodove (sq8, pq) meri i memoriju indeksa preračunatu na milion
+delova, kao i recall posle ponovnog rangiranja --rerank kandidata po tačnim
+float vektorima (kao RAGService sa RAG_VECTOR_CODEC).
+
+Pokretanje iz src/backend direktorijuma:
+    python benchmarks/ann_benchmark.py --sizes 10000,100000,1000000
+    python benchmarks/ann_benchmark.py --sizes 100000 --index-types flat,hnsw --codecs float,sq8,pq
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rag import index_factory  # noqa: E402
+from rag.vector_store import rerank  # noqa: E402
+
+MB_PER_MILLION = 1e6 / (1024 * 1024)
+
+def synthetic_vectors(n: int, dimension: int, rng: np.random.Generator, clusters: int = 256) -> np.ndarray:
+    """Pravi normalizovane vektore grupisane oko slučajnih centara"""
+    centers = rng.standard_normal((clusters, dimension)).astype("float32")
+    vectors = np.empty((n, dimension), dtype="float32")
+    batch = 100000
+    for start in range(0, n, batch):
+        end = min(start + batch, n)
+        assignment = rng.integers(0, clusters, end - start)
+        vectors[start:end] = centers[assignment] + 0.6 * rng.standard_normal((end - start, dimension)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def measure_latency(index, queries: np.ndarray, k: int):
+    """Pojedinačni upiti (kao u /chat), vraća rezultate i latencije u milisekundama"""
+    latencies = []
+    all_ids = np.empty((len(queries), k), dtype="int64")
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        all_ids[i] = ids[0]
+    return all_ids, np.array(latencies)
+
+def measure_rerank_latency(index, queries: np.ndarray, vectors: np.ndarray, k: int, candidates: int, metric: str):
+    """Kao measure_latency, ali `candidates` kandidata ponovo rangira po tačnim vektorima"""
+    latencies = []
+    all_ids = np.empty((len(queries), k), dtype="int64")
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        _, ids = index.search(query[None, :], max(k, candidates))
+        _, ids = rerank(query[None, :], ids, lambda found: vectors[found], metric)
+        latencies.append((time.perf_counter() - started) * 1000)
+        all_ids[i] = ids[0, :k]
+    return all_ids, np.array(latencies)
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+def run(sizes, index_types, codecs, k, n_queries, dimension, metric, nprobe, ef_search, rerank_candidates, pq_m, seed):
+    rng = np.random.default_rng(seed)
+    faiss.omp_set_num_threads(1)
+    report = []
+    for size in sizes:
+        vectors = synthetic_vectors(size, dimension, rng)
+        queries = synthetic_vectors(n_queries, dimension, rng)
+        flat = index_factory.build_index("flat", dimension, metric)
+        flat.add(vectors)
+        truth, flat_latency = measure_latency(flat, queries, k)
+
+        combinations = [
+            (index_type, codec) for index_type in index_types for codec in codecs
+            # ivf_pq već čuva PQ kodove
+            if not (index_type == "ivf_pq" and codec != "float")
+        ]
+        for index_type, codec in combinations:
+            started = time.perf_counter()
+            if index_type == "flat" and codec == "float":
+                index, found, latency = flat, truth, flat_latency
+                build_seconds = 0.0
+            else:
+                index = index_factory.build_index(index_type, dimension, metric, size, pq_m=pq_m, codec=codec)
+                if not index.is_trained:
+                    index_factory.train_index(index, vectors)
+                index.add(vectors)
+                build_seconds = time.perf_counter() - started
+                index_factory.set_search_params(index, nprobe, ef_search)
+                found, latency = measure_latency(index, queries, k)
+            bytes_per_vector = index_factory.bytes_per_vector(index)
+            row = {
+                "vectors": size,
+                "index_type": index_type,
+                "codec": index_factory.codec_of(index),
+                "build_seconds": round(build_seconds, 2),
+                "bytes_per_vector": round(bytes_per_vector, 1),
+                "mb_per_million": round(bytes_per_vector * MB_PER_MILLION, 1),
+                f"recall@{k}": round(recall_at_k(found, truth), 4),
+                "p50_ms": round(float(np.percentile(latency, 50)), 3),
+                "p99_ms": round(float(np.percentile(latency, 99)), 3),
+            }
+            line = (f"{size:>9} {index_type:<9} {row['codec']:<5} build={row['build_seconds']:>7}s "
+                    f"mem={row['mb_per_million']:>7.1f}MB/M recall@{k}={row[f'recall@{k}']:.4f} "
+                    f"p50={row['p50_ms']:.3f}ms p99={row['p99_ms']:.3f}ms")
+            if row["codec"] != "float" and rerank_candidates:
+                found, latency = measure_rerank_latency(index, queries, vectors, k, rerank_candidates, metric)
+                row[f"rerank@{rerank_candidates}"] = {
+                    f"recall@{k}": round(recall_at_k(found, truth), 4),
+                    "p50_ms": round(float(np.percentile(latency, 50)), 3),
+                    "p99_ms": round(float(np.percentile(latency, 99)), 3),
+                    # Tačni vektori za ponovno rangiranje su u fajlu na disku, ne u memoriji indeksa
+                    "float_store_disk_mb_per_million": round(dimension * 4 * MB_PER_MILLION, 1),
+                }
+                reranked = row[f"rerank@{rerank_candidates}"]
+                line += f" | rerank@{rerank_candidates}: recall@{k}={reranked[f'recall@{k}']:.4f} p50={reranked['p50_ms']:.3f}ms"
+            report.append(row)
+            print(line, flush=True)
+            if index is not flat:
+                del index
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latencija ANN indeksa u odnosu na flat indeks")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Veličine korpusa, odvojene zarezom")
+    parser.add_argument("--index-types", default=",".join(index_factory.INDEX_TYPES))
+    parser.add_argument("--codecs", default="float", help=f"Čuvanje vektora: {','.join(index_factory.CODECS)}")
+    parser.add_argument("--rerank", type=int, default=50, help="Kandidata za ponovno rangiranje (0 isključuje)")
+    parser.add_argument("--pq-m", type=int, default=48, help="Broj PQ podvektora (bajtova po vektoru)")
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--metric", default="cosine", choices=["cosine", "l2"])
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Putanja za JSON izveštaj")
+    args = parser.parse_args()
+
+    report = run(
+        sizes=[int(s) for s in args.sizes.split(",")],
+        index_types=args.index_types.split(","),
+        codecs=args.codecs.split(","),
+        k=args.k, n_queries=args.queries, dimension=args.dimension, metric=args.metric,
+        nprobe=args.nprobe, ef_search=args.ef_search, rerank_candidates=args.rerank,
+        pq_m=args.pq_m, seed=args.seed
+    )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Lažni spoljni servisi za benchmark-e koji pokreću celu aplikaciju u procesu.
+
+FakeSupabase čuva tabele u memoriji i podržava podskup PostgREST upita koji
+backend koristi (insert/select/update/delete, eq, gt, or_, order, limit). StubOllama je HTTP
+server sa /api/chat endpointom koji vraća fiksan odgovor posle zadatog
+kašnjenja, pa merenja ne zavise od brzine modela.
+"""
+import itertools
+import json
+import operator
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+# Operatori PostgREST filtera unutar or=(...)
+_OPERATORS = {"eq": operator.eq, "gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le}
+
+def _split_terms(text: str) -> List[str]:
+    """Deli listu uslova po zarezima van zagrada i navodnika"""
+    terms, current, depth, quoted, escaped = [], "", 0, False, False
+    for char in text:
+        if escaped:
+            escaped = False
+        elif quoted and char == "\\":
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            terms.append(current)
+            current = ""
+            continue
+        current += char
+    terms.append(current)
+    return terms
+
+def _parse_condition(term: str) -> Callable[[Dict[str, Any]], bool]:
+    """Uslov `kolona.op.vrednost`, `and(...)` ili `or(...)` kao test nad redom"""
+    if term.startswith(("and(", "or(")):
+        name, inner = term.split("(", 1)
+        tests = [_parse_condition(part) for part in _split_terms(inner[:-1])]
+        combine = all if name == "and" else any
+        return lambda row: combine(test(row) for test in tests)
+    column, op, value = term.split(".", 2)
+    if value.startswith('"'):
+        value = re.sub(r'\\(.)', r'\1', value[1:-1])
+    compare = _OPERATORS[op]
+
+    def test(row):
+        current = row.get(column)
+        # Vrednosti u filteru su tekst; porede se kao tip kolone
+        return current is not None and compare(current, type(current)(value))
+
+    return test
+
+class FakeSupabase:
+    """
+    Supabase klijent nad tabelama u memoriji (svaki zahtev "traje" `latency` sekundi);
+    zahtev rednog broja `fail_on_request` (od 1) ne uspeva
+    """
+
+    def __init__(self, latency: float = 0.0, fail_on_request: int = 0):
+        self.latency = latency
+        self.fail_on_request = fail_on_request
+        self.requests = 0
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def table(self, name: str):
+        return _FakeQuery(self, name)
+
+    def _execute(self, query) -> SimpleNamespace:
+        with self._lock:
+            self.requests += 1
+            number = self.requests
+        if self.latency:
+            time.sleep(self.latency)
+        if number == self.fail_on_request:
+            raise RuntimeError(f"Simulirana greška zahteva {number}")
+        with self._lock:
+            rows = self.tables.setdefault(query.name, [])
+            matches = [row for row in rows if all(test(row) for test in query.filters)]
+            if query.action == "insert":
+                payload = query.payload if isinstance(query.payload, list) else [query.payload]
+                inserted = [dict(row) for row in payload]
+                for row in inserted:
+                    row.setdefault("id", next(self._ids))
+                rows.extend(inserted)
+                return SimpleNamespace(data=[dict(row) for row in inserted])
+            if query.action == "update":
+                for row in matches:
+                    row.update(query.payload)
+                return SimpleNamespace(data=[dict(row) for row in matches])
+            if query.action == "delete":
+                removed = {id(row) for row in matches}
+                rows[:] = [row for row in rows if id(row) not in removed]
+                if query.name == "documents":
+                    # ON DELETE CASCADE
+                    ids = {row["id"] for row in matches}
+                    pages = self.tables.get("document_pages", [])
+                    pages[:] = [row for row in pages if row.get("document_id") not in ids]
+                return SimpleNamespace(data=[dict(row) for row in matches])
+            for column, desc in reversed(query.ordering):
+                matches.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            if query.row_limit is not None:
+                matches = matches[:query.row_limit]
+            if query.columns and query.columns != "*":
+                names = [c.strip() for c in query.columns.split(",")]
+                return SimpleNamespace(data=[{c: row.get(c) for c in names} for row in matches])
+            return SimpleNamespace(data=[dict(row) for row in matches])
+
+class _FakeQuery:
+    def __init__(self, client: FakeSupabase, name: str):
+        self.client, self.name = client, name
+        self.action, self.payload, self.columns = "select", None, "*"
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.ordering: List[tuple] = []
+        self.row_limit = None
+
+    def select(self, columns: str = "*"):
+        self.action, self.columns = "select", columns
+        return self
+
+    def insert(self, payload):
+        self.action, self.payload = "insert", payload
+        return self
+
+    def update(self, payload):
+        self.action, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) > value)
+        return self
+
+    def or_(self, filters: str):
+        self.filters.append(_parse_condition(f"or({filters})"))
+        return self
+
+    def limit(self, count: int):
+        self.row_limit = count
+        return self
+
+    def order(self, column, desc: bool = False):
+        self.ordering.append((column, desc))
+        return self
+
+    def execute(self):
+        return self.client._execute(self)
+
+class StubOllama:
+    """
+    Lokalni /api/chat server: odgovor od `tokens` reči, prva posle `first_token_ms`
+    (obrada prompta), svaka sledeća posle `token_ms` (generisanje).
+    """
+
+    def __init__(self, tokens: int = 40, first_token_ms: float = 50.0, token_ms: float = 5.0):
+        self.tokens = tokens
+        self.first_token = first_token_ms / 1000.0
+        self.per_token = token_ms / 1000.0
+        self.requests = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-ollama", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubOllama":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _words(self) -> List[str]:
+        return [f"odgovor{i}" if i else "Odgovor" for i in range(self.tokens)]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if self.path != "/api/chat":
+                    self.send_error(404)
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                    stub.prompt_chars += sum(len(m.get("content", "")) for m in request.get("messages", []))
+                words = stub._words()
+                time.sleep(stub.first_token)
+                if not request.get("stream", True):
+                    time.sleep(stub.per_token * max(len(words) - 1, 0))
+                    body = json.dumps({
+                        "model": request.get("model"), "done": True,
+                        "message": {"role": "assistant", "content": " ".join(words)}
+                    }).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, word in enumerate(words):
+                    if i:
+                        time.sleep(stub.per_token)
+                    self._chunk({"message": {"role": "assistant", "content": (" " if i else "") + word}, "done": False})
+                self._chunk({"message": {"role": "assistant", "content": ""}, "done": True})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, payload: Dict[str, Any]):
+                line = json.dumps(payload).encode() + b"\n"
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
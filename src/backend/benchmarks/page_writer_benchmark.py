@@ -0,0 +1,93 @@
+"""
+Benchmark upisa stranica u Supabase preko BulkPageWriter-a.
+
+Koristi lažni klijent koji oponaša PostgREST: broji HTTP zahteve i svaki
+zahtev "traje" zadatu latenciju. Meri broj zahteva i ukupno vreme za
+različite veličine paketa i paralelizam, i proverava da se pri grešci
+jednog paketa roditeljski dokument briše.
+
+Pokretanje iz src/backend direktorijuma:
+    python benchmarks/page_writer_benchmark.py --pages 500 --latency-ms 20
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.fake_services import FakeSupabase  # noqa: E402
+from page_writer import BulkPageWriter  # noqa: E402
+
+def make_documents(pages: int):
+    return [
+        {"content": f"Sadržaj strane {i + 1}", "metadata": {"source": "bench.pdf", "page": i + 1, "type": "pdf"}}
+        for i in range(pages)
+    ]
+
+def run(pages: int, latency: float, batch_sizes, concurrencies):
+    documents = make_documents(pages)
+    report = []
+    configs = [(1, 1)] + [(b, c) for b in batch_sizes for c in concurrencies]
+    for batch_size, concurrency in configs:
+        client = FakeSupabase(latency)
+        client.table("documents").insert({"id": "doc"}).execute()
+        client.requests = 0
+        writer = BulkPageWriter(client, batch_size=batch_size, concurrency=concurrency)
+        started = time.perf_counter()
+        writer.write("doc", documents)
+        seconds = time.perf_counter() - started
+        row = {
+            "pages": pages,
+            "batch_size": batch_size,
+            "concurrency": concurrency,
+            "requests": client.requests,
+            "seconds": round(seconds, 3),
+            "stored_pages": len(client.tables.get("document_pages", [])),
+        }
+        report.append(row)
+        print(f"batch={batch_size:<5} concurrency={concurrency:<3} zahteva={row['requests']:<5} "
+              f"vreme={row['seconds']}s", flush=True)
+    return report
+
+def check_rollback(pages: int, latency: float, batch_size: int, concurrency: int) -> bool:
+    """Greška u drugom paketu mora da ukloni dokument i sve njegove stranice"""
+    client = FakeSupabase(latency)
+    client.table("documents").insert({"id": "doc"}).execute()
+    client.fail_on_request = client.requests + 2
+    writer = BulkPageWriter(client, batch_size=batch_size, concurrency=concurrency)
+    try:
+        writer.write("doc", make_documents(pages))
+    except RuntimeError:
+        pass
+    else:
+        return False
+    return not client.tables["documents"] and not client.tables.get("document_pages")
+
+def main():
+    parser = argparse.ArgumentParser(description="Broj zahteva i vreme upisa stranica po veličini paketa")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Trajanje jednog HTTP zahteva")
+    parser.add_argument("--batch-sizes", default="50,200,500")
+    parser.add_argument("--concurrency", default="1,4")
+    parser.add_argument("--json", help="Putanja za JSON izveštaj")
+    args = parser.parse_args()
+    logging.getLogger("page_writer").setLevel(logging.WARNING)
+
+    latency = args.latency_ms / 1000.0
+    report = run(
+        args.pages, latency,
+        batch_sizes=[int(b) for b in args.batch_sizes.split(",")],
+        concurrencies=[int(c) for c in args.concurrency.split(",")]
+    )
+    rolled_back = check_rollback(args.pages, latency, batch_size=50, concurrency=4)
+    print(f"poništavanje pri grešci paketa: {'OK' if rolled_back else 'NEUSPEŠNO'}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": report, "rollback_ok": rolled_back}, f, indent=2)
+    if not rolled_back:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
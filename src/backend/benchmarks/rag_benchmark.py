@@ -0,0 +1,338 @@
+"""
+Ponovljiv benchmark cele aplikacije: upload, pretraga i chat.
+
+Generiše sintetički korpus PDF/DOCX dokumenata, obrađuje ga kroz
+RAGClient.process_document (Supabase je lažni klijent u memoriji), a zatim
+šalje isti skup upita na /documents/search i /chat preko ASGI transporta.
+LLM je lokalni stub /api/chat server sa fiksnim kašnjenjem, pa rezultat meri
+samo naš kod. Indeks se pravi u privremenom direktorijumu, a isti --seed daje
+isti korpus i iste upite, pa se JSON izveštaji različitih verzija mogu porediti.
+
+Pokretanje iz src/backend direktorijuma:
+    python benchmarks/rag_benchmark.py --pdfs 4 --pages 25 --docx 2 --queries 200 --json run.json
+    python benchmarks/rag_benchmark.py --json novi.json --compare run.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+from benchmarks.fake_services import FakeSupabase, StubOllama  # noqa: E402
+from benchmarks.synthetic_docs import VOCABULARY, write_docx, write_pdf  # noqa: E402
+
+# Metrike koje --compare poredi (putanja u izveštaju, manje je bolje)
+COMPARED = [
+    ("ingest", "seconds"),
+    ("search", "cold", "p50_ms"), ("search", "cold", "p95_ms"), ("search", "cold", "p99_ms"),
+    ("search", "warm", "p50_ms"), ("search", "warm", "p95_ms"), ("search", "warm", "p99_ms"),
+    ("chat", "p50_ms"), ("chat", "p95_ms"), ("chat", "p99_ms"),
+    ("peak_rss_mb", "total"),
+    ("index", "mb_per_million"),
+]
+
+def percentile(values: List[float], p: float) -> float:
+    """Percentil metodom najbližeg ranga"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(p / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+def summarize(latencies: List[float], errors: int = 0) -> Dict[str, Any]:
+    ms = [s * 1000 for s in latencies]
+    return {
+        "requests": len(ms) + errors,
+        "errors": errors,
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "max_ms": round(max(ms), 2) if ms else 0.0,
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else 0.0,
+    }
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Najveći RSS ovog procesa i procesa za parsiranje PDF-a (ru_maxrss je u KB na Linux-u)"""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return {"process": round(own, 1), "children": round(children, 1), "total": round(own + children, 1)}
+
+def index_footprint(rag_service) -> Dict[str, Any]:
+    """Veličina vektorskog indeksa u memoriji, preračunata i na milion delova"""
+    from rag import index_factory
+    index = rag_service.index
+    per_vector = index_factory.bytes_per_vector(index)
+    return {
+        "vectors": int(index.ntotal),
+        "index_type": rag_service.index_type,
+        "codec": rag_service.index_codec,
+        "bytes_per_vector": round(per_vector, 1),
+        "mb_per_million": round(per_vector * 1e6 / (1024 * 1024), 1),
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def make_corpus(directory: str, pdfs: int, pages: int, docx: int, paragraphs: int, seed: int) -> List[str]:
+    paths = []
+    for i in range(pdfs):
+        path = os.path.join(directory, f"prirucnik_{i + 1}.pdf")
+        write_pdf(path, pages, seed=seed + i)
+        paths.append(path)
+    for i in range(docx):
+        path = os.path.join(directory, f"izvestaj_{i + 1}.docx")
+        write_docx(path, paragraphs, seed=seed + pdfs + i)
+        paths.append(path)
+    return paths
+
+def make_queries(count: int, seed: int) -> List[str]:
+    """Upiti od nekoliko reči iz rečnika korpusa; svaki četvrti traži i tačnu šifru greške"""
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(2, 6))]
+        if i % 4 == 0:
+            words.append(f"ERR-{rng.randint(100, 999)}")
+        queries.append(" ".join(words))
+    return queries
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, duration = part.strip().partition(";dur=")
+        if name and duration:
+            stages[name] = float(duration)
+    return stages
+
+async def ingest(rag_client, paths: List[str]) -> Dict[str, Any]:
+    from fastapi import UploadFile
+    documents, pages, chunks, per_file = [], 0, 0, []
+    started = time.perf_counter()
+    for path in paths:
+        file_started = time.perf_counter()
+        with open(path, "rb") as f:
+            result = await rag_client.process_document(UploadFile(file=f, filename=os.path.basename(path)))
+        documents.append(result["document_id"])
+        # Strane sa tekstom (PDF) odnosno 1 za DOCX; delovi za indeks se broje posebno
+        pages += result["pages_processed"]
+        chunks += result["documents_processed"]
+        per_file.append({
+            "file": os.path.basename(path),
+            "pages": result["pages_processed"],
+            "chunks": result["documents_processed"],
+            "seconds": round(time.perf_counter() - file_started, 3),
+        })
+    seconds = time.perf_counter() - started
+    return {
+        "files": len(paths),
+        "pages": pages,
+        "chunks": chunks,
+        "seconds": round(seconds, 3),
+        "pages_per_second": round(pages / seconds, 2) if seconds else 0.0,
+        "chunks_per_second": round(chunks / seconds, 2) if seconds else 0.0,
+        "per_file": per_file,
+        "document_ids": documents,
+    }
+
+async def replay(client, requests: List[Dict[str, Any]], concurrency: int):
+    """Šalje zahteve sa `concurrency` paralelnih klijenata; vraća kašnjenja, greške i faze"""
+    latencies, stages, errors = [], {}, 0
+    pending = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for request in pending:
+            started = time.perf_counter()
+            response = await client.request(**request)
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                errors += 1
+                continue
+            latencies.append(elapsed)
+            for stage, ms in parse_server_timing(response.headers.get("server-timing")).items():
+                stages.setdefault(stage, []).append(ms / 1000.0)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    stage_p50 = {stage: round(percentile(values, 50) * 1000, 2) for stage, values in sorted(stages.items())}
+    return latencies, errors, stage_p50
+
+def search_requests(queries: List[str], document_ids: List[str], k: int, mode: Optional[str],
+                    filter_ratio: float, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    requests = []
+    for query in queries:
+        params: Dict[str, Any] = {"query": query, "k": k}
+        if mode:
+            params["mode"] = mode
+        if document_ids and rng.random() < filter_ratio:
+            params["document_ids"] = [rng.choice(document_ids)]
+        requests.append({"method": "GET", "url": "/documents/search", "params": params})
+    return requests
+
+async def run(args, workdir: str) -> Dict[str, Any]:
+    # Aplikacija se uvozi tek posle podešavanja okruženja (config čita promenljive pri importu)
+    import httpx
+    import config
+    import main
+    from llm_client import llm_client
+    from supabase_client import supabase
+
+    supabase._client = FakeSupabase(latency=args.supabase_latency_ms / 1000.0)
+    stub = StubOllama(args.llm_tokens, args.llm_first_token_ms, args.llm_token_ms).start()
+    llm_client.base_url = stub.url
+
+    corpus_dir = os.path.join(workdir, "corpus")
+    os.makedirs(corpus_dir, exist_ok=True)
+    paths = make_corpus(corpus_dir, args.pdfs, args.pages, args.docx, args.paragraphs, args.seed)
+    queries = make_queries(args.queries, args.seed)
+
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "config": {
+            "retrieval_mode": args.mode or config.RAG_RETRIEVAL_MODE,
+            "metric": config.RAG_METRIC,
+            "vector_codec": config.RAG_VECTOR_CODEC,
+            "chunk_tokens": config.CHUNK_TOKENS,
+            "context_max_tokens": config.RAG_CONTEXT_MAX_TOKENS,
+            "batch_max_size": config.RAG_BATCH_MAX_SIZE,
+        },
+    }
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with main.app.router.lifespan_context(main.app):
+            started = time.perf_counter()
+            await main.rag_client.wait_ready()
+            report["startup_seconds"] = round(time.perf_counter() - started, 3)
+            print(f"RAG spreman za {report['startup_seconds']}s", flush=True)
+
+            report["ingest"] = await ingest(main.rag_client, paths)
+            report["peak_rss_mb_after_ingest"] = peak_rss_mb()
+            print(f"upload: {report['ingest']['pages']} strana ({report['ingest']['chunks']} delova) "
+                  f"za {report['ingest']['seconds']}s ({report['ingest']['pages_per_second']} strana/s, "
+                  f"{report['ingest']['chunks_per_second']} delova/s)", flush=True)
+
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=300.0) as client:
+                requests = search_requests(
+                    queries, report["ingest"]["document_ids"], args.k, args.mode, args.filter_ratio, args.seed
+                )
+                # Prvi prolaz ide mimo keševa, ponovljeni prolazi mere pogodke keša
+                report["search"] = {}
+                for phase, passes in (("cold", 1), ("warm", args.repeats)):
+                    latencies, errors, stages = [], 0, {}
+                    for _ in range(passes):
+                        pass_latencies, pass_errors, stages = await replay(client, requests, args.concurrency)
+                        latencies += pass_latencies
+                        errors += pass_errors
+                    report["search"][phase] = {**summarize(latencies, errors), "stages_p50_ms": stages}
+                    print(f"pretraga ({phase}): {_line(report['search'][phase])}", flush=True)
+
+                chat_requests = [
+                    {"method": "POST", "url": "/chat", "json": {"message": query}}
+                    for query in queries[:args.chat_queries]
+                ]
+                latencies, errors, stages = await replay(client, chat_requests, args.concurrency)
+                report["chat"] = {**summarize(latencies, errors), "stages_p50_ms": stages}
+                print(f"chat: {_line(report['chat'])}", flush=True)
+            report["index"] = index_footprint(main.rag_client.rag_service)
+    finally:
+        stub.stop()
+    report["llm_stub"] = {
+        "requests": stub.requests,
+        "avg_prompt_chars": round(stub.prompt_chars / stub.requests, 1) if stub.requests else 0.0,
+    }
+    report["peak_rss_mb"] = peak_rss_mb()
+    print(f"najveći RSS: {report['peak_rss_mb']['total']} MB", flush=True)
+    return report
+
+def _line(summary: Dict[str, Any]) -> str:
+    return (f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms "
+            f"zahteva={summary['requests']} grešaka={summary['errors']}")
+
+def _lookup(report: Dict[str, Any], path) -> Optional[float]:
+    for key in path:
+        if not isinstance(report, dict) or key not in report:
+            return None
+        report = report[key]
+    return report
+
+def compare(baseline: Dict[str, Any], report: Dict[str, Any]):
+    print(f"\npoređenje sa {baseline.get('commit') or 'prethodnim merenjem'}:")
+    for path in COMPARED:
+        old, new = _lookup(baseline, path), _lookup(report, path)
+        if old is None or new is None:
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"  {'.'.join(path):<22} {old:>10} -> {new:<10} {change}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload, pretraga i chat nad sintetičkim korpusom sa stub LLM-om")
+    parser.add_argument("--pdfs", type=int, default=4, help="Broj PDF dokumenata")
+    parser.add_argument("--pages", type=int, default=25, help="Broj strana po PDF-u")
+    parser.add_argument("--docx", type=int, default=2, help="Broj DOCX dokumenata")
+    parser.add_argument("--paragraphs", type=int, default=80, help="Broj paragrafa po DOCX-u")
+    parser.add_argument("--queries", type=int, default=200, help="Broj upita za /documents/search")
+    parser.add_argument("--chat-queries", type=int, default=50, help="Koliko od tih upita ide i na /chat")
+    parser.add_argument("--repeats", type=int, default=2, help="Ponovljeni prolazi pretrage (topli keš)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Broj paralelnih klijenata")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--mode", choices=["vector", "hybrid"], help="Način pretrage (podrazumevano iz konfiguracije)")
+    parser.add_argument("--filter-ratio", type=float, default=0.25, help="Udeo pretraga ograničenih na jedan dokument")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-tokens", type=int, default=40, help="Dužina stub odgovora u rečima")
+    parser.add_argument("--llm-first-token-ms", type=float, default=50.0)
+    parser.add_argument("--llm-token-ms", type=float, default=5.0)
+    parser.add_argument("--supabase-latency-ms", type=float, default=0.0, help="Trajanje jednog Supabase zahteva")
+    parser.add_argument("--embedding-cache", action="store_true", help="Zadrži trajni keš embedding-a delova")
+    parser.add_argument("--workdir", help="Direktorijum za korpus i indeks (podrazumevano privremeni)")
+    parser.add_argument("--json", help="Putanja za JSON izveštaj")
+    parser.add_argument("--compare", help="JSON izveštaj prethodnog merenja za poređenje")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rag_benchmark_")
+    index_dir = os.path.join(workdir, "rag_index")
+    # Svako merenje počinje od praznog indeksa u standalone procesu
+    shutil.rmtree(index_dir, ignore_errors=True)
+    os.environ["RAG_INDEX_DIR"] = index_dir
+    os.environ["RAG_ROLE"] = "standalone"
+    os.environ["METRICS_TIMING_HEADERS"] = "true"
+    if not args.embedding_cache:
+        os.environ["EMBEDDING_CACHE_DIR"] = ""
+    try:
+        report = asyncio.run(run(args, workdir))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    report["ingest"].pop("document_ids", None)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
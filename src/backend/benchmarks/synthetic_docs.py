@@ -0,0 +1,88 @@
+"""
+Generisanje sintetičkih PDF/DOCX dokumenata za benchmark-e.
+
+PDF se piše direktno (bez dodatnih biblioteka): svaka strana ima jedan
+tekstualni tok sa standardnim Helvetica fontom, što PyPDF2 normalno čita.
+"""
+import random
+from typing import List
+
+VOCABULARY = (
+    "insulin glukoza dijabetes terapija doza pacijent simptom dijagnoza analiza krv pritisak "
+    "srce bubreg jetra lek metformin kontrola ishrana vezba rizik komplikacija studija rezultat "
+    "bilans prihod rashod kapital obaveza imovina izvestaj revizija period kamata kredit "
+    "funkcija klasa modul server zahtev odgovor indeks upit baza podatak model vektor"
+).split()
+
+def make_paragraphs(rng: random.Random, count: int, words: int) -> List[str]:
+    paragraphs = []
+    for _ in range(count):
+        sentence_words = [rng.choice(VOCABULARY) for _ in range(words)]
+        # Povremeno ubacujemo "tačne" termine (šifre, nazive) kao u stvarnim dokumentima
+        if rng.random() < 0.3:
+            sentence_words.insert(rng.randrange(len(sentence_words)), f"ERR-{rng.randint(100, 999)}")
+        paragraphs.append(" ".join(sentence_words).capitalize() + ".")
+    return paragraphs
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _wrap(text: str, width: int = 90) -> List[str]:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + len(word) + 1 > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}".strip()
+    if current:
+        lines.append(current)
+    return lines
+
+def write_pdf(path: str, pages: int, paragraphs_per_page: int = 4, words_per_paragraph: int = 60, seed: int = 0):
+    """Piše PDF sa `pages` strana teksta"""
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages, popunjava se kada znamo strane
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page_number in range(pages):
+        lines = [f"Strana {page_number + 1}"]
+        for paragraph in make_paragraphs(rng, paragraphs_per_page, words_per_paragraph):
+            lines.extend(_wrap(paragraph))
+            lines.append("")
+        text_ops = "".join(f"({_pdf_escape(line)}) '\n" for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td\n{text_ops}ET".encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    with open(path, "wb") as f:
+        f.write(out)
+
+def write_docx(path: str, paragraphs: int, words_per_paragraph: int = 60, seed: int = 0):
+    """Piše DOCX sa `paragraphs` paragrafa"""
+    import docx
+    rng = random.Random(seed)
+    document = docx.Document()
+    for paragraph in make_paragraphs(rng, paragraphs, words_per_paragraph):
+        document.add_paragraph(paragraph)
+    document.save(path)
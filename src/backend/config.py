@@ -0,0 +1,110 @@
+import os
+from dotenv import load_dotenv
+
+# Centralna konfiguracija backend-a (vrednosti se mogu pregaziti kroz .env fajl)
+load_dotenv()
+
+def _int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+def _float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+def _bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+# Mikro-batching upita ka embedding modelu i FAISS indeksu
+RAG_BATCH_MAX_SIZE = _int("RAG_BATCH_MAX_SIZE", 16)
+RAG_BATCH_MAX_WAIT_MS = _float("RAG_BATCH_MAX_WAIT_MS", 5.0)
+
+# Metrika sličnosti i prag skora za nove indekse (postojeći indeks čuva svoja podešavanja)
+RAG_METRIC = os.getenv("RAG_METRIC", "cosine")
+RAG_SCORE_THRESHOLD = _float("RAG_SCORE_THRESHOLD", 0.3)
+
+# Približna (ANN) pretraga: tip indeksa, prag za automatski prelazak sa "flat" i parametri tačnosti
+RAG_ANN_INDEX_TYPE = os.getenv("RAG_ANN_INDEX_TYPE", "hnsw")
+RAG_ANN_PROMOTION_THRESHOLD = _int("RAG_ANN_PROMOTION_THRESHOLD", 50000)
+RAG_NPROBE = _int("RAG_NPROBE", 16)
+RAG_EF_SEARCH = _int("RAG_EF_SEARCH", 64)
+
+# Manji indeks u memoriji: vektori kao "float", "sq8" (1 bajt po dimenziji) ili "pq" (RAG_PQ_M bajtova
+# po vektoru) od RAG_QUANTIZE_THRESHOLD vektora; tačni float vektori su u fajlu na disku i njima se
+# ponovo rangira RAG_RERANK_CANDIDATES najboljih kandidata
+RAG_VECTOR_CODEC = os.getenv("RAG_VECTOR_CODEC", "float")
+RAG_QUANTIZE_THRESHOLD = _int("RAG_QUANTIZE_THRESHOLD", 10000)
+RAG_RERANK_CANDIDATES = _int("RAG_RERANK_CANDIDATES", 50)
+RAG_PQ_M = _int("RAG_PQ_M", 48)
+
+# Veličina WAL-a posle koje se pravi novi snapshot indeksa
+RAG_WAL_SNAPSHOT_BYTES = _int("RAG_WAL_SNAPSHOT_BYTES", 64 * 1024 * 1024)
+
+# Pozadinska obrada upload-ovanih dokumenata
+INGEST_PARSE_WORKERS = _int("INGEST_PARSE_WORKERS", 2)
+INGEST_EMBED_BATCH_SIZE = _int("INGEST_EMBED_BATCH_SIZE", 64)
+INGEST_PDF_WORKERS = _int("INGEST_PDF_WORKERS", min(4, os.cpu_count() or 1))
+
+# Upis stranica dokumenta u Supabase: redova po insert zahtevu i broj paralelnih zahteva
+SUPABASE_PAGE_BATCH_SIZE = _int("SUPABASE_PAGE_BATCH_SIZE", 200)
+SUPABASE_WRITE_CONCURRENCY = _int("SUPABASE_WRITE_CONCURRENCY", 4)
+
+# Listanje poruka i stranica: podrazumevan i najveći broj redova po strani, redova po upitu pri NDJSON izvozu
+API_PAGE_SIZE = _int("API_PAGE_SIZE", 100)
+API_MAX_PAGE_SIZE = _int("API_MAX_PAGE_SIZE", 1000)
+API_EXPORT_BATCH_SIZE = _int("API_EXPORT_BATCH_SIZE", 500)
+
+# Podela teksta na delove za indeks: ciljna veličina i preklapanje u tokenima, minimum slova/cifara
+CHUNK_TOKENS = _int("CHUNK_TOKENS", 200)
+CHUNK_OVERLAP_TOKENS = _int("CHUNK_OVERLAP_TOKENS", 40)
+CHUNK_MIN_CHARS = _int("CHUNK_MIN_CHARS", 20)
+
+# Udeo obrisanih (tombstone) vektora u indeksu posle kog se indeks ponovo gradi u pozadini
+RAG_COMPACT_TOMBSTONE_RATIO = _float("RAG_COMPACT_TOMBSTONE_RATIO", 0.2)
+
+# Keš embedding-a upita i rezultata pretrage (broj unosa i rok trajanja u sekundama)
+RAG_QUERY_CACHE_SIZE = _int("RAG_QUERY_CACHE_SIZE", 2048)
+RAG_RESULT_CACHE_SIZE = _int("RAG_RESULT_CACHE_SIZE", 1024)
+RAG_CACHE_TTL_SECONDS = _float("RAG_CACHE_TTL_SECONDS", 600.0)
+
+# Semantički keš odgovora LLM-a: uključen/isključen, max kosinusna udaljenost pitanja, broj odgovora
+ANSWER_CACHE_ENABLED = _bool("ANSWER_CACHE_ENABLED", False)
+ANSWER_CACHE_MAX_DISTANCE = _float("ANSWER_CACHE_MAX_DISTANCE", 0.05)
+ANSWER_CACHE_SIZE = _int("ANSWER_CACHE_SIZE", 512)
+
+# Trajni keš embedding-a delova dokumenata (prazno isključuje keš)
+EMBEDDING_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR", os.path.join(os.path.dirname(__file__), "data", "embedding_cache")
+)
+
+# Direktorijum FAISS indeksa i baze dokumenata (benchmark ga usmerava u privremeni direktorijum)
+RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", os.path.join(os.path.dirname(__file__), "data", "rag_index"))
+
+# Više worker procesa: "standalone" (jedan proces), "writer" (jedini proces koji menja indeks i
+# promene objavljuje snapshot-om najkasnije RAG_SNAPSHOT_INTERVAL_SECONDS posle njih) ili "reader"
+# (pretražuje memorijski mapiran snapshot writer-a, a upload i brisanje prosleđuje writer-u). Primer: RAG_ROLE=writer uvicorn main:app --port 8002 i
+# RAG_ROLE=reader uvicorn main:app --port 8001 --workers 4
+RAG_ROLE = os.getenv("RAG_ROLE", "standalone")
+RAG_WRITER_URL = os.getenv("RAG_WRITER_URL", "http://localhost:8002")
+RAG_RELOAD_INTERVAL_SECONDS = _float("RAG_RELOAD_INTERVAL_SECONDS", 2.0)
+RAG_SNAPSHOT_INTERVAL_SECONDS = _float("RAG_SNAPSHOT_INTERVAL_SECONDS", 5.0)
+
+# Pretraga konteksta: "hybrid" (vektorska + BM25 spojene sa RRF) ili "vector"; broj kandidata iz
+# svake pretrage, RRF konstanta i udeo dokumenata iznad kog se reč upita smatra previše čestom
+RAG_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid")
+RAG_HYBRID_CANDIDATES = _int("RAG_HYBRID_CANDIDATES", 20)
+RAG_RRF_K = _int("RAG_RRF_K", 60)
+RAG_LEXICAL_MAX_TERM_RATIO = _float("RAG_LEXICAL_MAX_TERM_RATIO", 0.2)
+
+# Budžet konteksta u promptu (tokeni kao pri deljenju teksta) i najmanji deo koji vredi dodati
+RAG_CONTEXT_MAX_TOKENS = _int("RAG_CONTEXT_MAX_TOKENS", 1200)
+RAG_CONTEXT_MIN_PASSAGE_TOKENS = _int("RAG_CONTEXT_MIN_PASSAGE_TOKENS", 20)
+
+# Lokalni LLM (Ollama): koliko dugo model ostaje učitan, istovremena generisanja, red koji čeka na
+# njih (mesta i max sekundi čekanja) i najduže trajanje jednog generisanja
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")
+LLM_MAX_CONCURRENT = _int("LLM_MAX_CONCURRENT", 1)
+LLM_MAX_QUEUE = _int("LLM_MAX_QUEUE", 16)
+LLM_QUEUE_TIMEOUT_SECONDS = _float("LLM_QUEUE_TIMEOUT_SECONDS", 30.0)
+LLM_REQUEST_TIMEOUT_SECONDS = _float("LLM_REQUEST_TIMEOUT_SECONDS", 300.0)
+
+# Server-Timing zaglavlje sa trajanjem faza u odgovoru svakog zahteva (za debug iz browser-a)
+METRICS_TIMING_HEADERS = _bool("METRICS_TIMING_HEADERS", False)
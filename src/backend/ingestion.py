@@ -0,0 +1,283 @@
+import asyncio
+import functools
+import os
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+import numpy as np
+from fastapi import UploadFile
+import metrics
+
+# Konfiguracija logovanja
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Faze obrade dokumenta, redom
+STAGES = ("parse", "chunk", "embed", "persist")
+
+class IngestionJob:
+    """Stanje jednog upload-a koji se obrađuje u pozadini"""
+
+    def __init__(self, filename: str, file_path: str):
+        self.id = str(uuid.uuid4())
+        self.document_id = str(uuid.uuid4())
+        self.filename = filename
+        self.file_path = file_path
+        self.status = "queued"  # queued | processing | processed | failed
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.stages = {
+            stage: {"status": "pending", "done": 0, "total": 0, "seconds": None}
+            for stage in STAGES
+        }
+        # Međurezultati između faza (ne vraćaju se kroz API)
+        self.chunks: asyncio.Queue = asyncio.Queue()
+        # Ceo tekst strana (za Supabase) i delovi na koje su podeljene (za indeks)
+        self.pages: List[Dict[str, Any]] = []
+        self.total_pages = 0
+        self.documents: List[Dict[str, Any]] = []
+        # Delovi čiji sadržaj još nije u indeksu i njihovi embedding-i
+        self.new_documents: List[Dict[str, Any]] = []
+        self.embeddings: Optional[np.ndarray] = None
+        self._stage_started: Dict[str, float] = {}
+
+    def start_stage(self, stage: str, total: int = 0):
+        self.stages[stage].update(status="running", total=total)
+        self._stage_started[stage] = time.perf_counter()
+        self.updated_at = time.time()
+
+    def advance(self, stage: str, count: int = 1):
+        self.stages[stage]["done"] += count
+        self.updated_at = time.time()
+
+    def finish_stage(self, stage: str):
+        state = self.stages[stage]
+        state["status"] = "done"
+        state["done"] = max(state["done"], state["total"])
+        seconds = time.perf_counter() - self._stage_started[stage]
+        state["seconds"] = round(seconds, 3)
+        self.updated_at = time.time()
+        metrics.INGEST_STAGE_SECONDS.observe(seconds, stage=stage)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "document_id": self.document_id,
+            "filename": self.filename,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "stages": self.stages
+        }
+
+class IngestionPipeline:
+    """
+    Pozadinska obrada upload-ovanih dokumenata.
+
+    Svaka faza ima svoj red i svoje worker-e, pa se parsiranje jednog dokumenta
+    preklapa sa embedding-om i čuvanjem prethodnog. Unutar jednog dokumenta
+    embedding počinje čim parsiranje pošalje prvi paket strana.
+    """
+
+    def __init__(self, rag_client, parse_workers: int = 2, embed_batch_size: int = 64,
+                 max_finished_jobs: int = 1000):
+        self.rag_client = rag_client
+        self.parse_workers = max(1, parse_workers)
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        # Parsiranje i Supabase pozivi su blokirajući i idu u poseban pul niti
+        self.executor = ThreadPoolExecutor(max_workers=self.parse_workers + 1, thread_name_prefix="ingest")
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        """Pokreće worker-e svih faza (poziva se pri startovanju aplikacije)"""
+        if self._workers:
+            return
+        self._queues = {"parse": asyncio.Queue(), "embed": asyncio.Queue(), "persist": asyncio.Queue()}
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._worker("parse", self._parse)) for _ in range(self.parse_workers)]
+        # Embedding i upis u indeks su serijski (jedan model, jedan WAL)
+        self._workers.append(loop.create_task(self._worker("embed", self._embed)))
+        self._workers.append(loop.create_task(self._worker("persist", self._persist)))
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.executor.shutdown(wait=False)
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    async def submit(self, file: UploadFile) -> IngestionJob:
+        """Čuva fajl, beleži dokument sa statusom "queued" i stavlja posao u red"""
+        self.start()
+        file_path = os.path.join(self.rag_client.temp_dir, f"{uuid.uuid4()}_{file.filename}")
+        job = IngestionJob(file.filename, file_path)
+        content = await file.read()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._write_file, file_path, content)
+        try:
+            await loop.run_in_executor(
+                self.executor, self.rag_client.create_document_record,
+                job.document_id, job.filename, 0, "queued"
+            )
+        except Exception:
+            self._remove_file(file_path)
+            raise
+        self.jobs[job.id] = job
+        self._prune_jobs()
+        await self._queues["parse"].put(job)
+        logger.info(f"Dokument {job.filename} stavljen u red za obradu (job {job.id})")
+        return job
+
+    @staticmethod
+    def _write_file(path: str, content: bytes):
+        with open(path, "wb") as f:
+            f.write(content)
+
+    @staticmethod
+    def _remove_file(path: str):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _prune_jobs(self):
+        """Zaboravlja najstarije završene poslove kada ih ima previše"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ("processed", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    async def _worker(self, queue_name: str, handler):
+        queue = self._queues[queue_name]
+        while True:
+            job = await queue.get()
+            try:
+                await handler(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await self._fail(job, e)
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def _parse(self, job: IngestionJob):
+        job.status = "processing"
+        await self._run_blocking(self.rag_client.update_document_record, job.document_id, status="processing")
+
+        job.total_pages = await self._run_blocking(self.rag_client.count_pages, job.file_path)
+        job.start_stage("parse", total=job.total_pages)
+        job.start_stage("chunk")
+        # Embedding počinje odmah i troši delove dokumenta kako stižu iz parsiranja
+        await self._queues["embed"].put(job)
+        try:
+            await self._run_blocking(self._stream_chunks, job, asyncio.get_running_loop())
+        finally:
+            self._remove_file(job.file_path)
+        if job.status == "failed":
+            return
+        job.finish_stage("parse")
+        job.finish_stage("chunk")
+
+    def _stream_chunks(self, job: IngestionJob, loop: asyncio.AbstractEventLoop):
+        """Parsira fajl u niti i šalje pakete delova u red posla (None označava kraj)"""
+        def send(item):
+            loop.call_soon_threadsafe(job.chunks.put_nowait, item)
+
+        def on_page(page):
+            job.pages.append(page)
+            job.advance("parse")
+
+        try:
+            batch = []
+            for doc in self.rag_client.iter_document(job.file_path, job.filename, on_page=on_page):
+                if job.status == "failed":
+                    # Embedding je već pao, nema svrhe parsirati ostatak
+                    return
+                job.advance("chunk")
+                if not doc["content"].strip():
+                    continue
+                batch.append(doc)
+                if len(batch) >= self.embed_batch_size:
+                    send(batch)
+                    batch = []
+            if batch:
+                send(batch)
+            send(None)
+        except Exception as e:
+            send(e)
+            raise
+
+    async def _embed(self, job: IngestionJob):
+        # Parsiranje ne zavisi od modela, ali embedding mora da sačeka njegovo učitavanje
+        await self.rag_client.wait_ready()
+        job.start_stage("embed")
+        parts = []
+        # Paket po paket, da bi se pretrage iz /chat izvršavale između njih
+        while True:
+            batch = await job.chunks.get()
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            job.stages["embed"]["total"] += len(batch)
+            for doc in batch:
+                # Delovi u indeksu pamte upload kome pripadaju, radi kasnijeg brisanja
+                doc["metadata"]["document_id"] = job.document_id
+            job.documents.extend(batch)
+            # Sadržaj koji je već u indeksu (npr. ponovljen upload) se ne računa ponovo
+            new_documents = await self._run_blocking(self.rag_client.filter_new_documents, batch)
+            if new_documents:
+                parts.append(await self.rag_client.embed_documents(new_documents))
+                job.new_documents.extend(new_documents)
+            job.advance("embed", len(batch))
+        if not job.documents:
+            raise Exception("Nije moguće izvući tekst iz dokumenta")
+        job.embeddings = np.vstack(parts) if parts else None
+        job.finish_stage("embed")
+        await self._queues["persist"].put(job)
+
+    async def _persist(self, job: IngestionJob):
+        job.start_stage("persist", total=len(job.pages))
+        await self._run_blocking(
+            self.rag_client.save_pages, job.document_id, job.pages,
+            lambda count: job.advance("persist", count)
+        )
+        if job.new_documents:
+            await self.rag_client.index_documents(job.new_documents, job.embeddings)
+        await self._run_blocking(self.rag_client.add_references, job.documents)
+        await self._run_blocking(
+            self.rag_client.update_document_record, job.document_id,
+            status="processed", total_pages=job.total_pages or len(job.pages)
+        )
+        job.finish_stage("persist")
+        job.status = "processed"
+        job.pages, job.documents, job.new_documents, job.embeddings = [], [], [], None
+        logger.info(f"Dokument {job.filename} uspešno obrađen (job {job.id})")
+
+    async def _fail(self, job: IngestionJob, error: Exception):
+        if job.status == "failed":
+            # Greška iz parsiranja stiže i do embedding faze istog posla
+            return
+        logger.error(f"Greška pri obradi dokumenta {job.filename} (job {job.id}): {str(error)}")
+        job.status = "failed"
+        job.error = str(error)
+        job.pages, job.documents, job.new_documents, job.embeddings = [], [], [], None
+        for state in job.stages.values():
+            if state["status"] == "running":
+                state["status"] = "failed"
+        self._remove_file(job.file_path)
+        try:
+            await self._run_blocking(self.rag_client.update_document_record, job.document_id, status="failed")
+        except Exception as e:
+            logger.error(f"Greška pri ažuriranju statusa dokumenta: {str(e)}")
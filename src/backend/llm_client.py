@@ -1,46 +1,134 @@
-import requests
-from typing import List, Dict, Any
+import asyncio
+import httpx
+from typing import List, Dict, Any, AsyncIterator, Optional
 import json
+import config
+from llm_scheduler import GenerationScheduler, LLMOverloadedError
 
 class LLMClient:
-    def __init__(self, base_url: str = "http://localhost:11434"):
+    def __init__(self, base_url: str = "http://localhost:11434",
+                 max_connections: int = 10, max_keepalive_connections: int = 5,
+                 timeout: float = 300.0, keep_alive: Optional[str] = "30m",
+                 scheduler: Optional[GenerationScheduler] = None):
         self.base_url = base_url
         # Podrazumevano koristimo Mistral model
         self.model = "mistral"
-    
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.timeout = timeout
+        # Model ostaje učitan (zajedno sa KV kešom system prompta) između zahteva
+        self.keep_alive = keep_alive
+        self.scheduler = scheduler or GenerationScheduler()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Vraća deljeni async klijent sa pulom keep-alive konekcija ka Ollama servisu"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections
+                ),
+                # Generisanje može da traje dugo, ali konekcija mora brzo da se uspostavi
+                timeout=httpx.Timeout(self.timeout, connect=5.0)
+            )
+        return self._client
+
+    async def close(self):
+        """Zatvara pul konekcija (poziva se pri gašenju aplikacije)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def _build_request(self, prompt: str, system_prompt: str, stream: bool) -> Dict[str, Any]:
+        # System prompt je posebna poruka na početku i isti je u svakom zahtevu, pa Ollama
+        # ponovo koristi njegov KV keš i računa samo korisničku poruku
+        messages: List[Dict[str, str]] = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream
+        }
+        if self.keep_alive:
+            data["keep_alive"] = self.keep_alive
+        return data
+
+    @staticmethod
+    def _wrap_error(e: Exception) -> Exception:
+        """Pretvara grešku transporta u poruku razumljivu korisniku"""
+        if isinstance(e, httpx.ConnectError) or "Connection refused" in str(e):
+            return Exception("Nije moguće povezati se sa Ollama servisom. Proverite da li je Ollama pokrenuta.")
+        return Exception(f"Greška pri komunikaciji sa Ollama: {str(e)}")
+
+    def _timeout_error(self) -> Exception:
+        return Exception(f"Generisanje odgovora je trajalo duže od {self.timeout:g}s")
+
+    def ensure_capacity(self):
+        """Baca LLMOverloadedError ako je red za generisanje pun (pre nego što odgovor počne)"""
+        self.scheduler.ensure_capacity()
+
     async def generate_response(self, prompt: str, system_prompt: str = "") -> str:
         """
         Generiše odgovor koristeći Ollama API.
         """
-        try:
-            # Formatiramo prompt sa system promptom
-            full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
-            
-            # Ollama API endpoint za generisanje
-            url = f"{self.base_url}/api/generate"
-            
-            # Parametri za zahtev
-            data = {
-                "model": self.model,
-                "prompt": full_prompt,
-                "stream": False
-            }
-            
-            # Šaljemo zahtev
-            response = requests.post(url, json=data)
-            response.raise_for_status()
-            
-            # Parsiramo odgovor
-            result = response.json()
-            return result.get("response", "")
-            
-        except requests.exceptions.RequestException as e:
-            error_msg = f"Greška pri komunikaciji sa Ollama: {str(e)}"
-            if "Connection refused" in str(e):
-                error_msg = "Nije moguće povezati se sa Ollama servisom. Proverite da li je Ollama pokrenuta."
-            raise Exception(error_msg)
-        except Exception as e:
-            raise Exception(f"Neočekivana greška: {str(e)}")
+        data = self._build_request(prompt, system_prompt, stream=False)
+        async with self.scheduler.slot():
+            try:
+                # Šaljemo zahtev preko deljenog pula konekcija
+                response = await asyncio.wait_for(
+                    self._get_client().post("/api/chat", json=data), self.timeout
+                )
+                response.raise_for_status()
+
+                # Parsiramo odgovor
+                result = response.json()
+                return result.get("message", {}).get("content", "")
+
+            except asyncio.TimeoutError:
+                raise self._timeout_error()
+            except httpx.HTTPError as e:
+                raise self._wrap_error(e)
+            except Exception as e:
+                raise Exception(f"Neočekivana greška: {str(e)}")
+
+    async def stream_response(self, prompt: str, system_prompt: str = "") -> AsyncIterator[str]:
+        """
+        Generiše odgovor u streaming modu i vraća delove teksta čim ih Ollama pošalje.
+        """
+        data = self._build_request(prompt, system_prompt, stream=True)
+        async with self.scheduler.slot():
+            deadline = asyncio.get_running_loop().time() + self.timeout
+            try:
+                async with self._get_client().stream("POST", "/api/chat", json=data) as response:
+                    response.raise_for_status()
+                    # Ollama šalje po jedan JSON objekat po liniji
+                    async for line in response.aiter_lines():
+                        if asyncio.get_running_loop().time() > deadline:
+                            raise self._timeout_error()
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            raise Exception(f"Greška pri komunikaciji sa Ollama: {chunk['error']}")
+                        token = chunk.get("message", {}).get("content", "")
+                        if token:
+                            yield token
+                        if chunk.get("done"):
+                            break
+            except httpx.HTTPError as e:
+                raise self._wrap_error(e)
 
 # Kreiramo globalnu instancu
-llm_client = LLMClient() 
\ No newline at end of file
+llm_client = LLMClient(
+    timeout=config.LLM_REQUEST_TIMEOUT_SECONDS,
+    keep_alive=config.LLM_KEEP_ALIVE,
+    scheduler=GenerationScheduler(
+        max_concurrent=config.LLM_MAX_CONCURRENT,
+        max_queue=config.LLM_MAX_QUEUE,
+        queue_timeout=config.LLM_QUEUE_TIMEOUT_SECONDS
+    )
+)
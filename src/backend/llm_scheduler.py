@@ -0,0 +1,74 @@
+import asyncio
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class LLMOverloadedError(Exception):
+    """Red za generisanje je pun ili zahtev nije dobio mesto na vreme (API vraća 503)"""
+
+class GenerationScheduler:
+    """
+    Ograničava broj istovremenih generisanja na jednom lokalnom modelu.
+
+    Najviše `max_concurrent` generisanja radi odjednom, a ostali zahtevi čekaju u
+    redu od najviše `max_queue` mesta. Zahtev koji zatekne pun red ili ne dobije
+    mesto za `queue_timeout` sekundi odmah dobija LLMOverloadedError, umesto da
+    pri preopterećenju svi zahtevi čekaju dok ne isteknu.
+    """
+
+    def __init__(self, max_concurrent: int = 1, max_queue: int = 16, queue_timeout: float = 30.0):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self.active = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    def ensure_capacity(self):
+        """Odbija zahtev unapred ako bi morao da čeka, a red je već pun"""
+        if self.active >= self.max_concurrent and self.waiting >= self.max_queue:
+            metrics.LLM_REJECTED.inc(reason="queue_full")
+            raise LLMOverloadedError(
+                f"Model je preopterećen ({self.active} generisanja, {self.waiting} u redu), pokušajte ponovo"
+            )
+
+    def _update_gauges(self):
+        metrics.LLM_QUEUE_DEPTH.set(self.waiting)
+        metrics.LLM_ACTIVE_GENERATIONS.set(self.active)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Čeka (ograničeno) na slobodno mesto i drži ga dok traje generisanje"""
+        self.ensure_capacity()
+        semaphore = self._get_semaphore()
+        started = time.perf_counter()
+        self.waiting += 1
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            metrics.LLM_REJECTED.inc(reason="queue_timeout")
+            raise LLMOverloadedError(
+                f"Zahtev nije dobio mesto za generisanje za {self.queue_timeout:g}s, pokušajte ponovo"
+            )
+        finally:
+            self.waiting -= 1
+            self._update_gauges()
+        metrics.LLM_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - started)
+        self.active += 1
+        self._update_gauges()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            semaphore.release()
+            self._update_gauges()
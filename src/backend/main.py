@@ -1,14 +1,96 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Response, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import os
+import re
+import json
+import httpx
 from dotenv import load_dotenv
 from llm_client import llm_client
+from llm_scheduler import LLMOverloadedError
 from supabase_client import supabase
-from rag_client import RAGClient
+from rag_client import RAGClient, RETRIEVAL_MODES
+from rag.document_store import SearchFilter
+from ingestion import IngestionPipeline
+from pagination import KeysetPager, ndjson
+import config
+import metrics
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Model i indeks se učitavaju u pozadini; API odmah prima zahteve, a /ready javlja kada je RAG spreman
+    if rag_client.role != "reader":
+        ingestion_pipeline.start()
+    rag_client.start(import_seconds=IMPORT_SECONDS)
+    yield
+    # Zatvaramo pul konekcija ka Ollama servisu i writer procesu, ingestion i embedding worker-e
+    await llm_client.close()
+    if writer_client is not None:
+        await writer_client.aclose()
+    await ingestion_pipeline.close()
+    await rag_client.close()
+
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+# Reader proces ne menja indeks: upload, brisanje i status obrade prosleđuje writer procesu
+WRITER_ROUTES = [
+    ("POST", re.compile(r"^/documents/upload$")),
+    ("GET", re.compile(r"^/documents/jobs/[^/]+$")),
+    ("DELETE", re.compile(r"^/documents/[^/]+$")),
+]
+writer_client = (
+    httpx.AsyncClient(base_url=config.RAG_WRITER_URL, timeout=httpx.Timeout(300.0, connect=5.0))
+    if config.RAG_ROLE == "reader" else None
+)
+
+@app.middleware("http")
+async def forward_to_writer(request: Request, call_next):
+    if writer_client is None or not any(
+        request.method == method and pattern.match(request.url.path) for method, pattern in WRITER_ROUTES
+    ):
+        return await call_next(request)
+    headers = {"content-type": request.headers["content-type"]} if "content-type" in request.headers else {}
+    try:
+        response = await writer_client.request(
+            request.method, request.url.path, params=dict(request.query_params),
+            content=await request.body(), headers=headers
+        )
+    except httpx.HTTPError as e:
+        return JSONResponse(status_code=503, content={"detail": f"Writer proces nije dostupan: {str(e)}"})
+    return Response(
+        content=response.content, status_code=response.status_code,
+        media_type=response.headers.get("content-type")
+    )
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    """Broj zahteva u obradi, trajanje po ruti i (opciono) Server-Timing zaglavlje sa fazama zahteva"""
+    trace = metrics.start_trace()
+    metrics.HTTP_REQUESTS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        metrics.HTTP_REQUESTS_IN_FLIGHT.dec()
+        elapsed = time.perf_counter() - started
+        # Šablon rute (npr. /documents/{document_id}), da broj serija ne raste sa id-jevima
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, route=route, status=str(status))
+    if config.METRICS_TIMING_HEADERS:
+        trace["app"] = elapsed
+        response.headers["Server-Timing"] = metrics.server_timing(trace)
+    return response
 
 # Učitavanje environment promenljivih
 load_dotenv()
@@ -20,17 +102,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Kursor sledeće strane listanja poruka i stranica dokumenta
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Inicijalizacija RAG klijenta
 rag_client = RAGClient()
 
+# Pozadinska obrada upload-ovanih dokumenata
+ingestion_pipeline = IngestionPipeline(
+    rag_client,
+    parse_workers=config.INGEST_PARSE_WORKERS,
+    embed_batch_size=config.INGEST_EMBED_BATCH_SIZE
+)
+
 class ChatMessage(BaseModel):
     message: str
+    # Opciono: odgovor samo iz ovih dokumenata, tipova fajla i opsega strana
+    document_ids: Optional[List[str]] = None
+    file_types: Optional[List[str]] = None
+    page_from: Optional[int] = None
+    page_to: Optional[int] = None
+
+    def search_filter(self) -> SearchFilter:
+        return _search_filter(self.document_ids, self.file_types, self.page_from, self.page_to)
+
+def _search_filter(document_ids: Optional[List[str]], file_types: Optional[List[str]],
+                   page_from: Optional[int], page_to: Optional[int]) -> SearchFilter:
+    """Filter pretrage iz parametara zahteva; prevelik filter je greška klijenta (400)"""
+    try:
+        return SearchFilter(document_ids, file_types, page_from, page_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 class ChatResponse(BaseModel):
     response: str
     sources: Optional[List[Dict[str, Any]]] = None
+    # Broj tokena konteksta iz dokumenata u promptu
+    context_tokens: Optional[int] = None
 
 class MessageIn(BaseModel):
     content: str
@@ -51,6 +160,12 @@ class Document(BaseModel):
     status: str
     created_at: Optional[str] = None
 
+def _require_rag():
+    """Odbija zahtev dok se model i indeks još učitavaju"""
+    if not rag_client.ready:
+        raise HTTPException(status_code=503, detail="RAG servis se još učitava" if rag_client.status != "failed"
+                            else f"RAG servis nije dostupan: {rag_client.error}")
+
 @app.get("/")
 def read_root():
     return {"message": "ACAI Assistant backend radi!"}
@@ -59,18 +174,70 @@ def read_root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Spremnost za pretragu i chat (model i indeks učitani), sa trajanjem koraka pri startovanju"""
+    state = rag_client.startup_state()
+    if not rag_client.ready:
+        return JSONResponse(status_code=503, content=state)
+    return state
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Metrike u Prometheus formatu"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/cache")
+async def get_cache_stats():
+    """Pogoci, promašaji i popunjenost keševa upita i rezultata pretrage"""
+    return rag_client.cache_stats()
+
 @app.get("/users")
 def get_users():
     response = supabase.table("users").select("*").execute()
     return response.data
 
-@app.get("/messages", response_model=List[MessageOut])
-def get_messages():
+# Keyset paginacija: poruke po vremenu (pa po id-ju za isto vreme), stranice dokumenta po broju strane
+message_pager = KeysetPager(
+    supabase, "messages", key="timestamp", columns=("id", "content", "sender", "timestamp"), tiebreak="id"
+)
+page_pager = KeysetPager(
+    supabase, "document_pages", key="page_number",
+    columns=("id", "document_id", "page_number", "content", "metadata"), always=("id",)
+)
+
+def _paginated(pager: KeysetPager, filters: Dict[str, Any], after: Optional[Any], limit: int,
+               fields: Optional[str], format: str) -> Response:
+    """
+    Jedna strana kao JSON lista (kursor sledeće strane je u X-Next-Cursor zaglavlju)
+    ili, za format=ndjson, svi redovi posle `after` kao tok linija
+    """
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail=f"Nepodržan format: {format}")
     try:
-        response = supabase.table("messages").select("*").order("timestamp", desc=False).execute()
-        return response.data
+        pager.select(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format == "ndjson":
+        rows = pager.iter_rows(filters, after, config.API_EXPORT_BATCH_SIZE, fields)
+        return StreamingResponse(ndjson(rows), media_type="application/x-ndjson")
+    try:
+        rows, cursor = pager.page(filters, after, limit, fields)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    headers = {"X-Next-Cursor": str(cursor)} if cursor is not None else {}
+    return JSONResponse(content=jsonable_encoder(rows), headers=headers)
+
+@app.get("/messages", response_model=List[MessageOut])
+def get_messages(after: Optional[str] = None,
+                 limit: int = Query(config.API_PAGE_SIZE, ge=1, le=config.API_MAX_PAGE_SIZE),
+                 fields: Optional[str] = None, format: str = "json"):
+    """
+    Poruke hronološki, stranu po stranu: `after` je X-Next-Cursor prethodne strane (timestamp
+    i id poslednje poruke), `fields` bira kolone (npr. "sender,timestamp" bez sadržaja), a
+    format=ndjson vraća sve poruke posle `after` kao tok.
+    """
+    return _paginated(message_pager, {}, after, limit, fields, format)
 
 @app.post("/messages", response_model=MessageOut)
 def save_message(message: MessageIn):
@@ -84,11 +251,8 @@ def save_message(message: MessageIn):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(message: ChatMessage):
-    try:
-        # Sistem prompt koji definiše ponašanje asistenta
-        system_prompt = """Ti si ACAI (Advanced Coding AI) Assistant, napredni AI asistent za programiranje.
+# Sistem prompt koji definiše ponašanje asistenta
+SYSTEM_PROMPT = """Ti si ACAI (Advanced Coding AI) Assistant, napredni AI asistent za programiranje.
         
         VAŽNO - DOKUMENT MODE:
         1. Koristi informacije iz dostavljenog konteksta kao primarni izvor za svoje odgovore.
@@ -104,43 +268,129 @@ async def chat(message: ChatMessage):
         - Budi precizan i koncizan
         - Citiraj tačne delove iz dokumenta kada je to relevantno
         - Ako je potrebno više informacija, traži da se uploaduje dodatna dokumentacija"""
-        
-        # Dobavljanje relevantnog konteksta iz RAG sistema
-        rag_result = rag_client.get_context_for_query(message.message)
-        context = rag_result["context"]
-        sources = rag_result["sources"]
-        
-        # Dodavanje konteksta u prompt ako postoji
+
+async def build_chat_prompt(user_message: str, search_filter: Optional[SearchFilter] = None) -> Dict[str, Any]:
+    """Dobavlja kontekst iz RAG sistema i sastavlja prompt za LLM"""
+    # Dobavljanje relevantnog konteksta iz RAG sistema
+    with metrics.timed(metrics.CHAT_STAGE_SECONDS, "retrieval"):
+        rag_result = await rag_client.get_context_for_query(user_message, search_filter=search_filter)
+    context = rag_result["context"]
+    sources = rag_result["sources"]
+    
+    # Dodavanje konteksta u prompt ako postoji
+    with metrics.timed(metrics.CHAT_STAGE_SECONDS, "prompt"):
         if context:
             enhanced_prompt = f"""DOKUMENT MODE - Koristi sledeći kontekst iz dokumenta kao primarni izvor:
-            {context}
-            
-            Korisničko pitanje: {message.message}
-            
-            VAŽNO: 
-            - Koristi gore navedeni kontekst kao primarni izvor informacija
-            - Ako informacija nije u kontekstu, kaži "Ova informacija nije dostupna u dokumentu"
-            - Možeš koristiti svoje znanje za objašnjavanje i povezivanje informacija iz dokumenta"""
+        {context}
+        
+        Korisničko pitanje: {user_message}
+        
+        VAŽNO: 
+        - Koristi gore navedeni kontekst kao primarni izvor informacija
+        - Ako informacija nije u kontekstu, kaži "Ova informacija nije dostupna u dokumentu"
+        - Možeš koristiti svoje znanje za objašnjavanje i povezivanje informacija iz dokumenta"""
         else:
             enhanced_prompt = f"""DOKUMENT MODE - Nema dostupnog konteksta iz dokumenta.
-            
-            Korisničko pitanje: {message.message}
-            
-            VAŽNO: 
-            - Pošto nema dostupnog konteksta, možeš dati opšti odgovor
-            - Jasno naznači da nema specifičnih informacija iz dokumenta
-            - Fokusiraj se na praktične savete i primere"""
+        
+        Korisničko pitanje: {user_message}
+        
+        VAŽNO: 
+        - Pošto nema dostupnog konteksta, možeš dati opšti odgovor
+        - Jasno naznači da nema specifičnih informacija iz dokumenta
+        - Fokusiraj se na praktične savete i primere"""
+    
+    return {"prompt": enhanced_prompt, "sources": sources, "rag_result": rag_result}
+
+def _overloaded(e: LLMOverloadedError) -> HTTPException:
+    """Preopterećen model: klijent treba da pokuša ponovo malo kasnije"""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(message: ChatMessage):
+    _require_rag()
+    search_filter = message.search_filter()
+    started = time.perf_counter()
+    try:
+        chat_prompt = await build_chat_prompt(message.message, search_filter)
+        
+        # Slično pitanje sa istim izvorima je već odgovoreno
+        with metrics.timed(metrics.CHAT_STAGE_SECONDS, "answer_cache"):
+            cached = await rag_client.lookup_answer(message.message, chat_prompt["rag_result"])
+        if cached is not None:
+            return ChatResponse(response=cached, sources=chat_prompt["sources"],
+                                context_tokens=chat_prompt["rag_result"]["context_tokens"])
         
         # Generisanje odgovora preko Ollama
-        response = await llm_client.generate_response(
-            prompt=enhanced_prompt,
-            system_prompt=system_prompt
-        )
+        with metrics.timed(metrics.CHAT_STAGE_SECONDS, "llm"):
+            response = await llm_client.generate_response(
+                prompt=chat_prompt["prompt"],
+                system_prompt=SYSTEM_PROMPT
+            )
+        await rag_client.remember_answer(message.message, chat_prompt["rag_result"], response)
         
-        return ChatResponse(response=response, sources=sources)
+        return ChatResponse(response=response, sources=chat_prompt["sources"],
+                            context_tokens=chat_prompt["rag_result"]["context_tokens"])
         
+    except LLMOverloadedError as e:
+        raise _overloaded(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        metrics.record_stage(metrics.CHAT_STAGE_SECONDS, "total", time.perf_counter() - started)
+
+def _sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Formatira jedan Server-Sent Events zapis"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """Streaming varijanta /chat endpointa (Server-Sent Events)"""
+    _require_rag()
+    search_filter = message.search_filter()
+    try:
+        chat_prompt = await build_chat_prompt(message.message, search_filter)
+        with metrics.timed(metrics.CHAT_STAGE_SECONDS, "answer_cache"):
+            cached = await rag_client.lookup_answer(message.message, chat_prompt["rag_result"])
+        if cached is None:
+            # Pun red odbijamo pre početka stream-a, dok još može da se vrati status 503
+            llm_client.ensure_capacity()
+    except LLMOverloadedError as e:
+        raise _overloaded(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream():
+        # Izvore šaljemo odmah, pre prvog tokena
+        yield _sse_event({"sources": chat_prompt["sources"],
+                          "context_tokens": chat_prompt["rag_result"]["context_tokens"]}, event="sources")
+        if cached is not None:
+            yield _sse_event({"token": cached})
+            yield _sse_event({}, event="done")
+            return
+        try:
+            tokens = []
+            generation_started = time.perf_counter()
+            async for token in llm_client.stream_response(
+                prompt=chat_prompt["prompt"],
+                system_prompt=SYSTEM_PROMPT
+            ):
+                if not tokens:
+                    metrics.record_stage(metrics.CHAT_STAGE_SECONDS, "llm_first_token",
+                                         time.perf_counter() - generation_started)
+                tokens.append(token)
+                yield _sse_event({"token": token})
+            metrics.record_stage(metrics.CHAT_STAGE_SECONDS, "llm", time.perf_counter() - generation_started)
+            yield _sse_event({}, event="done")
+            await rag_client.remember_answer(message.message, chat_prompt["rag_result"], "".join(tokens))
+        except Exception as e:
+            yield _sse_event({"detail": str(e)}, event="error")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/documents", response_model=List[Document])
 async def get_documents():
@@ -152,39 +402,69 @@ async def get_documents():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/documents/{document_id}/pages")
-async def get_document_pages(document_id: str):
-    """Endpoint za dohvatanje stranica dokumenta"""
-    try:
-        response = supabase.table("document_pages").select("*").eq("document_id", document_id).order("page_number").execute()
-        return response.data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def get_document_pages(document_id: str, after: Optional[int] = None,
+                       limit: int = Query(config.API_PAGE_SIZE, ge=1, le=config.API_MAX_PAGE_SIZE),
+                       fields: Optional[str] = None, format: str = "json"):
+    """
+    Endpoint za dohvatanje stranica dokumenta, stranu po stranu: `after` je broj poslednje
+    pročitane strane (X-Next-Cursor), `fields` bira kolone, a format=ndjson izvozi sve strane kao tok.
+    """
+    return _paginated(page_pager, {"document_id": document_id}, after, limit, fields, format)
 
-@app.post("/documents/upload")
+@app.post("/documents/upload", status_code=202)
 async def upload_document(file: UploadFile = File(...)):
-    """Endpoint za upload dokumenata"""
+    """Endpoint za upload dokumenata; obrada se nastavlja u pozadini"""
     try:
-        result = await rag_client.process_document(file)
-        return result
+        job = await ingestion_pipeline.submit(file)
+        return {
+            "status": job.status,
+            "message": f"Dokument {file.filename} je primljen i čeka obradu",
+            "job_id": job.id,
+            "document_id": job.document_id
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/documents/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    """Endpoint za praćenje obrade upload-ovanog dokumenta po fazama"""
+    job = ingestion_pipeline.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Posao nije pronađen")
+    return job.to_dict()
+
 @app.get("/documents/search")
-async def search_documents(query: str, k: int = 3):
-    """Endpoint za pretragu dokumenata"""
+async def search_documents(query: str, k: int = 3, mode: Optional[str] = None,
+                           document_ids: Optional[List[str]] = Query(None),
+                           file_types: Optional[List[str]] = Query(None),
+                           page_from: Optional[int] = None, page_to: Optional[int] = None):
+    """
+    Endpoint za pretragu dokumenata (mode: "vector" ili "hybrid", podrazumevano iz konfiguracije).
+
+    Pretraga se može ograničiti na dokumente (?document_ids=a&document_ids=b), tipove fajla i opseg strana.
+    """
+    _require_rag()
+    if mode is not None and mode not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"Nepodržan način pretrage: {mode}")
+    search_filter = _search_filter(document_ids, file_types, page_from, page_to)
     try:
-        results = rag_client.search_documents(query, k)
+        results = await rag_client.search_documents(query, k, mode=mode, search_filter=search_filter)
         return {"results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/documents/{document_id}")
 async def delete_document(document_id: str):
-    """Endpoint za brisanje dokumenta"""
+    """Endpoint za brisanje dokumenta iz Supabase-a i iz RAG indeksa"""
+    _require_rag()
     try:
-        # Prvo brišemo stranice dokumenta (cascade delete će se izvršiti automatski)
-        response = supabase.table("documents").delete().eq("id", document_id).execute()
-        return {"status": "success", "message": "Dokument uspešno obrisan"}
+        found = supabase.table("documents").select("filename").eq("id", document_id).execute()
+        filename = found.data[0]["filename"] if found.data else None
+        # Brišemo dokument (cascade delete će obrisati i njegove stranice)
+        supabase.table("documents").delete().eq("id", document_id).execute()
+        # Delovi dokumenta odmah nestaju iz pretrage; vektori se uklanjaju pri kompakciji
+        removed = await rag_client.remove_document(document_id, filename)
+        return {"status": "success", "message": "Dokument uspešno obrisan", "chunks_removed": removed}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
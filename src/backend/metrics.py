@@ -0,0 +1,249 @@
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Sequence, Union
+
+# Minimalni registar metrika koji se izlaže u Prometheus tekstualnom formatu
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        body = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        return "{" + body + "}"
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._format_labels(key)} {_num(value)}" for key, value in items]
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+class FunctionGauge(_Metric):
+    """Gauge čija se vrednost računa tek pri čitanju metrika (npr. veličina indeksa)"""
+    metric_type = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._function: Optional[Callable[[], Union[float, Dict[Tuple[str, ...], float]]]] = None
+
+    def set_function(self, function: Callable[[], Union[float, Dict[Tuple[str, ...], float]]]):
+        """Bez labela funkcija vraća broj, sa labelama rečnik {vrednosti labela: broj}"""
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is None:
+            return []
+        try:
+            values = self._function()
+        except Exception:
+            # Izvor još nije spreman (npr. indeks se učitava)
+            return []
+        if not self.labelnames:
+            values = {(): values}
+        return [f"{self.name}{self._format_labels(key)} {_num(value)}" for key, value in values.items()]
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # ključ -> [brojači po bucket-ima, suma, ukupan broj]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = [(key, (list(s[0]), s[1], s[2])) for key, s in self._values.items()]
+        for key, (counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': _num(bound)})} {bucket_count}")
+            lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_num(total)}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metrika {metric.name} je već registrovana")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Vraća sve metrike u Prometheus tekstualnom formatu"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _num(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+REGISTRY = Registry()
+
+# Trajanja faza tekućeg HTTP zahteva (za Server-Timing zaglavlje); postavlja ih middleware
+_request_trace: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_trace", default=None)
+
+def start_trace() -> Dict[str, float]:
+    trace: Dict[str, float] = {}
+    _request_trace.set(trace)
+    return trace
+
+@contextmanager
+def timed(histogram: Histogram, stage: str, **labels) -> Iterator[None]:
+    """Meri blok koda kao fazu `stage`: u histogram i u trace tekućeg zahteva"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(histogram, stage, time.perf_counter() - started, **labels)
+
+def record_stage(histogram: Histogram, stage: str, seconds: float, **labels):
+    histogram.observe(seconds, stage=stage, **labels)
+    trace = _request_trace.get()
+    if trace is not None:
+        trace[stage] = trace.get(stage, 0.0) + seconds
+
+def server_timing(trace: Dict[str, float]) -> str:
+    """Vrednost Server-Timing zaglavlja (trajanja u milisekundama)"""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in trace.items())
+
+# Metrike za mikro-batching embedding upita
+EMBEDDING_BATCH_SIZE = Histogram(
+    "rag_embedding_batch_size", "Broj upita obrađenih u jednom model.encode/index.search pozivu",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+EMBEDDING_BATCH_SECONDS = Histogram(
+    "rag_embedding_batch_seconds", "Trajanje jednog batch-a (encode + pretraga)"
+)
+EMBEDDING_QUEUE_WAIT_SECONDS = Histogram(
+    "rag_embedding_queue_wait_seconds", "Vreme koje upit provede čekajući na batch",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+# Keševi embedding-a upita i rezultata pretrage
+CACHE_LOOKUPS = Counter(
+    "rag_cache_lookups_total", "Broj pretraga keša po kešu i ishodu (hit/miss)",
+    labelnames=("cache", "result")
+)
+CACHE_ENTRIES = Gauge(
+    "rag_cache_entries", "Trenutni broj unosa u kešu", labelnames=("cache",)
+)
+
+# Red i ograničenje istovremenih generisanja na lokalnom LLM-u
+LLM_QUEUE_DEPTH = Gauge(
+    "llm_queue_depth", "Broj zahteva koji čekaju slobodno mesto za generisanje"
+)
+LLM_ACTIVE_GENERATIONS = Gauge(
+    "llm_active_generations", "Broj generisanja koja su trenutno u toku"
+)
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "llm_queue_wait_seconds", "Vreme koje zahtev provede u redu pre početka generisanja"
+)
+LLM_REJECTED = Counter(
+    "llm_rejected_total", "Zahtevi odbijeni zbog preopterećenja, po razlogu (queue_full/queue_timeout)",
+    labelnames=("reason",)
+)
+
+# HTTP zahtevi: trajanje po ruti i broj zahteva u obradi
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "Trajanje HTTP zahteva do početka odgovora",
+    labelnames=("method", "route", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Broj HTTP zahteva koji se trenutno obrađuju"
+)
+
+# Faze /chat zahteva (retrieval, answer_cache, prompt, llm, llm_first_token, total)
+CHAT_STAGE_SECONDS = Histogram(
+    "chat_stage_seconds", "Trajanje faza obrade chat zahteva", labelnames=("stage",)
+)
+# Faze pretrage u RAG servisu, po batch-u (query_embedding, vector_search, lexical_search, context_build)
+RAG_STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "Trajanje faza pretrage RAG indeksa", labelnames=("stage",)
+)
+
+# Obrada dokumenata: faze (ingestion i process_document) i parsiranje po tipu fajla
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_seconds", "Trajanje faza obrade upload-ovanog dokumenta", labelnames=("stage",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+DOCUMENT_PARSE_SECONDS = Histogram(
+    "document_parse_seconds", "Trajanje izvlačenja teksta i deljenja na delove, po tipu fajla",
+    labelnames=("file_type",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+DOCUMENT_CHUNKS = Counter(
+    "document_chunks_total", "Broj delova izvučenih iz dokumenata, po tipu fajla", labelnames=("file_type",)
+)
+
+# Stanje RAG indeksa i keševa (računa se pri čitanju metrika)
+RAG_INDEX_VECTORS = FunctionGauge("rag_index_vectors", "Broj vektora u FAISS indeksu (sa tombstone-ima)")
+RAG_INDEX_TOMBSTONES = FunctionGauge("rag_index_tombstones", "Broj vektora obrisanih dokumenata u indeksu")
+RAG_DOCUMENTS = FunctionGauge("rag_documents", "Broj neobrisanih delova dokumenata u indeksu")
+CACHE_HIT_RATIO = FunctionGauge(
+    "rag_cache_hit_ratio", "Udeo pogodaka od pokretanja, po kešu", labelnames=("cache",)
+)
@@ -0,0 +1,22 @@
+from rag.document_store import DocumentStore
+import os
+import sys
+
+def migrate(index_path: str):
+    json_path = os.path.join(index_path, "documents.json")
+    db_path = os.path.join(index_path, "documents.db")
+
+    if not os.path.exists(json_path):
+        print(f"Nema {json_path}, migracija nije potrebna.")
+        return
+    if os.path.exists(db_path):
+        print(f"{db_path} već postoji, migracija je već urađena.")
+        return
+
+    store = DocumentStore.migrate_from_json(json_path, db_path)
+    print(f"Migrirano {len(store)} dokumenata u {db_path}")
+    store.close()
+
+if __name__ == "__main__":
+    # Podrazumevano migriramo indeks backend-a
+    migrate(sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "rag_index"))
@@ -0,0 +1,79 @@
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from typing import List, Dict, Any, Optional, Callable
+
+# Konfiguracija logovanja
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class BulkPageWriter:
+    """
+    Upisuje stranice dokumenta u `document_pages` u paketima.
+
+    Jedan paket od `batch_size` redova je jedan insert zahtev; najviše
+    `concurrency` paketa je u toku istovremeno. Ako bilo koji paket ne uspe,
+    briše se roditeljski red u `documents` (ON DELETE CASCADE uklanja i već
+    upisane stranice), pa u bazi ne ostaje poluupisan dokument.
+    """
+
+    def __init__(self, client, batch_size: int = 200, concurrency: int = 4):
+        self.client = client
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+
+    @staticmethod
+    def page_rows(document_id: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Redovi za `document_pages`; broj strane je metadata["page"] (DOCX nema strane, pa je redni broj)"""
+        return [
+            {
+                "id": str(uuid.uuid4()),
+                "document_id": document_id,
+                "page_number": doc["metadata"].get("page", i + 1),
+                "content": doc["content"],
+                "metadata": doc["metadata"]
+            }
+            for i, doc in enumerate(documents)
+        ]
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        self.client.table("document_pages").insert(rows).execute()
+
+    def write(self, document_id: str, documents: List[Dict[str, Any]],
+              on_progress: Optional[Callable[[int], None]] = None):
+        """Upisuje sve stranice (blokirajuće); pri grešci poništava dokument i prosleđuje grešku"""
+        rows = self.page_rows(document_id, documents)
+        batches = [rows[start:start + self.batch_size] for start in range(0, len(rows), self.batch_size)]
+        if not batches:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches)),
+                                thread_name_prefix="page-writer") as pool:
+            futures = {pool.submit(self._insert, batch): len(batch) for batch in batches}
+            pending = set(futures)
+            error = None
+            while pending and error is None:
+                done, pending = wait(pending, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                    elif on_progress:
+                        on_progress(futures[future])
+            if error is not None:
+                # Paketi koji još nisu krenuli se ne šalju; oni u toku se čekaju pre brisanja
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+
+        if error is not None:
+            logger.error(f"Greška pri upisu stranica dokumenta {document_id}: {str(error)}")
+            self.rollback(document_id)
+            raise error
+        logger.info(f"Upisano {len(rows)} stranica u {len(batches)} zahteva (dokument {document_id})")
+
+    def rollback(self, document_id: str):
+        try:
+            self.client.table("documents").delete().eq("id", document_id).execute()
+            logger.info(f"Dokument {document_id} uklonjen posle neuspelog upisa stranica")
+        except Exception as e:
+            logger.error(f"Greška pri poništavanju dokumenta {document_id}: {str(e)}")
@@ -0,0 +1,95 @@
+import json
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Razdvaja vrednost `key` kolone i `tiebreak` kolone u kursoru
+CURSOR_SEPARATOR = ","
+
+def _quote(value: Any) -> str:
+    """Vrednost u PostgREST or=(...) filteru (navodnici zbog rezervisanih znakova ,.:() u vremenu)"""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+class KeysetPager:
+    """
+    Keyset paginacija nad jednom Supabase tabelom.
+
+    Redovi su sortirani po `key` koloni, a kursor je vrednost te kolone u
+    poslednjem vraćenom redu: sledeća strana je `key > after`, pa svaki upit
+    koristi indeks i ne zavisi od toga koliko je redova već pročitano (za
+    razliku od offset paginacije). Kada `key` nije jedinstven (npr. vreme
+    poruke), `tiebreak` kolona razrešava jednake vrednosti: redovi su sortirani
+    po (key, tiebreak), kursor je "key,tiebreak", a sledeća strana je
+    `key > t OR (key = t AND tiebreak > id)`, pa se redovi sa istim `key` na
+    granici strane ne preskaču. `columns` su kolone koje klijent sme da traži;
+    `key`, `tiebreak` i `always` kolone se vraćaju uvek.
+    """
+
+    def __init__(self, client, table: str, key: str, columns: Sequence[str], always: Sequence[str] = (),
+                 tiebreak: Optional[str] = None):
+        self.client = client
+        self.table = table
+        self.key = key
+        self.tiebreak = tiebreak
+        self.columns = tuple(columns)
+        self.always = tuple(dict.fromkeys((key, *((tiebreak,) if tiebreak else ()), *always)))
+
+    def select(self, fields: Optional[str]) -> str:
+        """Lista kolona za select; baca ValueError za nepoznatu kolonu"""
+        if not fields:
+            return ",".join(self.columns)
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in requested if name not in self.columns]
+        if unknown:
+            raise ValueError(f"Nepoznate kolone: {', '.join(unknown)} (dozvoljene: {', '.join(self.columns)})")
+        return ",".join(dict.fromkeys((*self.always, *requested)))
+
+    def cursor(self, row: Dict[str, Any]) -> Any:
+        """Kursor posle datog reda"""
+        if self.tiebreak is None:
+            return row[self.key]
+        return f"{row[self.key]}{CURSOR_SEPARATOR}{row[self.tiebreak]}"
+
+    def _query(self, select: str, filters: Dict[str, Any], after: Optional[Any], limit: int):
+        query = self.client.table(self.table).select(select)
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        if after is not None:
+            value, separator, last_id = str(after).rpartition(CURSOR_SEPARATOR)
+            if self.tiebreak is not None and separator:
+                query = query.or_(
+                    f"{self.key}.gt.{_quote(value)},"
+                    f"and({self.key}.eq.{_quote(value)},{self.tiebreak}.gt.{_quote(last_id)})"
+                )
+            else:
+                # Kursor bez tiebreak dela (npr. iz starije verzije klijenta)
+                query = query.gt(self.key, after)
+        query = query.order(self.key)
+        if self.tiebreak is not None:
+            query = query.order(self.tiebreak)
+        return query.limit(limit)
+
+    def page(self, filters: Dict[str, Any], after: Optional[Any], limit: int,
+             fields: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+        """Jedna strana i kursor sledeće (None ako je ovo poslednja)"""
+        # Jedan red više od traženog govori da li postoji sledeća strana
+        rows = self._query(self.select(fields), filters, after, limit + 1).execute().data
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, self.cursor(rows[-1])
+
+    def iter_rows(self, filters: Dict[str, Any], after: Optional[Any], batch_size: int,
+                  fields: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Svi redovi posle `after`, učitani u paketima od `batch_size` (za izvoz bez učitavanja cele tabele)"""
+        select = self.select(fields)
+        while True:
+            rows = self._query(select, filters, after, batch_size).execute().data
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = self.cursor(rows[-1])
+
+def ndjson(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """Po jedan JSON objekat po liniji"""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
@@ -0,0 +1,104 @@
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import numpy as np
+import faiss
+from rag import index_factory
+
+logger = logging.getLogger(__name__)
+
+class SemanticAnswerCache:
+    """
+    Keš odgovora LLM-a za semantički slična pitanja.
+
+    Embedding-i keširanih pitanja su u malom FAISS indeksu (kosinusna sličnost).
+    Odgovor se vraća samo ako je novo pitanje na kosinusnoj udaljenosti najviše
+    `max_distance` od keširanog i ako je pretraga vratila isti skup izvora.
+    Najstariji korišćeni unosi se izbacuju kada ih ima više od `max_entries`,
+    a ceo keš se prazni kada se promeni verzija RAG indeksa (novi ili obrisani
+    dokumenti).
+    """
+
+    def __init__(self, dimension: int, max_distance: float = 0.05, max_entries: int = 512,
+                 candidates: int = 4, name: str = "answer",
+                 on_lookup: Optional[Callable[[str, bool], None]] = None):
+        self.name = name
+        self.min_similarity = 1.0 - max_distance
+        self.max_entries = max(1, max_entries)
+        self.candidates = max(1, candidates)
+        self.on_lookup = on_lookup
+        self.index = index_factory.with_ids(faiss.IndexFlatIP(dimension))
+        # id u indeksu -> (ključ izvora, keširana vrednost), redom od najstarije korišćenog
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._next_id = 0
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _prepare(embedding: np.ndarray) -> np.ndarray:
+        vector = np.array(embedding, dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _sync_version(self, version: int) -> bool:
+        """Prazni keš pri novoj verziji indeksa; vraća False za zastarelu verziju"""
+        if self._version is not None and version < self._version:
+            return False
+        if version != self._version:
+            if self._entries:
+                logger.info(f"Indeks je promenjen, brišem {len(self._entries)} keširanih odgovora")
+            self.index.reset()
+            self._entries.clear()
+            self._version = version
+        return True
+
+    def get(self, embedding: np.ndarray, source_key: Hashable, version: int) -> Optional[Any]:
+        hit = None
+        with self._lock:
+            if self._sync_version(version) and self.index.ntotal:
+                similarities, ids = self.index.search(self._prepare(embedding),
+                                                      min(self.candidates, self.index.ntotal))
+                for similarity, entry_id in zip(similarities[0].tolist(), ids[0].tolist()):
+                    if entry_id < 0 or similarity < self.min_similarity:
+                        break
+                    entry_key, value = self._entries[entry_id]
+                    if entry_key == source_key:
+                        self._entries.move_to_end(entry_id)
+                        hit = value
+                        break
+            if hit is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if self.on_lookup:
+            self.on_lookup(self.name, hit is not None)
+        return hit
+
+    def put(self, embedding: np.ndarray, source_key: Hashable, value: Any, version: int):
+        with self._lock:
+            if not self._sync_version(version):
+                # Odgovor je nastao nad starijim sadržajem indeksa
+                return
+            entry_id = self._next_id
+            self._next_id += 1
+            self.index.add_with_ids(self._prepare(embedding), np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = (source_key, value)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self.index.remove_ids(np.array([evicted], dtype="int64"))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,72 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+from rag.chunker import normalize_text
+
+_MISSING = object()
+
+def query_key(query: str) -> str:
+    """Ključ upita u kešu; model ne razlikuje velika i mala slova, pa ni ključ"""
+    return normalize_text(query).casefold()
+
+class LRUCache:
+    """
+    Ograničen keš sa LRU izbacivanjem i opcionim rokom trajanja (TTL) unosa.
+
+    Bezbedan za korišćenje iz više niti. Broji pogotke i promašaje; `on_lookup`
+    se poziva posle svake pretrage sa (ime keša, da li je pogodak).
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl_seconds: Optional[float] = None,
+                 on_lookup: Optional[Callable[[str, bool], None]] = None):
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self.on_lookup = on_lookup
+        self.hits = 0
+        self.misses = 0
+        # ključ -> (vrednost, trenutak isteka ili None)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                entry = _MISSING
+            hit = entry is not _MISSING
+            if hit:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if self.on_lookup:
+            self.on_lookup(self.name, hit)
+        return entry[0] if hit else default
+
+    def put(self, key: Hashable, value: Any):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,103 @@
+import re
+import hashlib
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Callable
+
+# Reči i znakovi interpunkcije; približno broju tokena WordPiece tokenizera embedding modela
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+# Kraj rečenice (., !, ?, …) praćen razmakom, ili prazan red između paragrafa
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+|\n\s*\n")
+_WHITESPACE_RE = re.compile(r"\s+")
+_ALNUM_RE = re.compile(r"\w", re.UNICODE)
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+def split_sentences(text: str) -> List[str]:
+    """Rečenice (i paragrafi) teksta, bez suvišnih razmaka; prazne se izostavljaju"""
+    return [sentence for sentence in map(normalize_text, _SENTENCE_RE.split(text)) if sentence]
+
+def content_hash(text: str) -> str:
+    """Heš sadržaja dela teksta; razlike u razmacima i velikim slovima se zanemaruju"""
+    return hashlib.sha1(normalize_text(text).casefold().encode("utf-8")).hexdigest()
+
+class TextChunker:
+    """
+    Deli tekst na delove od približno `chunk_tokens` tokena, na granicama rečenica.
+
+    Uzastopni delovi dele poslednje rečenice (do `overlap_tokens` tokena), pa
+    kontekst oko granice nije izgubljen. Rečenica duža od celog dela se deli
+    po rečima. Delovi sa manje od `min_chars` slova/cifara (prazne strane,
+    brojevi strana, linije) se odbacuju.
+    """
+
+    def __init__(self, chunk_tokens: int = 200, overlap_tokens: int = 40, min_chars: int = 20,
+                 token_counter: Optional[Callable[[str], int]] = None):
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.overlap_tokens = max(0, min(overlap_tokens, self.chunk_tokens // 2))
+        self.min_chars = min_chars
+        self.count_tokens = token_counter or count_tokens
+
+    def is_boilerplate(self, text: str) -> bool:
+        return len(_ALNUM_RE.findall(text)) < self.min_chars
+
+    def _sentences(self, text: str) -> Iterator[str]:
+        for sentence in split_sentences(text):
+            if self.count_tokens(sentence) <= self.chunk_tokens:
+                yield sentence
+                continue
+            # Predugačka "rečenica" (tabela, spisak bez interpunkcije): delimo po rečima
+            current, current_tokens = [], 0
+            for word in sentence.split(" "):
+                tokens = self.count_tokens(word)
+                if current and current_tokens + tokens > self.chunk_tokens:
+                    yield " ".join(current)
+                    current, current_tokens = [], 0
+                current.append(word)
+                current_tokens += tokens
+            if current:
+                yield " ".join(current)
+
+    def split(self, text: str) -> List[str]:
+        """Deli tekst na delove; odbačeni (prazni) delovi se ne vraćaju"""
+        chunks = []
+        current: List[str] = []
+        current_tokens = 0
+        for sentence in self._sentences(text):
+            tokens = self.count_tokens(sentence)
+            if current and current_tokens + tokens > self.chunk_tokens:
+                chunks.append(" ".join(current))
+                # Preklapanje: poslednje rečenice prethodnog dela počinju sledeći
+                overlap, overlap_tokens = [], 0
+                for previous in reversed(current):
+                    previous_tokens = self.count_tokens(previous)
+                    if overlap_tokens + previous_tokens > self.overlap_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_tokens += previous_tokens
+                current, current_tokens = overlap, overlap_tokens
+            current.append(sentence)
+            current_tokens += tokens
+        if current:
+            chunks.append(" ".join(current))
+        return [chunk for chunk in chunks if not self.is_boilerplate(chunk)]
+
+    def split_documents(self, documents: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Deli svaki dokument (npr. stranu PDF-a) na delove koji nasleđuju njegove metapodatke.
+
+        Identični delovi unutar istog izvora vraćaju se samo jednom.
+        """
+        seen = set()
+        for document in documents:
+            for number, chunk in enumerate(self.split(document["content"])):
+                digest = content_hash(chunk)
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                yield {
+                    "content": chunk,
+                    "metadata": dict(document["metadata"], chunk=number)
+                }
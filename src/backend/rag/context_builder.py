@@ -0,0 +1,67 @@
+import logging
+from typing import Any, Callable, Dict, List, Optional
+from rag.chunker import count_tokens, normalize_text, split_sentences
+
+logger = logging.getLogger(__name__)
+
+class ContextBuilder:
+    """
+    Sastavlja kontekst za prompt od rezultata pretrage, u zadatom budžetu tokena.
+
+    Delovi se uzimaju od najboljeg skora naniže. Rečenice koje su već u kontekstu
+    (preklapanje susednih delova, ista rečenica na više strana) se izostavljaju,
+    a deo od kog je ostalo manje od `min_passage_tokens` se preskače. Deo koji ne
+    staje ceo skraćuje se na početne rečenice koje staju, i tu se sastavljanje
+    završava. Tokeni se broje istim brojačem kao i pri deljenju teksta.
+    """
+
+    SEPARATOR = "\n\n"
+
+    def __init__(self, max_tokens: int = 1200, min_passage_tokens: int = 20,
+                 token_counter: Optional[Callable[[str], int]] = None):
+        self.max_tokens = max(1, max_tokens)
+        self.min_passage_tokens = max(1, min_passage_tokens)
+        self.count_tokens = token_counter or count_tokens
+
+    def build(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Vraća {"context", "documents", "tokens", "truncated"}: tekst konteksta, delove
+        (sa skraćenim sadržajem) koji su u njega ušli, broj tokena i da li je nešto izostavljeno.
+        """
+        ranked = sorted(results, key=lambda doc: doc.get("score", 0.0), reverse=True)
+        separator_tokens = self.count_tokens(self.SEPARATOR)
+        seen = set()
+        passages: List[Dict[str, Any]] = []
+        used = 0
+        truncated = False
+        for doc in ranked:
+            sentences = []
+            for sentence in split_sentences(doc["content"]):
+                key = normalize_text(sentence).casefold()
+                if key not in seen:
+                    sentences.append((key, sentence, self.count_tokens(sentence)))
+            if sum(tokens for _, _, tokens in sentences) < self.min_passage_tokens:
+                # Deo je (skoro) ceo već u kontekstu kroz druge delove
+                continue
+            available = self.max_tokens - used - (separator_tokens if passages else 0)
+            kept, kept_tokens = [], 0
+            for key, sentence, tokens in sentences:
+                if kept_tokens + tokens > available:
+                    truncated = True
+                    break
+                kept.append((key, sentence))
+                kept_tokens += tokens
+            if kept_tokens >= self.min_passage_tokens or (kept and len(kept) == len(sentences)):
+                seen.update(key for key, _ in kept)
+                used += kept_tokens + (separator_tokens if passages else 0)
+                passages.append(dict(doc, content=" ".join(sentence for _, sentence in kept)))
+            if truncated:
+                break
+        if len(passages) < len(ranked):
+            logger.debug(f"Kontekst: {len(passages)} od {len(ranked)} delova, {used} tokena")
+        return {
+            "context": self.SEPARATOR.join(doc["content"] for doc in passages),
+            "documents": passages,
+            "tokens": used,
+            "truncated": truncated
+        }
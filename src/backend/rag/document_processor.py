@@ -1,108 +1,161 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import PyPDF2
 import docx
 import os
+import threading
 import logging
+from rag.chunker import TextChunker
 
 # Konfiguracija logovanja
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _extract_pdf_pages(file_path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    """Izvlači tekst strana [start, end) iz PDF fajla (izvršava se i u zasebnom procesu)"""
+    return list(_iter_pdf_range(file_path, start, end))
+
+def _iter_pdf_range(file_path: str, start: int, end: int) -> Iterator[Dict[str, Any]]:
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page_num in range(start, end):
+            try:
+                page = pdf_reader.pages[page_num]
+                text = page.extract_text()
+                
+                if not text.strip():
+                    logger.warning(f"Strana {page_num + 1} je prazna")
+                    continue
+                    
+                yield {
+                    "content": text,
+                    "metadata": {
+                        "source": file_path,
+                        "page": page_num + 1,
+                        "type": "pdf"
+                    }
+                }
+            except Exception as e:
+                logger.error(f"Greška pri procesiranju stranice {page_num + 1}: {str(e)}")
+                continue
+
 class DocumentProcessor:
-    @staticmethod
-    def process_file(file_path: str) -> List[Dict[str, Any]]:
-        """Procesira fajl i vraća listu dokumenta"""
-        file_extension = os.path.splitext(file_path)[1].lower()
-        
-        logger.info(f"Procesiranje fajla: {file_path}")
-        
-        if file_extension == '.pdf':
-            return DocumentProcessor._process_pdf(file_path)
-        elif file_extension == '.docx':
-            return DocumentProcessor._process_docx(file_path)
-        else:
-            raise ValueError(f"Ne podržani format fajla: {file_extension}")
+    # Broj strana koje jedan proces obrađuje u jednom zadatku
+    PDF_PAGES_PER_TASK = 8
+    # Pulovi procesa za PDF po broju worker-a; prave se jednom i dele između dokumenata
+    _pdf_pools: Dict[int, ProcessPoolExecutor] = {}
+    _pdf_pools_lock = threading.Lock()
+
+    @classmethod
+    def _pdf_pool(cls, workers: int) -> ProcessPoolExecutor:
+        """
+        Pul procesa za izvlačenje teksta. Procesi se pokreću sa "spawn": fork iz
+        višenitnog servera (uvicorn, torch i faiss niti) može da nasledi zaključane
+        brave i zaglavi se
+        """
+        with cls._pdf_pools_lock:
+            pool = cls._pdf_pools.get(workers)
+            if pool is None:
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                cls._pdf_pools[workers] = pool
+            return pool
+
+    @classmethod
+    def shutdown_pools(cls):
+        """Gasi procese za obradu PDF-a (pri gašenju aplikacije)"""
+        with cls._pdf_pools_lock:
+            pools, cls._pdf_pools = list(cls._pdf_pools.values()), {}
+        for pool in pools:
+            pool.shutdown(wait=True, cancel_futures=True)
 
     @staticmethod
-    def _process_pdf(file_path: str) -> List[Dict[str, Any]]:
-        """Procesira PDF fajl"""
-        documents = []
+    def process_file(file_path: str, workers: int = 1,
+                     chunker: Optional[TextChunker] = None) -> List[Dict[str, Any]]:
+        """Procesira fajl i vraća listu delova dokumenta"""
+        logger.info(f"Procesiranje fajla: {file_path}")
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                logger.info(f"PDF fajl ima {total_pages} strana")
-                
-                for page_num in range(total_pages):
-                    try:
-                        page = pdf_reader.pages[page_num]
-                        text = page.extract_text()
-                        
-                        if not text.strip():
-                            logger.warning(f"Strana {page_num + 1} je prazna")
-                            continue
-                            
-                        documents.append({
-                            "content": text,
-                            "metadata": {
-                                "source": file_path,
-                                "page": page_num + 1,
-                                "type": "pdf"
-                            }
-                        })
-                        logger.info(f"Uspešno procesirana strana {page_num + 1}")
-                    except Exception as e:
-                        logger.error(f"Greška pri procesiranju stranice {page_num + 1}: {str(e)}")
-                        continue
-                        
-            if not documents:
-                logger.error("Nijedna stranica nije uspešno procesirana")
-                raise Exception("Nije moguće izvući tekst iz PDF fajla")
-                
-            return documents
+            documents = list(DocumentProcessor.iter_file(file_path, workers, chunker))
         except Exception as e:
-            logger.error(f"Greška pri procesiranju PDF fajla: {str(e)}")
+            logger.error(f"Greška pri procesiranju fajla {file_path}: {str(e)}")
             raise
 
+        if not documents:
+            logger.error("Nijedan deo teksta nije uspešno procesiran")
+            raise Exception("Nije moguće izvući tekst iz dokumenta")
+        logger.info(f"Uspešno procesirano {len(documents)} delova teksta")
+        return documents
+
     @staticmethod
-    def _process_docx(file_path: str) -> List[Dict[str, Any]]:
-        """Procesira DOCX fajl"""
-        documents = []
+    def iter_file(file_path: str, workers: int = 1,
+                  chunker: Optional[TextChunker] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Vraća delove dokumenta jedan po jedan, čim budu izvučeni.
+
+        Strane PDF-a i tekst DOCX-a se dele chunker-om; prazni i ponovljeni
+        delovi se ne vraćaju.
+        """
+        chunker = chunker or TextChunker()
+        yield from chunker.split_documents(DocumentProcessor.iter_sections(file_path, workers))
+
+    @staticmethod
+    def iter_sections(file_path: str, workers: int = 1) -> Iterator[Dict[str, Any]]:
+        """Ceo tekst svake strane PDF-a (metadata["page"]), odnosno DOCX-a kao jedne celine, pre deljenja"""
+        file_extension = os.path.splitext(file_path)[1].lower()
+        if file_extension == '.pdf':
+            return DocumentProcessor.iter_pdf_pages(file_path, workers)
+        if file_extension == '.docx':
+            return DocumentProcessor._iter_docx(file_path)
+        raise ValueError(f"Ne podržani format fajla: {file_extension}")
+
+    @staticmethod
+    def count_pdf_pages(file_path: str) -> int:
+        with open(file_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+
+    @staticmethod
+    def iter_pdf_pages(file_path: str, workers: int = 1) -> Iterator[Dict[str, Any]]:
+        """
+        Generator strana PDF fajla, redom po broju strane.
+
+        Sa workers > 1 opsezi strana se raspoređuju na pul procesa; strane se
+        vraćaju čim je njihov opseg gotov, dok se kasniji opsezi još obrađuju.
+        """
+        total_pages = DocumentProcessor.count_pdf_pages(file_path)
+        logger.info(f"PDF fajl ima {total_pages} strana")
+        step = DocumentProcessor.PDF_PAGES_PER_TASK
+
+        if workers <= 1 or total_pages <= step:
+            yield from _iter_pdf_range(file_path, 0, total_pages)
+            return
+
+        ranges = deque((start, min(start + step, total_pages)) for start in range(0, total_pages, step))
+        pool = DocumentProcessor._pdf_pool(workers)
+        # Ograničen broj opsega u obradi, da ne bismo držali ceo dokument u memoriji
+        pending = deque()
         try:
-            doc = docx.Document(file_path)
-            logger.info(f"Procesiranje DOCX fajla: {file_path}")
-            
-            # Grupišemo paragrafe u veće delove
-            current_chunk = []
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    current_chunk.append(para.text)
-                    if len(current_chunk) >= 3:  # Grupišemo po 3 paragrafa
-                        documents.append({
-                            "content": "\n".join(current_chunk),
-                            "metadata": {
-                                "source": file_path,
-                                "type": "docx"
-                            }
-                        })
-                        current_chunk = []
-            
-            # Dodajemo preostale paragrafe
-            if current_chunk:
-                documents.append({
-                    "content": "\n".join(current_chunk),
-                    "metadata": {
-                        "source": file_path,
-                        "type": "docx"
-                    }
-                })
-            
-            if not documents:
-                logger.error("Nijedan paragraf nije uspešno procesiran")
-                raise Exception("Nije moguće izvući tekst iz DOCX fajla")
-                
-            logger.info(f"Uspešno procesirano {len(documents)} delova teksta")
-            return documents
-        except Exception as e:
-            logger.error(f"Greška pri procesiranju DOCX fajla: {str(e)}")
-            raise 
\ No newline at end of file
+            while ranges or pending:
+                while ranges and len(pending) < workers * 2:
+                    start, end = ranges.popleft()
+                    pending.append(pool.submit(_extract_pdf_pages, file_path, start, end))
+                yield from pending.popleft().result()
+        finally:
+            # Prekinuta obrada (greška ili zatvoren generator) ne ostavlja zadatke u deljenom pulu
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _iter_docx(file_path: str) -> Iterator[Dict[str, Any]]:
+        """Tekst DOCX fajla kao jedna celina; paragrafi su odvojeni praznim redom"""
+        doc = docx.Document(file_path)
+        logger.info(f"Procesiranje DOCX fajla: {file_path}")
+        paragraphs = [para.text for para in doc.paragraphs if para.text.strip()]
+        if paragraphs:
+            yield {
+                "content": "\n\n".join(paragraphs),
+                "metadata": {
+                    "source": file_path,
+                    "type": "docx"
+                }
+            }
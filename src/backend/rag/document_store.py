@@ -0,0 +1,425 @@
+import json
+import os
+import re
+import sqlite3
+import unicodedata
+import threading
+import logging
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Set
+from rag.chunker import content_hash
+
+logger = logging.getLogger(__name__)
+
+# SQLite ograničava broj parametara u jednom upitu (starije verzije na 999)
+_MAX_PARAMS = 500
+# Najviše dokumenata u filteru pretrage (id-jevi se šalju kao jedan JSON parametar)
+MAX_FILTER_DOCUMENTS = 500
+_MAX_QUERY_TERMS = 64
+
+def fold_term(term: str) -> str:
+    """Reč upita u obliku u kom je FTS5 tokenizer (unicode61, bez dijakritika) čuva u indeksu"""
+    decomposed = unicodedata.normalize("NFKD", term.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+class SearchFilter:
+    """
+    Ograničava pretragu na delove zadatih dokumenata (upload-a), tipova fajla i opsega strana.
+
+    Deo koji je u indeksu samo jednom, a pripada i drugim dokumentima (isti sadržaj),
+    odgovara filteru svakog od tih dokumenata.
+    """
+
+    def __init__(self, document_ids: Optional[Iterable[str]] = None, file_types: Optional[Iterable[str]] = None,
+                 page_from: Optional[int] = None, page_to: Optional[int] = None):
+        self.document_ids = frozenset(document_ids) if document_ids else None
+        if self.document_ids is not None and len(self.document_ids) > MAX_FILTER_DOCUMENTS:
+            raise ValueError(
+                f"Filter sadrži {len(self.document_ids)} dokumenata, a dozvoljeno je najviše {MAX_FILTER_DOCUMENTS}"
+            )
+        self.file_types = frozenset(t.lower().lstrip(".") for t in file_types) if file_types else None
+        self.page_from = page_from
+        self.page_to = page_to
+
+    @property
+    def empty(self) -> bool:
+        return self.document_ids is None and self.file_types is None and self.page_from is None and self.page_to is None
+
+    def _key(self) -> tuple:
+        return (self.document_ids, self.file_types, self.page_from, self.page_to)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, SearchFilter) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def sql(self) -> Tuple[str, List[Any]]:
+        """WHERE uslov nad tabelom documents i njegovi parametri"""
+        clauses, params = ["documents.deleted = 0"], []
+        if self.document_ids is not None:
+            # Lista id-jeva je jedan parametar (json_each), pa broj dokumenata ne troši parametre upita
+            ids = json.dumps(sorted(self.document_ids))
+            clauses.append(
+                "(documents.document_id IN (SELECT value FROM json_each(?)) OR documents.content_hash IN "
+                "(SELECT content_hash FROM chunk_refs WHERE document_id IN (SELECT value FROM json_each(?))))"
+            )
+            params += [ids, ids]
+        if self.file_types is not None:
+            types = sorted(self.file_types)
+            clauses.append(f"json_extract(documents.metadata, '$.type') IN ({','.join('?' * len(types))})")
+            params += types
+        if self.page_from is not None:
+            clauses.append("json_extract(documents.metadata, '$.page') >= ?")
+            params.append(self.page_from)
+        if self.page_to is not None:
+            clauses.append("json_extract(documents.metadata, '$.page') <= ?")
+            params.append(self.page_to)
+        return " AND ".join(clauses), params
+
+class DocumentStore:
+    """
+    Dokumenti RAG indeksa u SQLite bazi, ključ je id vektora u FAISS indeksu.
+
+    Novi dokumenti se samo dodaju (INSERT), pri pokretanju se baza samo otvara,
+    a pretraga čita isključivo redove koji su joj potrebni. Obrisani dokumenti
+    ostaju kao "tombstone" redovi (deleted = 1) dok kompakcija ne ukloni i
+    njihove vektore iz indeksa; id-jevi se nikada ne koriste ponovo.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY,
+            content TEXT NOT NULL,
+            metadata TEXT NOT NULL,
+            content_hash TEXT,
+            document_id TEXT,
+            deleted INTEGER NOT NULL DEFAULT 0
+        );
+        -- Koji upload-ovani dokumenti sadrže koji deo (i kada je deo u indeksu samo jednom)
+        CREATE TABLE IF NOT EXISTS chunk_refs (
+            document_id TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            PRIMARY KEY (document_id, content_hash)
+        );
+        CREATE INDEX IF NOT EXISTS idx_chunk_refs_hash ON chunk_refs(content_hash);
+        CREATE TABLE IF NOT EXISTS store_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    # Leksički (BM25) indeks sadržaja; triggeri ga održavaju uz tabelu documents
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+            content, content='documents', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts_vocab USING fts5vocab(documents_fts, 'row');
+        CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+            INSERT INTO documents_fts (rowid, content) VALUES (new.id, new.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN
+            INSERT INTO documents_fts (documents_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END;
+    """
+
+    def __init__(self, path: Optional[str] = None, read_only: bool = False):
+        # Bez putanje baza živi u memoriji dok se prvi put ne sačuva na disk
+        self.path = path
+        # Procesi koji samo pretražuju otvaraju bazu writer procesa bez prava upisa
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        self._conn = self._connect_read_only(path) if read_only else self._connect(path)
+        self._load_counters()
+
+    def _connect_read_only(self, path: str) -> sqlite3.Connection:
+        # Šemu i migracije pravi writer; WAL režim omogućava čitanje dok on upisuje
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'documents_fts'").fetchone() is not None
+        return conn
+
+    def _connect(self, path: Optional[str]) -> sqlite3.Connection:
+        conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        if path:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(self.SCHEMA)
+        self._migrate_columns(conn)
+        self.fts = self._ensure_fts(conn)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_document_id ON documents(document_id)")
+        conn.commit()
+        return conn
+
+    @staticmethod
+    def _migrate_columns(conn: sqlite3.Connection):
+        """Dodaje kolone koje nedostaju bazama napravljenim ranijim verzijama"""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(documents)")]
+        if "document_id" not in columns:
+            conn.execute("ALTER TABLE documents ADD COLUMN document_id TEXT")
+        if "deleted" not in columns:
+            conn.execute("ALTER TABLE documents ADD COLUMN deleted INTEGER NOT NULL DEFAULT 0")
+        if "content_hash" not in columns:
+            conn.execute("ALTER TABLE documents ADD COLUMN content_hash TEXT")
+            rows = conn.execute("SELECT id, content FROM documents").fetchall()
+            conn.executemany(
+                "UPDATE documents SET content_hash = ? WHERE id = ?",
+                [(content_hash(content), doc_id) for doc_id, content in rows]
+            )
+            logger.info(f"Dodat heš sadržaja za {len(rows)} postojećih dokumenata")
+
+    def _ensure_fts(self, conn: sqlite3.Connection) -> bool:
+        """Pravi FTS5 indeks (i puni ga za postojeće baze); bez FTS5 leksička pretraga je isključena"""
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'documents_fts'").fetchone()
+        try:
+            conn.executescript(self.FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite nema podršku za FTS5 ({str(e)}), leksička pretraga je isključena")
+            return False
+        if not exists:
+            conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('rebuild')")
+            conn.commit()
+        return True
+
+    def _load_counters(self):
+        max_id = self._conn.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM documents").fetchone()[0]
+        row = self._conn.execute("SELECT value FROM store_meta WHERE key = 'next_id'").fetchone()
+        # Sledeći id se pamti posebno, jer kompakcija može da obriše redove sa najvećim id-jem
+        self._next_id = max(max_id, row[0] if row else 0)
+        self._live = self._conn.execute("SELECT COUNT(*) FROM documents WHERE deleted = 0").fetchone()[0]
+        self._tombstones = self._conn.execute("SELECT COUNT(*) FROM documents WHERE deleted = 1").fetchone()[0]
+
+    def refresh(self):
+        """Ponovo čita brojače (posle promena koje je napravio drugi proces)"""
+        with self._lock:
+            self._load_counters()
+
+    def __len__(self) -> int:
+        """Broj dokumenata koji nisu obrisani"""
+        return self._live
+
+    @property
+    def next_id(self) -> int:
+        return self._next_id
+
+    @property
+    def tombstones(self) -> int:
+        return self._tombstones
+
+    @staticmethod
+    def _encode_metadata(metadata: Dict[str, Any]) -> str:
+        return json.dumps(metadata or {}, ensure_ascii=False, separators=(",", ":"))
+
+    def append(self, documents: List[Dict[str, Any]]) -> List[int]:
+        """Dodaje dokumente na kraj i vraća njihove id-jeve u indeksu"""
+        with self._lock:
+            start = self._next_id
+            ids = list(range(start, start + len(documents)))
+            rows = []
+            for doc_id, doc in zip(ids, documents):
+                metadata = doc.get("metadata") or {}
+                rows.append((doc_id, doc["content"], self._encode_metadata(metadata),
+                             content_hash(doc["content"]), metadata.get("document_id")))
+            self._conn.executemany(
+                "INSERT INTO documents (id, content, metadata, content_hash, document_id) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunk_refs (document_id, content_hash) VALUES (?, ?)",
+                [(row[4], row[3]) for row in rows if row[4] is not None]
+            )
+            self._set_next_id(start + len(documents))
+            self._conn.commit()
+            self._live += len(documents)
+            return ids
+
+    def _set_next_id(self, next_id: int):
+        self._conn.execute(
+            "INSERT INTO store_meta (key, value) VALUES ('next_id', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (next_id,)
+        )
+        self._next_id = next_id
+
+    def add_references(self, document_id: str, documents: Iterable[Dict[str, Any]]):
+        """Beleži da dokument sadrži ove delove, i kada su u indeksu pod drugim dokumentom"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunk_refs (document_id, content_hash) VALUES (?, ?)",
+                [(document_id, content_hash(doc["content"])) for doc in documents]
+            )
+            self._conn.commit()
+
+    def truncate(self, next_id: int):
+        """Briše dokumente sa id >= next_id (npr. upload koji nije stigao do indeksa)"""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM documents WHERE id >= ?", (next_id,)).rowcount
+            if not removed:
+                return
+            self._conn.commit()
+            logger.warning(f"Obrisano {removed} dokumenata bez vektora u indeksu")
+            self._load_counters()
+
+    def remove_document(self, document_id: str, source: Optional[str] = None) -> List[int]:
+        """
+        Uklanja delove upload-ovanog dokumenta i vraća id-jeve koji su postali tombstone.
+
+        Deo koji sadrži i neki drugi dokument ostaje u indeksu i prelazi na taj
+        dokument. Redovi iz vremena pre document_id kolone prepoznaju se po
+        imenu izvornog fajla (`source`).
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM chunk_refs WHERE document_id = ?", (document_id,))
+            rows = self._conn.execute(
+                "SELECT id, content_hash FROM documents WHERE deleted = 0 AND "
+                "(document_id = ? OR (document_id IS NULL AND json_extract(metadata, '$.source') = ?))",
+                (document_id, source)
+            ).fetchall()
+            removed, reassigned = [], []
+            for doc_id, digest in rows:
+                owner = self._conn.execute(
+                    "SELECT document_id FROM chunk_refs WHERE content_hash = ? LIMIT 1", (digest,)
+                ).fetchone()
+                if owner:
+                    reassigned.append((owner[0], doc_id))
+                else:
+                    removed.append(doc_id)
+            self._conn.executemany("UPDATE documents SET document_id = ? WHERE id = ?", reassigned)
+            self._conn.executemany("UPDATE documents SET deleted = 1 WHERE id = ?", [(i,) for i in removed])
+            self._conn.commit()
+            self._live -= len(removed)
+            self._tombstones += len(removed)
+            return removed
+
+    def deleted_ids(self) -> Set[int]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT id FROM documents WHERE deleted = 1")}
+
+    def purge_deleted(self, keep: Iterable[int] = ()):
+        """Trajno briše tombstone redove, osim onih čiji su vektori još u indeksu (`keep`)"""
+        keep = set(keep)
+        with self._lock:
+            purge = [(doc_id,) for doc_id in self.deleted_ids() if doc_id not in keep]
+            self._conn.executemany("DELETE FROM documents WHERE id = ?", purge)
+            self._conn.commit()
+            self._tombstones -= len(purge)
+            logger.info(f"Trajno obrisano {len(purge)} tombstone dokumenata")
+
+    def existing_hashes(self, hashes: Iterable[str]) -> Set[str]:
+        """Vraća one heševe sadržaja koji već postoje među neobrisanim dokumentima"""
+        hashes = list(set(hashes))
+        found = set()
+        with self._lock:
+            for start in range(0, len(hashes), _MAX_PARAMS):
+                part = hashes[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(part))
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT content_hash FROM documents WHERE deleted = 0 AND content_hash IN ({placeholders})",
+                    part
+                ))
+        return found
+
+    def get_many(self, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Vraća samo tražene neobrisane dokumente, mapirane po id-ju"""
+        ids = list({int(i) for i in ids})
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, content, metadata FROM documents WHERE deleted = 0 AND id IN ({placeholders})", ids
+            ).fetchall()
+        return {row[0]: {"content": row[1], "metadata": json.loads(row[2])} for row in rows}
+
+    def matching_ids(self, search_filter: SearchFilter) -> List[int]:
+        """Id-jevi neobrisanih delova koji odgovaraju filteru (za pretragu samo nad njima)"""
+        where, params = search_filter.sql()
+        with self._lock:
+            return [row[0] for row in self._conn.execute(f"SELECT id FROM documents WHERE {where}", params)]
+
+    def lexical_search(self, query: str, k: int, max_term_ratio: float = 0.2,
+                       search_filter: Optional[SearchFilter] = None) -> List[Tuple[int, float]]:
+        """
+        BM25 pretraga neobrisanih dokumenata; vraća (id, skor) od najboljeg ka najslabijem.
+
+        Reči koje se javljaju u više od `max_term_ratio` dokumenata se izostavljaju,
+        pa rezultat određuju retki termini (nazivi lekova, kodovi grešaka), a ne
+        veznici i česte reči.
+        """
+        if not self.fts or k <= 0:
+            return []
+        terms = sorted({fold_term(term) for term in re.findall(r"[^\W_]+", query)})[:_MAX_QUERY_TERMS]
+        if not terms:
+            return []
+        placeholders = ",".join("?" * len(terms))
+        where, where_params = (search_filter or SearchFilter()).sql()
+        with self._lock:
+            frequencies = dict(self._conn.execute(
+                f"SELECT term, doc FROM documents_fts_vocab WHERE term IN ({placeholders})", terms
+            ).fetchall())
+            max_frequency = max(2.0, max_term_ratio * (self._live + self._tombstones))
+            rare = [term for term in terms if 0 < frequencies.get(term, 0) <= max_frequency]
+            if not rare:
+                return []
+            rows = self._conn.execute(
+                "SELECT documents.id, -bm25(documents_fts) FROM documents_fts "
+                "JOIN documents ON documents.id = documents_fts.rowid "
+                f"WHERE documents_fts MATCH ? AND {where} "
+                "ORDER BY bm25(documents_fts) LIMIT ?",
+                [" OR ".join(f'"{term}"' for term in rare)] + where_params + [k]
+            ).fetchall()
+        return [(row[0], float(row[1])) for row in rows]
+
+    def get(self, doc_id: int) -> Optional[Dict[str, Any]]:
+        return self.get_many([doc_id]).get(doc_id)
+
+    def iter_all(self, batch_size: int = 1000) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Prolazi kroz sve neobrisane dokumente redom, u paketima"""
+        last_id = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, content, metadata FROM documents WHERE id > ? AND deleted = 0 ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[0], {"content": row[1], "metadata": json.loads(row[2])}
+            last_id = rows[-1][0]
+
+    def save_to(self, path: str):
+        """Kopira bazu u fajl (ako je još u memoriji ili na drugoj putanji) i nastavlja rad nad njim"""
+        with self._lock:
+            if self.path and os.path.abspath(self.path) == os.path.abspath(path):
+                self._conn.commit()
+                return
+            target = self._connect(path)
+            self._conn.backup(target)
+            self._conn.close()
+            self._conn = target
+            self.path = path
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @classmethod
+    def migrate_from_json(cls, json_path: str, db_path: str) -> "DocumentStore":
+        """Jednokratna migracija starog documents.json fajla u SQLite bazu"""
+        with open(json_path, "r") as f:
+            documents = json.load(f)
+        for doc in documents:
+            metadata = doc.get("metadata") or {}
+            # Stari zapisi čuvaju apsolutnu putanju privremenog fajla; zadržavamo samo ime fajla
+            if isinstance(metadata.get("source"), str) and os.sep in metadata["source"]:
+                metadata["source"] = os.path.basename(metadata["source"])
+            doc["metadata"] = metadata
+        tmp_path = db_path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        store = cls(tmp_path)
+        store.append(documents)
+        store.close()
+        os.replace(tmp_path, db_path)
+        logger.info(f"Migrirano {len(documents)} dokumenata iz {json_path} u {db_path}")
+        return cls(db_path)
@@ -0,0 +1,101 @@
+import os
+import re
+import hashlib
+import sqlite3
+import threading
+import logging
+from typing import Dict, List, Sequence
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def text_hash(text: str) -> str:
+    """Heš tačnog teksta (embedding zavisi i od razmaka i velikih slova kod nekih modela)"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Trajni keš embedding-a na disku: (heš sadržaja, model) -> float32 vektor.
+
+    Vektori su u memorijski mapiranom fajlu koji raste po potrebi, a SQLite
+    baza čuva za svaki heš red u tom fajlu. Svaki model (i dimenzija) ima svoje
+    fajlove. Red se upisuje u bazu tek kada je vektor sačuvan, pa prekid usred
+    upisa ostavlja samo neiskorišćen prostor u fajlu vektora.
+    """
+
+    MIN_CAPACITY = 1024
+
+    def __init__(self, directory: str, model_name: str, dimension: int):
+        os.makedirs(directory, exist_ok=True)
+        prefix = f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)}-{dimension}"
+        self.dimension = dimension
+        self.vectors_path = os.path.join(directory, f"{prefix}.f32")
+        self._conn = sqlite3.connect(os.path.join(directory, f"{prefix}.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._rows = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings").fetchone()[0]
+        self._vectors = None
+        self._capacity = 0
+        self._ensure_capacity(max(self._rows, self.MIN_CAPACITY))
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def _ensure_capacity(self, rows: int):
+        if self._vectors is not None and rows <= self._capacity:
+            return
+        row_bytes = self.dimension * 4
+        current = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        capacity = max(rows, current, 2 * self._capacity, self.MIN_CAPACITY)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        if capacity > current:
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+        self._vectors = np.memmap(self.vectors_path, dtype="float32", mode="r+", shape=(capacity, self.dimension))
+        self._capacity = capacity
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Vraća keširane vektore (kopije) za heševe koji postoje"""
+        unique = list(set(hashes))
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT hash, row FROM embeddings WHERE hash IN ({placeholders})", part
+                ).fetchall()
+                for digest, row in rows:
+                    found[digest] = np.array(self._vectors[row])
+        return found
+
+    def put_many(self, hashes: List[str], vectors: np.ndarray):
+        """Dodaje vektore za heševe koji su promašeni u get_many"""
+        with self._lock:
+            new = {}
+            for digest, vector in zip(hashes, vectors):
+                new.setdefault(digest, vector)
+            if not new:
+                return
+            start = self._rows
+            self._ensure_capacity(start + len(new))
+            self._vectors[start:start + len(new)] = np.asarray(list(new.values()), dtype="float32")
+            self._vectors.flush()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (hash, row) VALUES (?, ?)",
+                [(digest, start + i) for i, digest in enumerate(new)]
+            )
+            self._conn.commit()
+            self._rows = start + len(new)
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            self._conn.close()
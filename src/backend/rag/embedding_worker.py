@@ -0,0 +1,115 @@
+import asyncio
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
+from rag.cache import LRUCache, query_key
+from rag.document_store import SearchFilter
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingBatcher:
+    """
+    Izvršava embedding upita i FAISS pretragu van event loop-a.
+
+    Upiti koji stignu u razmaku od najviše `max_wait_ms` spajaju se u jedan
+    `model.encode` poziv i jednu višeredu `index.search` pretragu. Rezultati
+    se keširaju po (upit, k, prag, filter, verzija indeksa), pa ponovljen upit ne čeka
+    na batch, a svaka izmena indeksa automatski poništava stare rezultate.
+    """
+
+    def __init__(self, rag_service, max_batch_size: int = 16, max_wait_ms: float = 5.0,
+                 on_batch: Optional[Callable[[int, float, List[float]], None]] = None,
+                 result_cache: Optional[LRUCache] = None):
+        self.rag_service = rag_service
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.on_batch = on_batch
+        self.result_cache = result_cache
+        # Jedna nit: model i indeks se koriste serijski, bez takmičenja za CPU
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-embed")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._worker_loop())
+
+    async def search(self, query: str, k: int = 3, score_threshold: Optional[float] = None,
+                     search_filter: Optional[SearchFilter] = None) -> List[Dict[str, Any]]:
+        """Dodaje upit u sledeći batch i čeka njegove rezultate"""
+        if search_filter is not None and search_filter.empty:
+            search_filter = None
+        key = None
+        if self.result_cache is not None:
+            # Verzija se čita pre pretrage: rezultat izračunat dok se indeks menja ostaje pod starom
+            key = (query_key(query), k, score_threshold, search_filter, self.rag_service.index_version)
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return [dict(doc) for doc in cached]
+
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, k, score_threshold, search_filter, future, time.perf_counter()))
+        results = await future
+        if key is not None:
+            self.result_cache.put(key, [dict(doc) for doc in results])
+        return results
+
+    async def run(self, func: Callable, *args):
+        """Izvršava blokirajuću operaciju nad modelom/indeksom u istoj niti kao i pretrage"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def _collect_batch(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker_loop(self):
+        while True:
+            batch = await self._collect_batch()
+            started = time.perf_counter()
+            # Upiti sa istim filterom dele jednu pretragu indeksa
+            groups: Dict[Optional[SearchFilter], list] = {}
+            for item in batch:
+                groups.setdefault(item[3], []).append(item)
+            for search_filter, items in groups.items():
+                queries = [item[0] for item in items]
+                k_max = max(item[1] for item in items)
+                thresholds = [item[2] for item in items]
+                try:
+                    results = await self.run(
+                        self.rag_service.search_batch, queries, k_max, thresholds, search_filter
+                    )
+                    for (_, k, _, _, future, _), result in zip(items, results):
+                        if not future.done():
+                            future.set_result(result[:k])
+                except Exception as e:
+                    logger.error(f"Greška pri batch pretrazi: {str(e)}")
+                    for item in items:
+                        if not item[4].done():
+                            item[4].set_exception(e)
+            if self.on_batch:
+                waits = [started - item[5] for item in batch]
+                self.on_batch(len(batch), time.perf_counter() - started, waits)
+
+    async def close(self):
+        """Zaustavlja worker i gasi executor"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self.executor.shutdown(wait=False)
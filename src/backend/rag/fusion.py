@@ -0,0 +1,22 @@
+from typing import Any, Dict, List, Sequence
+from rag.chunker import content_hash
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Dict[str, Any]]], k: int,
+                           rrf_k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Spaja rangirane liste rezultata (npr. vektorsku i leksičku) metodom reciprocal rank fusion.
+
+    Dokument dobija zbir 1 / (rrf_k + rang) iz svake liste u kojoj se nalazi, pa
+    se porede samo rangovi, a ne skorovi različitih pretraga. Isti deo se prepoznaje
+    po hešu sadržaja. Polje "score" je zbir podeljen najvećim mogućim zbirom (0-1).
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    totals: Dict[str, float] = {}
+    for results in rankings:
+        for rank, doc in enumerate(results, start=1):
+            key = content_hash(doc["content"])
+            fused.setdefault(key, doc)
+            totals[key] = totals.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    best = len(rankings) / (rrf_k + 1) if rankings else 1.0
+    ordered = sorted(totals, key=totals.get, reverse=True)[:k]
+    return [dict(fused[key], score=totals[key] / best) for key in ordered]
@@ -0,0 +1,222 @@
+import math
+import logging
+from typing import Optional
+import numpy as np
+import faiss
+
+logger = logging.getLogger(__name__)
+
+# Tipovi indeksa: "flat" je tačna pretraga, ostali su približni (ANN)
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Kako indeks čuva vektore: float32 (4 bajta po dimenziji), 8-bitni skalarni kvantizator
+# (1 bajt po dimenziji) ili PQ kodovi (pq_m bajtova po vektoru)
+CODECS = ("float", "sq8", "pq")
+
+# FAISS preporučuje najmanje ~39 vektora za treniranje po centroidu
+MIN_POINTS_PER_CENTROID = 39
+MAX_TRAINING_POINTS_PER_CENTROID = 256
+# Uzorak za treniranje kvantizatora bez IVF lista (PQ kodna knjiga ima najviše 256 centroida)
+MAX_CODEC_TRAINING_POINTS = 256 * MAX_TRAINING_POINTS_PER_CENTROID
+
+def faiss_metric(metric: str) -> int:
+    return faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+
+def default_nlist(ntotal: int) -> int:
+    """Broj IVF lista: ~4*sqrt(N), ali dovoljno malo da svaki centroid ima podatke za treniranje"""
+    nlist = int(4 * math.sqrt(max(ntotal, 1)))
+    return max(1, min(nlist, ntotal // MIN_POINTS_PER_CENTROID))
+
+def _pq_nbits(pq_nbits: int, ntotal: int) -> int:
+    # Svaka PQ kodna knjiga ima 2^nbits centroida i toliko vektora je potrebno za treniranje
+    while ntotal and pq_nbits > 4 and (1 << pq_nbits) > ntotal:
+        pq_nbits -= 1
+    return pq_nbits
+
+def _check_pq_m(dimension: int, pq_m: int):
+    if dimension % pq_m != 0:
+        raise ValueError(f"Dimenzija {dimension} nije deljiva brojem PQ podvektora {pq_m}")
+
+def build_codes_index(codec: str, dimension: int, metric: str, ntotal: int = 0,
+                      pq_m: int = 48, pq_nbits: int = 8) -> "faiss.Index":
+    """Tačna (flat) pretraga nad kvantizovanim kodovima umesto float32 vektora"""
+    faiss_metric_type = faiss_metric(metric)
+    if codec == "sq8":
+        return faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss_metric_type)
+    _check_pq_m(dimension, pq_m)
+    return faiss.IndexPQ(dimension, pq_m, _pq_nbits(pq_nbits, ntotal), faiss_metric_type)
+
+def build_index(index_type: str, dimension: int, metric: str, ntotal: int = 0,
+                nlist: Optional[int] = None, pq_m: int = 48, pq_nbits: int = 8,
+                hnsw_m: int = 32, ef_construction: int = 80, codec: str = "float") -> "faiss.Index":
+    """Pravi prazan (još netreniran) indeks zadatog tipa koji vektore čuva kao `codec`"""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Nepodržan tip indeksa: {index_type}")
+    if codec not in CODECS:
+        raise ValueError(f"Nepodržan način čuvanja vektora: {codec}")
+    faiss_metric_type = faiss_metric(metric)
+
+    if index_type == "flat":
+        if codec != "float":
+            return build_codes_index(codec, dimension, metric, ntotal, pq_m, pq_nbits)
+        if faiss_metric_type == faiss.METRIC_INNER_PRODUCT:
+            return faiss.IndexFlatIP(dimension)
+        return faiss.IndexFlatL2(dimension)
+
+    if index_type == "hnsw":
+        # HNSW graf nad float vektorima ili kvantizovanim kodovima; SQ8/PQ varijante su
+        # netrenirane dok train_index ne nauči kvantizator, a FAISS ume da ih snimi u snapshot
+        if codec == "float":
+            index = faiss.IndexHNSWFlat(dimension, hnsw_m, faiss_metric_type)
+        elif codec == "sq8":
+            index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, hnsw_m, faiss_metric_type)
+        else:
+            _check_pq_m(dimension, pq_m)
+            nbits = _pq_nbits(pq_nbits, ntotal)
+            try:
+                index = faiss.IndexHNSWPQ(dimension, pq_m, hnsw_m, nbits, faiss_metric_type)
+            except TypeError:
+                # FAISS pre 1.8 pravi HNSW-PQ samo sa L2 metrikom; za normalizovane (kosinusne)
+                # vektore redosled kandidata je isti, a skor daje ponovno rangiranje po float vektorima
+                index = faiss.IndexHNSWPQ(dimension, pq_m, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        return index
+
+    nlist = nlist or default_nlist(ntotal)
+    if faiss_metric_type == faiss.METRIC_INNER_PRODUCT:
+        quantizer = faiss.IndexFlatIP(dimension)
+    else:
+        quantizer = faiss.IndexFlatL2(dimension)
+    if index_type == "ivf_flat" and codec == "float":
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss_metric_type)
+    elif index_type == "ivf_flat" and codec == "sq8":
+        index = faiss.IndexIVFScalarQuantizer(
+            quantizer, dimension, nlist, faiss.ScalarQuantizer.QT_8bit, faiss_metric_type
+        )
+    else:
+        _check_pq_m(dimension, pq_m)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, _pq_nbits(pq_nbits, ntotal), faiss_metric_type)
+    # Kvantizer mora da živi koliko i indeks
+    index.own_fields = True
+    quantizer.this.disown()
+    return index
+
+def train_index(index: "faiss.Index", vectors: np.ndarray, seed: int = 1234):
+    """Trenira indeks (IVF centroidi / PQ kodne knjige / opsezi SQ kvantizatora) na uzorku vektora"""
+    if index.is_trained:
+        return
+    ivf = faiss.try_extract_index_ivf(index)
+    max_points = ivf.nlist * MAX_TRAINING_POINTS_PER_CENTROID if ivf is not None else MAX_CODEC_TRAINING_POINTS
+    sample = vectors
+    if len(vectors) > max_points:
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), max_points, replace=False)]
+    detail = f" (nlist={ivf.nlist})" if ivf is not None else ""
+    logger.info(f"Treniram {type(index).__name__}{detail} na {len(sample)} vektora")
+    index.train(np.ascontiguousarray(sample, dtype="float32"))
+
+def index_type_of(index: "faiss.Index") -> str:
+    """Određuje tip indeksa na osnovu FAISS klase"""
+    index = unwrap(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+def codec_of(index: "faiss.Index") -> str:
+    """Određuje kako indeks čuva vektore (float, sq8 ili pq)"""
+    index = unwrap(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, (faiss.IndexIVFPQ, faiss.IndexPQ)):
+        return "pq"
+    if isinstance(index, (faiss.IndexIVFScalarQuantizer, faiss.IndexScalarQuantizer)):
+        return "sq8"
+    return "float"
+
+def set_search_params(index: "faiss.Index", nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Podešava odnos tačnosti i brzine pretrage (nprobe za IVF, efSearch za HNSW)"""
+    index = unwrap(index)
+    if isinstance(index, faiss.IndexIVF) and nprobe:
+        index.nprobe = min(nprobe, index.nlist)
+    elif isinstance(index, faiss.IndexHNSW) and ef_search:
+        index.hnsw.efSearch = ef_search
+
+def search_parameters(index: "faiss.Index", selector: "faiss.IDSelector", nprobe: Optional[int] = None,
+                      ef_search: Optional[int] = None) -> "faiss.SearchParameters":
+    """
+    Parametri pretrage sa IDSelector-om, tipa koji indeks očekuje.
+
+    IVF indeks odbija opšte SearchParameters, a nprobe/efSearch iz parametara
+    zamenjuju vrednosti podešene na indeksu, pa se ovde prenose.
+    """
+    base = unwrap(index)
+    ivf = faiss.try_extract_index_ivf(base)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=min(nprobe or ivf.nprobe, ivf.nlist))
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search or base.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+def supports_exact_reconstruct(index: "faiss.Index") -> bool:
+    """Da li indeks čuva originalne vektore (SQ8 i PQ čuvaju samo približne kodove)"""
+    return codec_of(index) == "float"
+
+def bytes_per_vector(index: "faiss.Index") -> float:
+    """Prosečna veličina jednog vektora u indeksu (kodovi, id mapa, IVF liste, HNSW graf)"""
+    if index.ntotal == 0:
+        return 0.0
+    return len(faiss.serialize_index(index)) / index.ntotal
+
+def with_ids(index: "faiss.Index") -> "faiss.IndexIDMap2":
+    """Omotava (prazan) indeks tako da vektori imaju stalne id-jeve umesto pozicija"""
+    wrapped = faiss.IndexIDMap2(index)
+    # Omotani indeks mora da živi koliko i omotač
+    wrapped.own_fields = True
+    index.this.disown()
+    return wrapped
+
+def read_index(path: str, mmap: bool = False) -> "faiss.Index":
+    """
+    Čita snapshot indeksa; sa `mmap` vektori ostaju u fajlu (samo za čitanje).
+
+    Memorijski mapiran snapshot dele svi procesi koji ga otvore (page cache), pa
+    dodatni proces ne drži svoju kopiju vektora. IO_FLAG_MMAP_IFC (novije FAISS
+    verzije) mapira flat i HNSW indekse, ali ne i IVF snapshot-e; za njih, i za
+    starije verzije, koristi se IO_FLAG_MMAP koji mapira IVF liste.
+    """
+    if not mmap:
+        return faiss.read_index(path)
+    mmap_ifc = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+    if mmap_ifc is not None:
+        try:
+            return faiss.read_index(path, mmap_ifc | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            logger.info(f"Snapshot {path} se ne može mapirati sa IO_FLAG_MMAP_IFC ({str(e)}), "
+                        f"koristim IO_FLAG_MMAP")
+    return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+
+def unwrap(index: "faiss.Index") -> "faiss.Index":
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+def index_ids(index: "faiss.Index") -> np.ndarray:
+    """Id-jevi vektora redom po poziciji (za indeks bez id mape to su same pozicije)"""
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.vector_to_array(index.id_map).astype("int64")
+    return np.arange(index.ntotal, dtype="int64")
+
+def reconstruct_all(index: "faiss.Index", start: int = 0) -> np.ndarray:
+    """Vraća vektore iz indeksa od pozicije `start` do kraja, redom po poziciji"""
+    index = unwrap(index)
+    if index.ntotal <= start:
+        return np.zeros((0, index.d), dtype="float32")
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # IVF indeksi mogu da rekonstruišu vektore tek uz direktnu mapu
+        ivf.make_direct_map()
+    return np.ascontiguousarray(index.reconstruct_n(start, index.ntotal - start), dtype="float32")
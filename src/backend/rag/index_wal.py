@@ -0,0 +1,98 @@
+import os
+import struct
+import zlib
+import logging
+from typing import Iterator, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+OP_ADD = 1
+
+# Zaglavlje zapisa: magic, operacija, broj vektora, dimenzija, dužina sadržaja
+_HEADER = struct.Struct("<4sBIIQ")
+_MAGIC = b"RWAL"
+_CRC = struct.Struct("<I")
+
+def fsync_dir(path: str):
+    """Osigurava da je preimenovanje/kreiranje fajla u direktorijumu trajno"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class IndexWAL:
+    """
+    Write-ahead log dodatih vektora FAISS indeksa.
+
+    Brisanja se ne beleže ovde: obrisani delovi su tombstone-i u bazi dokumenata
+    (koja je već trajna), a vektori se uklanjaju kompakcijom posle koje sledi snapshot.
+
+    Svaki zapis ima CRC32 kontrolnu sumu; pri ponovnom učitavanju replay staje
+    na prvom nepotpunom ili oštećenom zapisu (prekid usred upisa) i odseca ga.
+    """
+
+    def __init__(self, path: str, dimension: int, truncate: bool = False):
+        self.path = path
+        self.dimension = dimension
+        # Novi WAL (nova generacija) uvek počinje prazan
+        self._file = open(path, "wb" if truncate else "ab")
+        self.records = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._file.tell()
+
+    def _append(self, op: int, ids: np.ndarray, vectors: Optional[np.ndarray] = None):
+        ids = np.ascontiguousarray(ids, dtype="int64")
+        payload = ids.tobytes()
+        if vectors is not None:
+            payload += np.ascontiguousarray(vectors, dtype="float32").tobytes()
+        header = _HEADER.pack(_MAGIC, op, len(ids), self.dimension, len(payload))
+        crc = zlib.crc32(header + payload)
+        self._file.write(header + payload + _CRC.pack(crc))
+        self._file.flush()
+        # Upload je potvrđen tek kada je zapis trajno na disku
+        os.fsync(self._file.fileno())
+        self.records += 1
+
+    def append_add(self, ids: np.ndarray, vectors: np.ndarray):
+        self._append(OP_ADD, ids, vectors)
+
+    def replay(self) -> Iterator[Tuple[int, np.ndarray, Optional[np.ndarray]]]:
+        """Vraća ispravne zapise redom: (operacija, id-jevi, vektori ili None)"""
+        valid_until = 0
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                magic, op, count, dimension, length = _HEADER.unpack(header)
+                if magic != _MAGIC or dimension != self.dimension:
+                    logger.warning(f"Neispravno zaglavlje u {self.path} na poziciji {valid_until}")
+                    break
+                payload = f.read(length)
+                crc = f.read(_CRC.size)
+                if len(payload) < length or len(crc) < _CRC.size or \
+                        _CRC.unpack(crc)[0] != zlib.crc32(header + payload):
+                    logger.warning(f"Nepotpun zapis u {self.path} na poziciji {valid_until}, odsecam ostatak")
+                    break
+                ids = np.frombuffer(payload[:count * 8], dtype="int64")
+                vectors = None
+                if op == OP_ADD:
+                    vectors = np.frombuffer(payload[count * 8:], dtype="float32").reshape(count, dimension)
+                valid_until = f.tell()
+                self.records += 1
+                yield op, ids, vectors
+        # Oštećeni rep (prekinut upis) uklanjamo da novi zapisi ne bi došli iza njega
+        if valid_until < os.path.getsize(self.path):
+            self._file.truncate(valid_until)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._file.seek(0, os.SEEK_END)
+
+    def close(self):
+        self._file.close()
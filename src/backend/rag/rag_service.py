@@ -1,57 +1,769 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence, Callable
 import numpy as np
 from sentence_transformers import SentenceTransformer
 import faiss
 import json
 import os
+import time
+import threading
+import logging
+from rag import index_factory
+from rag.document_store import DocumentStore, SearchFilter
+from rag.chunker import content_hash
+from rag.cache import LRUCache, query_key
+from rag.embedding_cache import EmbeddingCache, text_hash
+from rag.index_wal import IndexWAL, OP_ADD, fsync_dir
+from rag.vector_store import FloatVectorStore, VECTORS_FILE, rerank
+
+logger = logging.getLogger(__name__)
+
+# Podržane metrike sličnosti: kosinusna (normalizovani vektori + inner product) i L2
+METRICS = ("cosine", "l2")
 
 class RAGService:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", metric: str = "cosine",
+                 score_threshold: float = 0.3, ann_index_type: Optional[str] = "hnsw",
+                 ann_promotion_threshold: int = 50000, nprobe: int = 16, ef_search: int = 64,
+                 query_cache: Optional[LRUCache] = None, embedding_cache_dir: Optional[str] = None,
+                 on_stage: Optional[Callable[[str, float], None]] = None, vector_codec: str = "float",
+                 quantize_threshold: int = 10000, rerank_candidates: int = 50, pq_m: int = 48):
+        if metric not in METRICS:
+            raise ValueError(f"Nepodržana metrika: {metric}")
+        if ann_index_type is not None and ann_index_type not in index_factory.INDEX_TYPES:
+            raise ValueError(f"Nepodržan tip indeksa: {ann_index_type}")
+        if vector_codec not in index_factory.CODECS:
+            raise ValueError(f"Nepodržan način čuvanja vektora: {vector_codec}")
         self.model = SentenceTransformer(model_name)
+        self.metric = metric
+        # Minimalni skor (0-1 za kosinusnu sličnost) ispod kog se rezultat ne koristi kao kontekst
+        self.score_threshold = score_threshold
+        # Indeks počinje kao "flat" i prelazi na ANN tip kada broj vektora pređe prag
+        self.index_type = "flat"
+        self.ann_index_type = ann_index_type
+        self.ann_promotion_threshold = ann_promotion_threshold
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        # Kvantizacija: indeks prelazi na SQ8/PQ kodove kada broj vektora pređe prag, a tačni
+        # float vektori ostaju u fajlu na disku i koriste se za ponovno rangiranje kandidata
+        self.vector_codec = vector_codec
+        self.index_codec = "float"
+        self.quantize_threshold = quantize_threshold
+        self.rerank_candidates = rerank_candidates
+        self.pq_m = pq_m
+        self.vectors: Optional[FloatVectorStore] = None
+        # Da li skladište ima tačan vektor svakog id-ja u indeksu (tek tada se koristi za rangiranje)
+        self._vectors_complete = False
         self.index = None
-        self.documents = []
+        # Raste pri svakoj promeni sadržaja indeksa; keševi rezultata pretrage ga koriste u ključu
+        self.index_version = 0
+        # Keš embedding-a upita (ključ je normalizovan tekst upita)
+        self.query_cache = query_cache
+        # Poziva se sa (faza, sekunde) za embedding upita, vektorsku i leksičku pretragu
+        self.on_stage = on_stage
+        # Trajni keš embedding-a delova dokumenata, po hešu sadržaja i modelu
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        if embedding_cache_dir:
+            self.embedding_cache = EmbeddingCache(
+                embedding_cache_dir, model_name, self.model.get_sentence_embedding_dimension()
+            )
+        # Dokumenti su u SQLite bazi; red i u indeksu i u bazi ima isti id
+        self.store = DocumentStore()
+        # Perzistencija: snapshot generacije `generation` + WAL promena posle njega
+        self.index_path: Optional[str] = None
+        self.wal: Optional[IndexWAL] = None
+        self.generation = 0
+        self._snapshot_due = False
+        # Trenutak (monotonic) prve promene koja još nije u snapshot-u; None ako takve nema
+        self._unpublished_since: Optional[float] = None
+        # Reader proces pretražuje memorijski mapiran snapshot koji objavljuje writer proces
+        self.read_only = False
+        # Trajanje delova poslednjeg load_index poziva (za izveštaj o pokretanju)
+        self.load_timings: Dict[str, float] = {}
+        # Štiti indeks i bazu dokumenata kada im se pristupa iz više niti
+        self._lock = threading.RLock()
+        # Najviše jedna kompakcija (ponovna gradnja indeksa) u isto vreme
+        self._compact_lock = threading.Lock()
+        # Selektor koji iz pretrage isključuje tombstone vektore: (index_version, unutrašnji, selektor)
+        self._tombstone_selector = None
         self.initialize_index()
 
     def initialize_index(self):
         """Inicijalizuje FAISS indeks za brzu pretragu"""
         dimension = self.model.get_sentence_embedding_dimension()
-        self.index = faiss.IndexFlatL2(dimension)
+        # Vektori imaju stalne id-jeve (id dokumenta u bazi), pa se mogu brisati
+        self.index = index_factory.with_ids(index_factory.build_index("flat", dimension, self.metric))
+        self.index_type = "flat"
+        self.index_codec = "float"
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Računa embedding-e; za kosinusnu metriku vektori se normalizuju"""
+        return self._normalize(self._model_encode(texts))
+
+    def _model_encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = self.model.encode(texts, convert_to_numpy=True)
+        return np.ascontiguousarray(embeddings, dtype="float32")
+
+    def _normalize(self, embeddings: np.ndarray) -> np.ndarray:
+        if self.metric == "cosine":
+            faiss.normalize_L2(embeddings)
+        return embeddings
+
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Kao _encode, ali embedding-e ponovljenih upita uzima iz keša"""
+        if self.query_cache is None:
+            return self._encode(queries)
+        keys = [query_key(query) for query in queries]
+        cached = [self.query_cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if missing:
+            encoded = self._encode([queries[i] for i in missing])
+            for i, vector in zip(missing, encoded):
+                cached[i] = vector
+                self.query_cache.put(keys[i], vector)
+        return np.ascontiguousarray(np.vstack(cached), dtype="float32")
+
+    def warm_up(self):
+        """Prvi encode poziv je spor (inicijalizacija modela); obavljamo ga pre prvog upita"""
+        self._encode(["warm-up"])
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embedding jednog upita (iz keša upita ako je već računat)"""
+        return self._encode_queries([query])[0]
+
+    def _to_scores(self, distances: np.ndarray) -> np.ndarray:
+        """Pretvara FAISS udaljenosti u skor gde veće znači sličnije"""
+        if self.metric == "cosine":
+            return distances
+        # IndexFlatL2 vraća kvadrat L2 udaljenosti
+        return 1.0 / (1.0 + distances)
+
+    def embed_documents(self, documents: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Računa embedding-e dokumenata (bez dodavanja u indeks).
 
-    def add_documents(self, documents: List[Dict[str, Any]]):
-        """Dodaje dokumente u indeks"""
+        Sa trajnim kešom model računa samo delove koje još nije video; keš čuva
+        izlaz modela pre normalizacije, pa ne zavisi od metrike indeksa.
+        """
         texts = [doc["content"] for doc in documents]
-        embeddings = self.model.encode(texts)
-        
-        if self.index.ntotal == 0:
-            self.index.add(embeddings)
-        else:
-            self.index.add(embeddings)
-        
-        self.documents.extend(documents)
-
-    def search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
-        """Pretražuje dokumente na osnovu upita"""
-        query_embedding = self.model.encode([query])
-        distances, indices = self.index.search(query_embedding, k)
-        
-        results = []
-        for idx in indices[0]:
-            if idx < len(self.documents):
-                results.append(self.documents[idx])
-        
-        return results
+        if self.embedding_cache is None or not texts:
+            return self._encode(texts)
+        hashes = [text_hash(text) for text in texts]
+        cached = self.embedding_cache.get_many(hashes)
+        missing = [i for i, digest in enumerate(hashes) if digest not in cached]
+        embeddings = np.empty((len(texts), self.embedding_cache.dimension), dtype="float32")
+        if missing:
+            encoded = self._model_encode([texts[i] for i in missing])
+            self.embedding_cache.put_many([hashes[i] for i in missing], encoded)
+            embeddings[missing] = encoded
+        for i, digest in enumerate(hashes):
+            if digest in cached:
+                embeddings[i] = cached[digest]
+        if len(missing) < len(texts):
+            logger.info(f"Embedding iz keša za {len(texts) - len(missing)} od {len(texts)} delova")
+        return self._normalize(embeddings)
+
+    def filter_new_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Vraća dokumente čiji sadržaj nije prazan, nije ponovljen u listi i još nije u indeksu"""
+        return [documents[i] for i in self._new_document_positions(documents)]
+
+    def _new_document_positions(self, documents: List[Dict[str, Any]]) -> List[int]:
+        hashes = [content_hash(doc["content"]) if doc["content"].strip() else None for doc in documents]
+        seen = self.store.existing_hashes(h for h in hashes if h is not None)
+        positions = []
+        for i, digest in enumerate(hashes):
+            if digest is None or digest in seen:
+                continue
+            seen.add(digest)
+            positions.append(i)
+        return positions
+
+    def add_documents(self, documents: List[Dict[str, Any]], embeddings: Optional[np.ndarray] = None):
+        """
+        Dodaje dokumente u indeks; već izračunati embedding-i se mogu proslediti.
+
+        Prazni dokumenti i dokumenti čiji je sadržaj već u indeksu se preskaču
+        (ali se beleži da pripadaju i upload-u iz metadata["document_id"]).
+        """
+        self.add_references(documents)
+        if embeddings is None:
+            # Embedding samo za nove delove, van brave da ne bi blokirao pretrage
+            documents = self.filter_new_documents(documents)
+            if not documents:
+                return
+            embeddings = self.embed_documents(documents)
+
+        with self._lock:
+            # Ponovna provera pod bravom: isti sadržaj je mogao stići u međuvremenu
+            positions = self._new_document_positions(documents)
+            if len(positions) < len(documents):
+                logger.info(f"Preskačem {len(documents) - len(positions)} praznih ili ponovljenih delova")
+            if not positions:
+                return
+            documents = [documents[i] for i in positions]
+            embeddings = embeddings[positions]
+
+            # Redosled: baza dokumenata, pa WAL (trenutak potvrde), pa indeks u memoriji
+            ids = np.array(self.store.append(documents), dtype="int64")
+            if self.wal is not None:
+                self.wal.append_add(ids, embeddings)
+            if self.vectors is not None:
+                self.vectors.put(ids, embeddings)
+            self.index.add_with_ids(embeddings, ids)
+            self.index_version += 1
+            self._mark_unpublished()
+        # Van brave: gradnja novog indeksa ne blokira pretrage ni druge upload-e
+        self._rebuild_if_needed()
+
+    def _rebuild_if_needed(self):
+        """Prelazi na ANN indeks ili kvantizovane kodove kada broj vektora pređe prag"""
+        with self._lock:
+            promote, codec = self._should_promote(), self._wanted_codec()
+            recode = codec != self.index_codec
+            ntotal = self.index.ntotal
+        if promote:
+            logger.info(f"Indeks ima {ntotal} vektora, prelazim na {self.ann_index_type}")
+            self.rebuild_index(self.ann_index_type)
+        elif recode:
+            logger.info(f"Indeks ima {ntotal} vektora, vektore čuvam kao {codec}")
+            self.rebuild_index()
+
+    def add_references(self, documents: List[Dict[str, Any]]):
+        """Beleži koje delove sadrži koji upload (i one koji su u indeksu pod drugim dokumentom)"""
+        by_document: Dict[str, List[Dict[str, Any]]] = {}
+        for doc in documents:
+            document_id = (doc.get("metadata") or {}).get("document_id")
+            if document_id is not None:
+                by_document.setdefault(document_id, []).append(doc)
+        for document_id, docs in by_document.items():
+            self.store.add_references(document_id, docs)
+
+    def remove_document(self, document_id: str, source: Optional[str] = None) -> int:
+        """
+        Uklanja delove upload-ovanog dokumenta iz pretrage i vraća njihov broj.
+
+        Vektori ostaju u indeksu kao tombstone-i (pretraga ih preskače) do sledeće
+        kompakcije; delovi koje sadrži i neki drugi dokument se ne uklanjaju.
+        """
+        with self._lock:
+            removed = self.store.remove_document(document_id, source)
+            if removed:
+                self.index_version += 1
+                self._mark_unpublished()
+        logger.info(f"Dokument {document_id}: uklonjeno {len(removed)} delova iz pretrage")
+        return len(removed)
+
+    def tombstone_ratio(self) -> float:
+        """Udeo vektora u indeksu koji pripadaju obrisanim dokumentima"""
+        with self._lock:
+            return self.store.tombstones / max(1, self.index.ntotal)
+
+    def compact_if_needed(self, max_tombstone_ratio: float) -> int:
+        if self.store.tombstones == 0 or self.tombstone_ratio() < max_tombstone_ratio:
+            return 0
+        return self.compact()
+
+    def _should_promote(self) -> bool:
+        return (self.index_type == "flat" and self.ann_index_type not in (None, "flat")
+                and self.index.ntotal >= self.ann_promotion_threshold)
+
+    def _wanted_codec(self) -> str:
+        """Kodovi koje indeks treba da koristi; bez skladišta float vektora kvantizacija nije moguća"""
+        if self.index_type == "ivf_pq":
+            # IVF-PQ je tip indeksa koji uvek čuva PQ kodove, nezavisno od vector_codec
+            return self.index_codec
+        if self.vectors is None or (not self._vectors_complete and self.index_codec != "float"):
+            return self.index_codec
+        if self.vector_codec == "float" or self.index_codec == self.vector_codec:
+            return self.vector_codec
+        return self.vector_codec if self.index.ntotal >= self.quantize_threshold else self.index_codec
+
+    def _should_recode(self) -> bool:
+        return self._wanted_codec() != self.index_codec
+
+    def _exact_vectors(self, index, ids: np.ndarray, start: int = 0) -> np.ndarray:
+        """Vektori od pozicije `start` do kraja; za kvantizovan indeks tačni vektori sa diska"""
+        if not index_factory.supports_exact_reconstruct(index) and self._has_exact_vectors():
+            return self.vectors.get(ids)
+        return index_factory.reconstruct_all(index, start)
+
+    def _has_exact_vectors(self) -> bool:
+        return self.vectors is not None and self._vectors_complete
+
+    def rebuild_index(self, index_type: Optional[str] = None, **build_params):
+        """Ponovo gradi indeks zadatog tipa (uz treniranje) od vektora neobrisanih dokumenata"""
+        self.compact(index_type, **build_params)
+
+    def compact(self, index_type: Optional[str] = None, **build_params) -> int:
+        """
+        Ponovo gradi indeks samo od vektora neobrisanih dokumenata; vraća broj uklonjenih vektora.
+
+        Vektori se čitaju pod bravom, a novi indeks se gradi (i trenira) van nje, pa
+        pretrage i upload-i rade za vreme kompakcije. Vektori dodati u međuvremenu
+        prenose se u novi indeks pri zameni.
+        """
+        if not self._compact_lock.acquire(blocking=False):
+            logger.info("Kompakcija indeksa je već u toku")
+            return 0
+        try:
+            with self._lock:
+                index_type = index_type or self.index_type
+                codec = build_params.pop("codec", None) or self._wanted_codec()
+                if codec != "float" and index_type != "ivf_pq" and self.vectors is None:
+                    raise ValueError("Kvantizovan indeks zahteva skladište float vektora (indeks mora imati putanju)")
+                old_index = self.index
+                exact = index_factory.supports_exact_reconstruct(old_index)
+                if not exact and not self._has_exact_vectors():
+                    logger.warning("Trenutni indeks čuva samo kvantizovane kodove; novi indeks će koristiti približne vektore")
+                ids = index_factory.index_ids(old_index)
+                vectors = self._exact_vectors(old_index, ids)
+                deleted = self.store.deleted_ids()
+                # Skladište bez vektora iz ranijih snapshot-a popunjavamo iz tačnog indeksa
+                fill_vectors = exact and self.vectors is not None and not self._vectors_complete
+
+            if fill_vectors:
+                self.vectors.put(ids, vectors)
+            live = ~np.isin(ids, np.fromiter(deleted, dtype="int64", count=len(deleted)))
+            index = self._build_index(index_type, vectors[live], ids[live], codec=codec, **build_params)
+
+            with self._lock:
+                # Vektori dodati tokom gradnje (indeks samo raste, pa su na kraju)
+                added_ids = index_factory.index_ids(self.index)[len(ids):]
+                if len(added_ids):
+                    # Upload-i su ih već upisali i u skladište float vektora
+                    index.add_with_ids(self._exact_vectors(self.index, added_ids, len(ids)), added_ids)
+                if fill_vectors:
+                    self._vectors_complete = True
+                self.index = index
+                self.index_type = index_factory.index_type_of(index)
+                self.index_codec = index_factory.codec_of(index)
+                self.index_version += 1
+                # Istrenirani indeks treba sačuvati u sledećem snapshot-u
+                self._snapshot_due = True
+                removed = int((~live).sum())
+                if removed:
+                    # Snapshot pre brisanja tombstone redova: posle pada WAL ne sme da vrati
+                    # vektore čiji dokumenti više ne postoje u bazi
+                    if self.index_path is not None:
+                        self.save_index(self.index_path)
+                    self.store.purge_deleted(keep=self.store.deleted_ids() - deleted)
+            logger.info(f"Indeks ponovo izgrađen ({self.index_type}, {self.index_codec}): "
+                        f"{index.ntotal} vektora, uklonjeno {removed}")
+            return removed
+        finally:
+            self._compact_lock.release()
+
+    def _build_index(self, index_type: str, vectors: np.ndarray, ids: np.ndarray, codec: str = "float",
+                     **build_params) -> "faiss.Index":
+        dimension = vectors.shape[1]
+        if (index_type != "flat" or codec != "float") and len(vectors) == 0:
+            # Netrenirani ANN indeks ili kvantizator bez vektora nije upotrebljiv
+            logger.warning(f"Nema vektora za treniranje indeksa tipa {index_type} ({codec}), koristim flat")
+            index_type, codec = "flat", "float"
+        build_params.setdefault("pq_m", self.pq_m)
+        base = index_factory.build_index(index_type, dimension, self.metric, len(vectors), codec=codec, **build_params)
+        if not base.is_trained:
+            index_factory.train_index(base, vectors)
+        index = index_factory.with_ids(base)
+        if len(vectors):
+            index.add_with_ids(vectors, ids)
+        index_factory.set_search_params(index, self.nprobe, self.ef_search)
+        return index
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """Menja nprobe (IVF) / efSearch (HNSW) bez ponovnog građenja indeksa"""
+        with self._lock:
+            self.nprobe = nprobe or self.nprobe
+            self.ef_search = ef_search or self.ef_search
+            index_factory.set_search_params(self.index, self.nprobe, self.ef_search)
+
+    def search(self, query: str, k: int = 3, score_threshold: Optional[float] = None,
+               search_filter: Optional[SearchFilter] = None) -> List[Dict[str, Any]]:
+        """Pretražuje dokumente na osnovu upita; svaki rezultat sadrži polje "score" """
+        return self.search_batch([query], k, [score_threshold], search_filter)[0]
+
+    def search_batch(self, queries: List[str], k: int = 3,
+                     score_thresholds: Optional[Sequence[Optional[float]]] = None,
+                     search_filter: Optional[SearchFilter] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Pretražuje više upita odjednom: jedan encode poziv i jedna pretraga indeksa.
+
+        Sa filterom FAISS pretražuje samo vektore delova koji mu odgovaraju (IDSelector),
+        pa se k rezultata ne troši na druge dokumente. Kvantizovan indeks vraća
+        `rerank_candidates` kandidata koji se ponovo rangiraju po tačnim vektorima sa diska.
+        """
+        started = time.perf_counter()
+        query_embeddings = self._encode_queries(queries)
+        self._record_stage("query_embedding", started)
+        thresholds = np.full(len(queries), -np.inf, dtype="float32")
+        if score_thresholds is not None:
+            for i, threshold in enumerate(score_thresholds):
+                if threshold is not None:
+                    thresholds[i] = threshold
+
+        started = time.perf_counter()
+        with self._lock:
+            if self.index.ntotal == 0:
+                return [[] for _ in queries]
+            rerank_exact = self.index_codec != "float" and self._has_exact_vectors()
+            if search_filter is not None and not search_filter.empty:
+                # Kandidati su samo neobrisani delovi koji odgovaraju filteru
+                allowed = np.array(self.store.matching_ids(search_filter), dtype="int64")
+                if len(allowed) == 0:
+                    return [[] for _ in queries]
+                selector = faiss.IDSelectorBatch(len(allowed), faiss.swig_ptr(allowed))
+                params = index_factory.search_parameters(self.index, selector, self.nprobe, self.ef_search)
+                k_search = max(k, self.rerank_candidates) if rerank_exact else k
+                k_search = min(self.index.ntotal, len(allowed), k_search)
+                distances, indices = self.index.search(query_embeddings, k_search, params=params)
+            else:
+                # Tombstone vektore isključuje sam FAISS, pa ne zauzimaju mesta među k rezultata
+                selector = self._live_selector()
+                params = None if selector is None else index_factory.search_parameters(
+                    self.index, selector, self.nprobe, self.ef_search
+                )
+                k_search = max(k, self.rerank_candidates) if rerank_exact else k
+                k_search = min(self.index.ntotal, k_search)
+                distances, indices = self.index.search(query_embeddings, k_search, params=params)
+            if rerank_exact:
+                distances, indices = rerank(query_embeddings, indices, self.vectors.get, self.metric)
+            scores = self._to_scores(distances)
+            # Prag se primenjuje vektorski, pre nego što se naprave rečnici dokumenata
+            keep = (indices >= 0) & (scores >= thresholds[:, None])
+            # Iz baze čitamo samo dokumente koji su prošli prag, jednim upitom za ceo batch
+            documents = self.store.get_many(np.unique(indices[keep]).tolist())
+
+            batch_results = []
+            for row_ids, row_scores, row_keep in zip(indices, scores, keep):
+                batch_results.append([
+                    dict(documents[idx], score=float(score))
+                    for idx, score in zip(row_ids[row_keep].tolist(), row_scores[row_keep].tolist())
+                    if idx in documents
+                ][:k])
+
+        self._record_stage("vector_search", started)
+        return batch_results
+
+    def _live_selector(self) -> Optional["faiss.IDSelector"]:
+        """Selektor svih vektora osim tombstone-a (None kada ih nema); gradi se ponovo pri promeni indeksa"""
+        if self.store.tombstones == 0:
+            return None
+        if self._tombstone_selector is None or self._tombstone_selector[0] != self.index_version:
+            deleted = np.fromiter(self.store.deleted_ids(), dtype="int64")
+            deleted_selector = faiss.IDSelectorBatch(len(deleted), faiss.swig_ptr(deleted))
+            # IDSelectorNot ne drži referencu na unutrašnji selektor, pa ga čuvamo uz njega
+            self._tombstone_selector = (self.index_version, deleted_selector, faiss.IDSelectorNot(deleted_selector))
+        return self._tombstone_selector[2]
+
+    def _record_stage(self, stage: str, started: float):
+        if self.on_stage:
+            self.on_stage(stage, time.perf_counter() - started)
+
+    def lexical_search(self, query: str, k: int = 3, max_term_ratio: float = 0.2,
+                       search_filter: Optional[SearchFilter] = None) -> List[Dict[str, Any]]:
+        """
+        BM25 pretraga sadržaja delova (SQLite FTS5); svaki rezultat sadrži polje "score".
+
+        Ne koristi bravu indeksa, pa se izvršava paralelno sa vektorskom pretragom.
+        """
+        started = time.perf_counter()
+        store = self.store
+        ranked = store.lexical_search(query, k, max_term_ratio, search_filter)
+        documents = store.get_many(doc_id for doc_id, _ in ranked)
+        self._record_stage("lexical_search", started)
+        return [dict(documents[doc_id], score=score) for doc_id, score in ranked if doc_id in documents]
 
     def save_index(self, path: str):
-        """Čuva indeks i dokumente na disk"""
-        if not os.path.exists(path):
-            os.makedirs(path)
-        
-        faiss.write_index(self.index, os.path.join(path, "index.faiss"))
-        with open(os.path.join(path, "documents.json"), "w") as f:
-            json.dump(self.documents, f)
-
-    def load_index(self, path: str):
-        """Učitava indeks i dokumente sa diska"""
-        self.index = faiss.read_index(os.path.join(path, "index.faiss"))
-        with open(os.path.join(path, "documents.json"), "r") as f:
-            self.documents = json.load(f) 
\ No newline at end of file
+        """
+        Pravi kompaktni snapshot indeksa i započinje novi WAL.
+
+        Snapshot se upisuje u novi fajl i objavljuje atomičnom zamenom index_meta.json,
+        pa prekid u bilo kom trenutku ostavlja ili stari ili novi konzistentan par snapshot + WAL.
+        """
+        os.makedirs(path, exist_ok=True)
+
+        with self._lock:
+            previous_meta = self._read_meta(path) or {}
+            generation = previous_meta.get("generation", 0) + 1
+            snapshot_name = f"index-{generation}.faiss"
+            snapshot_path = os.path.join(path, snapshot_name)
+
+            tmp_path = snapshot_path + ".tmp"
+            faiss.write_index(self.index, tmp_path)
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, snapshot_path)
+
+            # Dokumenti su već upisani pri dodavanju; baza se kopira samo ako još nije na ovoj putanji
+            self.store.save_to(os.path.join(path, "documents.db"))
+            if self.vectors is not None:
+                self.vectors.flush()
+            wal = IndexWAL(os.path.join(path, f"wal-{generation}.log"), self.index.d, truncate=True)
+
+            meta = dict(self._index_meta(), snapshot=snapshot_name, generation=generation)
+            self._write_meta(path, meta)
+            fsync_dir(path)
+
+            if self.wal is not None:
+                self.wal.close()
+            self.wal = wal
+            self.generation = generation
+            self.index_path = path
+            self._snapshot_due = False
+            self._unpublished_since = None
+            self._remove_stale_files(path, snapshot_name, os.path.basename(wal.path))
+
+    def _mark_unpublished(self):
+        if self._unpublished_since is None:
+            self._unpublished_since = time.monotonic()
+
+    def checkpoint_if_needed(self, max_wal_bytes: int, max_age_seconds: Optional[float] = None) -> bool:
+        """
+        Sabija WAL u novi snapshot kada naraste ili kada je indeks ponovo izgrađen; sa
+        `max_age_seconds` i kada promene čekaju na snapshot bar toliko dugo (writer ih tako
+        objavljuje reader procesima). Vraća True ako je snapshot napravljen.
+        """
+        with self._lock:
+            if self.index_path is None or self.wal is None:
+                return False
+            stale = (max_age_seconds is not None and self._unpublished_since is not None
+                     and time.monotonic() - self._unpublished_since >= max_age_seconds)
+            if not (self._snapshot_due or stale or self.wal.size_bytes >= max_wal_bytes):
+                return False
+            logger.info(f"Pravim snapshot indeksa (WAL: {self.wal.size_bytes} bajtova)")
+            self.save_index(self.index_path)
+            return True
+
+    def _index_meta(self) -> Dict[str, Any]:
+        """Podešavanja koja pripadaju konkretnom indeksu"""
+        return {
+            "metric": self.metric,
+            "score_threshold": self.score_threshold,
+            "index_type": self.index_type,
+            "vector_codec": self.index_codec,
+            # Skladište float vektora je potpuno (reader ga koristi za ponovno rangiranje)
+            "float_vectors": self._has_exact_vectors(),
+            "nprobe": self.nprobe,
+            "ef_search": self.ef_search
+        }
+
+    @staticmethod
+    def _read_meta(path: str) -> Optional[Dict[str, Any]]:
+        meta_path = os.path.join(path, "index_meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_meta(path: str, meta: Dict[str, Any]):
+        meta_path = os.path.join(path, "index_meta.json")
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, meta_path)
+
+    @staticmethod
+    def _remove_stale_files(path: str, snapshot_name: str, wal_name: str):
+        """
+        Briše snapshot-e i WAL-ove prethodnih generacija. Stari index.faiss (bez broja
+        generacije) se ne dira: snapshot-i ga ne zamenjuju, a prati ga git.
+        """
+        for name in os.listdir(path):
+            stale_snapshot = name.startswith("index-") and name.endswith(".faiss") and name != snapshot_name
+            stale_wal = name.startswith("wal-") and name.endswith(".log") and name != wal_name
+            if stale_snapshot or stale_wal:
+                os.remove(os.path.join(path, name))
+
+    def load_index(self, path: str, read_only: bool = False):
+        """
+        Učitava poslednji snapshot, otvara bazu dokumenata (stari documents.json se migrira)
+        i ponavlja WAL kako bi se vratili svi potvrđeni upload-i.
+
+        Sa `read_only` snapshot se memorijski mapira, baza se otvara samo za čitanje,
+        a WAL se ne čita (promene stižu sa sledećim snapshot-om, vidi reload_if_changed).
+        """
+        if read_only:
+            self._load_shared_snapshot(path)
+            return
+        started = time.perf_counter()
+        os.makedirs(path, exist_ok=True)
+        meta = self._read_meta(path)
+        generation = meta.get("generation", 0) if meta else 0
+        snapshot_path = os.path.join(path, meta.get("snapshot", "index.faiss") if meta else "index.faiss")
+
+        if os.path.exists(snapshot_path):
+            index = faiss.read_index(snapshot_path)
+        elif meta is not None and "snapshot" in meta:
+            raise FileNotFoundError(f"Snapshot indeksa {snapshot_path} ne postoji")
+        else:
+            index = index_factory.build_index("flat", self.model.get_sentence_embedding_dimension(), self.metric)
+        index_loaded = time.perf_counter()
+
+        db_path = os.path.join(path, "documents.db")
+        json_path = os.path.join(path, "documents.json")
+        if not os.path.exists(db_path) and os.path.exists(json_path):
+            store = DocumentStore.migrate_from_json(json_path, db_path)
+        else:
+            store = DocumentStore(db_path)
+        store_loaded = time.perf_counter()
+
+        snapshot_due = False
+        if meta is None and index.metric_type == faiss.METRIC_L2 and self.metric == "cosine":
+            # Stari indeks bez metapodataka: prebacujemo ga na kosinusnu sličnost
+            index = self._convert_to_cosine(index)
+            snapshot_due = True
+        elif meta is None:
+            meta = {"metric": "cosine" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"}
+        if not isinstance(index, faiss.IndexIDMap):
+            # Indeks iz vremena kada je id dokumenta bio pozicija vektora
+            index = self._convert_to_id_map(index)
+            snapshot_due = True
+
+        codec = index_factory.codec_of(index)
+        # Tip indeksa (npr. ivf_pq) ne govori da li su tačni vektori sačuvani; to beleži snapshot
+        float_vectors = bool((meta or {}).get("float_vectors"))
+        vectors_complete = float_vectors or index.ntotal == 0
+        vectors_path = os.path.join(path, VECTORS_FILE)
+        vector_store = self.vectors if self.vectors is not None and self.vectors.path == vectors_path else None
+        if vector_store is None and (float_vectors or self.vector_codec != "float"):
+            vector_store = FloatVectorStore(vectors_path, index.d)
+
+        wal = IndexWAL(os.path.join(path, f"wal-{generation}.log"), index.d)
+        for op, ids, vectors in wal.replay():
+            if op == OP_ADD:
+                if vector_store is not None:
+                    # Vektori posle poslednjeg snapshot-a možda nisu stigli do fajla na disku
+                    vector_store.put(ids, vectors)
+                index.add_with_ids(vectors, ids)
+        if wal.records:
+            logger.info(f"Iz WAL-a vraćeno {wal.records} zapisa, indeks ima {index.ntotal} vektora")
+        # Dokumenti čiji vektori nisu stigli u WAL pripadaju nepotvrđenom upload-u
+        ids = index_factory.index_ids(index)
+        store.truncate(int(ids.max()) + 1 if len(ids) else 0)
+        self.load_timings = {
+            "index_read": round(index_loaded - started, 3),
+            "doc_store_load": round(store_loaded - index_loaded, 3),
+            "wal_replay": round(time.perf_counter() - store_loaded, 3),
+        }
+
+        with self._lock:
+            self.index = index
+            self.index_version += 1
+            old_store, self.store = self.store, store
+            old_store.close()
+            if self.wal is not None:
+                self.wal.close()
+            self.wal = wal
+            self.generation = generation
+            self.index_path = path
+            self._snapshot_due = snapshot_due
+            # Promene iz WAL-a (i prazan direktorijum bez snapshot-a) još nisu objavljene
+            self._unpublished_since = time.monotonic() if wal.records or "snapshot" not in (meta or {}) else None
+            if self.vectors is not None and self.vectors is not vector_store:
+                self.vectors.close()
+            self.vectors = vector_store
+            self._vectors_complete = vector_store is not None and vectors_complete
+            if meta is not None:
+                self.metric = meta.get("metric", self.metric)
+                self.score_threshold = meta.get("score_threshold", self.score_threshold)
+                self.nprobe = meta.get("nprobe", self.nprobe)
+                self.ef_search = meta.get("ef_search", self.ef_search)
+            self.index_type = index_factory.index_type_of(index)
+            self.index_codec = codec
+            index_factory.set_search_params(index, self.nprobe, self.ef_search)
+        self._rebuild_if_needed()
+
+    def _load_shared_snapshot(self, path: str):
+        started = time.perf_counter()
+        meta = self._read_meta(path)
+        if meta is None or "snapshot" not in meta:
+            # Writer još nije objavio snapshot; do tada pretražujemo prazan indeks
+            logger.info(f"U {path} još nema snapshot-a, čekam da ga writer proces objavi")
+            with self._lock:
+                self.index_path = path
+                self.read_only = True
+            return
+        index = index_factory.read_index(os.path.join(path, meta["snapshot"]), mmap=True)
+        vector_store = self.vectors
+        if not meta.get("float_vectors"):
+            vector_store = None
+        elif vector_store is None:
+            vector_store = FloatVectorStore(os.path.join(path, VECTORS_FILE), index.d, read_only=True)
+        index_loaded = time.perf_counter()
+        store = self.store
+        if not (self.read_only and store.path):
+            store = DocumentStore(os.path.join(path, "documents.db"), read_only=True)
+        store.refresh()
+        self.load_timings = {
+            "index_read": round(index_loaded - started, 3),
+            "doc_store_load": round(time.perf_counter() - index_loaded, 3),
+        }
+
+        with self._lock:
+            self.index = index
+            self.index_version += 1
+            if store is not self.store:
+                old_store, self.store = self.store, store
+                old_store.close()
+            self.generation = meta.get("generation", 0)
+            self.index_path = path
+            self.read_only = True
+            if self.vectors is not None and self.vectors is not vector_store:
+                self.vectors.close()
+            self.vectors = vector_store
+            self._vectors_complete = vector_store is not None
+            self.metric = meta.get("metric", self.metric)
+            self.score_threshold = meta.get("score_threshold", self.score_threshold)
+            self.nprobe = meta.get("nprobe", self.nprobe)
+            self.ef_search = meta.get("ef_search", self.ef_search)
+            self.index_type = index_factory.index_type_of(index)
+            self.index_codec = index_factory.codec_of(index)
+            index_factory.set_search_params(index, self.nprobe, self.ef_search)
+
+    def reload_if_changed(self) -> bool:
+        """Učitava noviji snapshot koji je objavio writer proces; vraća True ako ga je bilo"""
+        if not self.read_only or self.index_path is None:
+            return False
+        meta = self._read_meta(self.index_path)
+        if meta is None or meta.get("generation", 0) <= self.generation:
+            return False
+        self._load_shared_snapshot(self.index_path)
+        logger.info(f"Učitan snapshot generacije {self.generation} ({self.index.ntotal} vektora)")
+        return True
+
+    def close(self):
+        """Zatvara WAL, bazu dokumenata i skladište float vektora"""
+        with self._lock:
+            if self.wal is not None:
+                self.wal.close()
+                self.wal = None
+            self.store.close()
+            if self.vectors is not None:
+                self.vectors.close()
+            if self.embedding_cache is not None:
+                self.embedding_cache.close()
+
+    @staticmethod
+    def _convert_to_id_map(index) -> "faiss.IndexIDMap2":
+        """Prebacuje indeks u IndexIDMap2 gde je id svakog vektora njegova dosadašnja pozicija"""
+        logger.info(f"Dodajem id mapu indeksu ({index.ntotal} vektora)")
+        vectors = index_factory.reconstruct_all(index)
+        # Kopija zadržava treniranje (IVF centroide, PQ kodne knjige), reset briše vektore
+        base = faiss.clone_index(index)
+        base.reset()
+        converted = index_factory.with_ids(base)
+        if len(vectors):
+            converted.add_with_ids(vectors, np.arange(len(vectors), dtype="int64"))
+        return converted
+
+    @staticmethod
+    def _convert_to_cosine(index) -> "faiss.Index":
+        """Pravi IndexFlatIP sa normalizovanim vektorima iz postojećeg L2 indeksa"""
+        logger.info(f"Konvertujem L2 indeks ({index.ntotal} vektora) u kosinusni indeks")
+        vectors = index_factory.reconstruct_all(index)
+        faiss.normalize_L2(vectors)
+        converted = index_factory.build_index("flat", index.d, "cosine")
+        converted.add(vectors)
+        return converted
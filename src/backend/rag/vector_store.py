@@ -0,0 +1,125 @@
+import os
+import threading
+import logging
+from typing import Callable, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.f32"
+
+class FloatVectorStore:
+    """
+    Tačni float32 vektori indeksa na disku; red u fajlu je id vektora.
+
+    Kvantizovani indeks u memoriji čuva samo kodove (1 bajt po dimenziji za SQ8,
+    nekoliko desetina bajtova po vektoru za PQ), a odavde se čitaju originalni
+    vektori najboljih kandidata za ponovno rangiranje. Fajl je memorijski mapiran,
+    pa u memoriji procesa ostaju samo stranice koje pretraga zaista dodirne.
+    """
+
+    MIN_CAPACITY = 1024
+
+    def __init__(self, path: str, dimension: int, read_only: bool = False):
+        self.path = path
+        self.dimension = dimension
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._capacity = 0
+        if read_only:
+            self._map_existing()
+        else:
+            self._ensure_capacity(self.MIN_CAPACITY)
+
+    def __len__(self) -> int:
+        return self._capacity
+
+    def _file_rows(self) -> int:
+        return os.path.getsize(self.path) // (self.dimension * 4) if os.path.exists(self.path) else 0
+
+    def _map_existing(self):
+        """Mapira fajl onoliko koliko je trenutno dugačak (writer proces ga produžava)"""
+        rows = self._file_rows()
+        self._vectors = (
+            np.memmap(self.path, dtype="float32", mode="r", shape=(rows, self.dimension)) if rows else None
+        )
+        self._capacity = rows
+
+    def _ensure_capacity(self, rows: int):
+        if self._vectors is not None and rows <= self._capacity:
+            return
+        current = self._file_rows()
+        capacity = max(rows, current, 2 * self._capacity, self.MIN_CAPACITY)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        if capacity > current:
+            with open(self.path, "ab") as f:
+                f.truncate(capacity * self.dimension * 4)
+        self._vectors = np.memmap(self.path, dtype="float32", mode="r+", shape=(capacity, self.dimension))
+        self._capacity = capacity
+
+    def put(self, ids: np.ndarray, vectors: np.ndarray):
+        """Upisuje vektore na redove svojih id-jeva (ponovni upis istog id-ja je bezbedan)"""
+        if self.read_only:
+            raise RuntimeError("Skladište vektora je otvoreno samo za čitanje")
+        if len(ids) == 0:
+            return
+        ids = np.asarray(ids, dtype="int64")
+        with self._lock:
+            self._ensure_capacity(int(ids.max()) + 1)
+            self._vectors[ids] = np.asarray(vectors, dtype="float32")
+
+    def get(self, ids: np.ndarray) -> np.ndarray:
+        """Vektori za zadate id-jeve (kopija), redom kao id-jevi"""
+        ids = np.asarray(ids, dtype="int64")
+        with self._lock:
+            if len(ids) and int(ids.max()) >= self._capacity:
+                if not self.read_only:
+                    raise KeyError(f"Vektor {int(ids.max())} nije u skladištu")
+                self._map_existing()
+                if int(ids.max()) >= self._capacity:
+                    raise KeyError(f"Vektor {int(ids.max())} nije u skladištu")
+            return np.array(self._vectors[ids], dtype="float32")
+
+    def flush(self):
+        """Trajno upisuje vektore na disk (pre objavljivanja snapshot-a koji ih koristi)"""
+        with self._lock:
+            if self._vectors is None or self.read_only:
+                return
+            self._vectors.flush()
+            with open(self.path, "rb") as f:
+                os.fsync(f.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None and not self.read_only:
+                self._vectors.flush()
+            self._vectors = None
+
+def rerank(queries: np.ndarray, indices: np.ndarray, fetch: Callable[[np.ndarray], np.ndarray],
+           metric: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ponovo rangira kandidate približne pretrage po tačnim float vektorima.
+
+    Vraća (udaljenosti, id-jeve) u FAISS konvenciji: inner product (veće je bolje) za
+    kosinusnu metriku, kvadrat L2 udaljenosti (manje je bolje) za L2. Prazna mesta
+    (id -1) ostaju na kraju reda.
+    """
+    valid = indices >= 0
+    if not valid.any():
+        return np.zeros(indices.shape, dtype="float32"), indices
+    # Svaki kandidat se čita sa diska jednom, i kada se pojavi u više upita
+    unique = np.unique(indices[valid])
+    candidates = fetch(unique)[np.searchsorted(unique, np.where(valid, indices, unique[0]))]
+    if metric == "cosine":
+        distances = np.einsum("qkd,qd->qk", candidates, queries)
+        distances[~valid] = -np.inf
+        order = np.argsort(-distances, axis=1, kind="stable")
+    else:
+        distances = ((candidates - queries[:, None, :]) ** 2).sum(axis=2)
+        distances[~valid] = np.inf
+        order = np.argsort(distances, axis=1, kind="stable")
+    return (np.take_along_axis(distances, order, axis=1).astype("float32"),
+            np.take_along_axis(indices, order, axis=1))
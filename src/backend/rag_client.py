@@ -1,105 +1,462 @@
 import os
-from typing import List, Dict, Any
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple
+import numpy as np
 from fastapi import UploadFile
 import tempfile
-from rag.rag_service import RAGService
 from rag.document_processor import DocumentProcessor
+from rag.chunker import TextChunker
+from rag.embedding_worker import EmbeddingBatcher
+from rag.cache import LRUCache
+from rag.document_store import SearchFilter
+from rag.fusion import reciprocal_rank_fusion
+from rag.context_builder import ContextBuilder
+from rag.chunker import content_hash
 from supabase_client import supabase
+from page_writer import BulkPageWriter
+import config
+import metrics
 import logging
 import uuid
 
+try:
+    import fcntl
+except ImportError:  # Windows: bez zaključavanja, tamo se pokreće samo jedan proces
+    fcntl = None
+
 # Konfiguracija logovanja
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# "vector": samo FAISS; "hybrid": FAISS i BM25 (SQLite FTS5) paralelno, spojeni sa RRF
+RETRIEVAL_MODES = ("vector", "hybrid")
+
 class RAGClient:
+    """
+    Pristup RAG indeksu iz API-ja i ingestion-a.
+
+    Konstruktor je brz; model, indeks i baza dokumenata se učitavaju u pozadini
+    posle start(), a `ready` pokazuje kada su spremni.
+    """
+
     def __init__(self):
-        self.rag_service = RAGService()
-        self.index_path = os.path.join(os.path.dirname(__file__), "data", "rag_index")
+        # Keš embedding-a upita i keš rezultata pretrage (poništava se promenom verzije indeksa)
+        self.caches = {
+            "query_embedding": LRUCache(
+                "query_embedding", config.RAG_QUERY_CACHE_SIZE, config.RAG_CACHE_TTL_SECONDS,
+                on_lookup=self._record_cache
+            ),
+            "retrieval": LRUCache(
+                "retrieval", config.RAG_RESULT_CACHE_SIZE, config.RAG_CACHE_TTL_SECONDS,
+                on_lookup=self._record_cache
+            ),
+        }
+        self.index_path = config.RAG_INDEX_DIR
         self.temp_dir = os.path.join(os.path.dirname(__file__), "data", "temp")
         os.makedirs(self.temp_dir, exist_ok=True)
-        self._load_or_create_index()
+        self.chunker = TextChunker(
+            chunk_tokens=config.CHUNK_TOKENS,
+            overlap_tokens=config.CHUNK_OVERLAP_TOKENS,
+            min_chars=config.CHUNK_MIN_CHARS
+        )
+        # Kontekst za prompt: najbolji delovi bez ponovljenih rečenica, do budžeta tokena
+        self.context_builder = ContextBuilder(
+            max_tokens=config.RAG_CONTEXT_MAX_TOKENS,
+            min_passage_tokens=config.RAG_CONTEXT_MIN_PASSAGE_TOKENS
+        )
+        self._compaction: Optional[asyncio.Future] = None
+        # standalone | writer | reader (vidi config.RAG_ROLE)
+        self.role = config.RAG_ROLE
+        if self.role not in ("standalone", "writer", "reader"):
+            raise ValueError(f"Nepodržana uloga procesa: {self.role}")
+        self._writer_lock = None
+        if config.RAG_RETRIEVAL_MODE not in RETRIEVAL_MODES:
+            raise ValueError(f"Nepodržan način pretrage: {config.RAG_RETRIEVAL_MODE}")
+        # BM25 pretraga ide u svoje niti, paralelno sa embedding/FAISS niti
+        self.lexical_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rag-lexical")
+        self._watcher: Optional[asyncio.Task] = None
+        self.page_writer = BulkPageWriter(
+            supabase,
+            batch_size=config.SUPABASE_PAGE_BATCH_SIZE,
+            concurrency=config.SUPABASE_WRITE_CONCURRENCY
+        )
+        # Postavljaju se u load(), u pozadini
+        self.rag_service = None
+        self.batcher: Optional[EmbeddingBatcher] = None
+        # Opcioni keš odgovora LLM-a za slična pitanja sa istim izvorima
+        self.answer_cache = None
+        self.status = "starting"  # starting | loading | ready | failed
+        self.error: Optional[str] = None
+        self.startup_timings: Dict[str, float] = {}
+        self._loading: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        # Veličina indeksa i keševa se čita tek kada Prometheus traži metrike
+        metrics.RAG_INDEX_VECTORS.set_function(lambda: self.rag_service.index.ntotal)
+        metrics.RAG_INDEX_TOMBSTONES.set_function(lambda: self.rag_service.store.tombstones)
+        metrics.RAG_DOCUMENTS.set_function(lambda: len(self.rag_service.store))
+        metrics.CACHE_HIT_RATIO.set_function(
+            lambda: {(name,): cache.stats()["hit_ratio"] for name, cache in self.caches.items()}
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def start(self, import_seconds: Optional[float] = None):
+        """Pokreće učitavanje modela i indeksa u pozadini (poziva se pri startovanju aplikacije)"""
+        if self._loading is not None:
+            return
+        if import_seconds is not None:
+            self.startup_timings["import"] = round(import_seconds, 3)
+        self.status = "loading"
+        self._loading = asyncio.get_running_loop().create_task(self._load_in_background())
+
+    async def _load_in_background(self):
+        started = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.load)
+            self.status = "ready"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            logger.error(f"RAG servis nije učitan: {str(e)}")
+        finally:
+            self.startup_timings["background_total"] = round(time.perf_counter() - started, 3)
+            self._ready.set()
+        if self.ready and self.role == "reader":
+            self._watcher = asyncio.get_running_loop().create_task(self._watch_snapshots())
+        elif self.ready and self.role == "writer":
+            self._watcher = asyncio.get_running_loop().create_task(self._publish_snapshots())
+        if self.ready:
+            breakdown = ", ".join(f"{name}={seconds}s" for name, seconds in self.startup_timings.items())
+            logger.info(f"RAG servis spreman: {breakdown}")
+
+    def load(self):
+        """Učitava model, indeks i bazu dokumenata (blokirajuće) i beleži trajanje svakog koraka"""
+        step = time.perf_counter()
+
+        def record(name: str):
+            nonlocal step
+            now = time.perf_counter()
+            self.startup_timings[name] = round(now - step, 3)
+            step = now
+
+        # Uvoz torch/sentence-transformers i faiss je sam po sebi spor
+        from rag.rag_service import RAGService
+        from rag.answer_cache import SemanticAnswerCache
+        record("rag_import")
+
+        reader = self.role == "reader"
+        if not reader:
+            self._acquire_writer_lock()
+        rag_service = RAGService(
+            metric=config.RAG_METRIC,
+            score_threshold=config.RAG_SCORE_THRESHOLD,
+            ann_index_type=config.RAG_ANN_INDEX_TYPE,
+            ann_promotion_threshold=config.RAG_ANN_PROMOTION_THRESHOLD,
+            nprobe=config.RAG_NPROBE,
+            ef_search=config.RAG_EF_SEARCH,
+            vector_codec=config.RAG_VECTOR_CODEC,
+            quantize_threshold=config.RAG_QUANTIZE_THRESHOLD,
+            rerank_candidates=config.RAG_RERANK_CANDIDATES,
+            pq_m=config.RAG_PQ_M,
+            query_cache=self.caches["query_embedding"],
+            # Reader ne računa embedding-e dokumenata, pa mu keš nije potreban
+            embedding_cache_dir=None if reader else config.EMBEDDING_CACHE_DIR or None,
+            on_stage=self._record_stage
+        )
+        record("model_load")
+
+        self._load_or_create_index(rag_service)
+        self.startup_timings.update(rag_service.load_timings)
+        step = time.perf_counter()
+        if self.role == "writer":
+            # Reader procesi počinju od snapshot-a koji sadrži i ono što je bilo u WAL-u
+            # (novi snapshot samo ako takvih promena ima)
+            rag_service.checkpoint_if_needed(config.RAG_WAL_SNAPSHOT_BYTES, max_age_seconds=0)
+            record("snapshot_publish")
+
+        rag_service.warm_up()
+        record("model_warmup")
 
-    def _load_or_create_index(self):
-        """Učitava postojeći indeks ili kreira novi"""
-        if os.path.exists(self.index_path):
+        if config.ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                rag_service.model.get_sentence_embedding_dimension(),
+                max_distance=config.ANSWER_CACHE_MAX_DISTANCE,
+                max_entries=config.ANSWER_CACHE_SIZE,
+                on_lookup=self._record_cache
+            )
+            self.caches["answer"] = self.answer_cache
+        # Embedding i pretraga se izvršavaju u posebnoj niti, u mikro-batch-evima
+        self.batcher = EmbeddingBatcher(
+            rag_service,
+            max_batch_size=config.RAG_BATCH_MAX_SIZE,
+            max_wait_ms=config.RAG_BATCH_MAX_WAIT_MS,
+            on_batch=self._record_batch,
+            result_cache=self.caches["retrieval"]
+        )
+        self.rag_service = rag_service
+
+    def _acquire_writer_lock(self):
+        """Samo jedan proces sme da menja indeks; ostali moraju da rade kao reader-i"""
+        os.makedirs(self.index_path, exist_ok=True)
+        if fcntl is None:
+            return
+        lock_file = open(os.path.join(self.index_path, "writer.lock"), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise Exception("Indeks već koristi drugi proces; dodatne worker-e pokrenite sa RAG_ROLE=reader")
+        self._writer_lock = lock_file
+
+    async def _watch_snapshots(self):
+        """Reader: periodično proverava da li je writer objavio novi snapshot"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(config.RAG_RELOAD_INTERVAL_SECONDS)
+            try:
+                await loop.run_in_executor(None, self.rag_service.reload_if_changed)
+            except Exception as e:
+                # Npr. writer je u međuvremenu objavio još noviji snapshot; pokušavamo ponovo
+                logger.warning(f"Novi snapshot indeksa nije učitan: {str(e)}")
+
+    async def _publish_snapshots(self):
+        """
+        Writer: promene (upload-i i brisanja) su trajne čim su u WAL-u, a reader procesima
+        se objavljuju novim snapshot-om najkasnije RAG_SNAPSHOT_INTERVAL_SECONDS posle prve
+        od njih, pa jedan snapshot pokriva sve promene iz tog intervala
+        """
+        while True:
+            await asyncio.sleep(config.RAG_SNAPSHOT_INTERVAL_SECONDS)
             try:
-                self.rag_service.load_index(self.index_path)
+                await self.batcher.run(
+                    self.rag_service.checkpoint_if_needed, config.RAG_WAL_SNAPSHOT_BYTES,
+                    config.RAG_SNAPSHOT_INTERVAL_SECONDS
+                )
             except Exception as e:
-                logger.error(f"Greška pri učitavanju indeksa: {str(e)}")
-                os.makedirs(self.index_path, exist_ok=True)
-        else:
-            os.makedirs(self.index_path, exist_ok=True)
+                logger.error(f"Greška pri objavljivanju snapshot-a indeksa: {str(e)}")
+
+    async def wait_ready(self):
+        """Čeka kraj učitavanja; greška učitavanja se prosleđuje pozivaocu"""
+        await self._ready.wait()
+        if not self.ready:
+            raise Exception(f"RAG servis nije dostupan: {self.error}")
+
+    def startup_state(self) -> Dict[str, Any]:
+        return {"status": self.status, "error": self.error, "startup_seconds": self.startup_timings}
+
+    @staticmethod
+    def _record_batch(size: int, seconds: float, waits: List[float]):
+        metrics.EMBEDDING_BATCH_SIZE.observe(size)
+        metrics.EMBEDDING_BATCH_SECONDS.observe(seconds)
+        for wait in waits:
+            metrics.EMBEDDING_QUEUE_WAIT_SECONDS.observe(wait)
+
+    @staticmethod
+    def _record_stage(stage: str, seconds: float):
+        metrics.RAG_STAGE_SECONDS.observe(seconds, stage=stage)
+
+    def _record_cache(self, name: str, hit: bool):
+        metrics.CACHE_LOOKUPS.inc(cache=name, result="hit" if hit else "miss")
+        metrics.CACHE_ENTRIES.set(len(self.caches[name]), cache=name)
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+    async def close(self):
+        """Gasi embedding worker i zatvara fajlove indeksa"""
+        if self._loading is not None:
+            # Učitavanje u niti se ne može prekinuti; čekamo ga da bismo zatvorili fajlove
+            await asyncio.gather(self._loading, return_exceptions=True)
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+        if self.batcher is not None:
+            await self.batcher.close()
+        if self._compaction is not None:
+            # Nit kompakcije se ne može prekinuti; čekamo da zameni indeks
+            await asyncio.gather(self._compaction, return_exceptions=True)
+        self.lexical_executor.shutdown(wait=True)
+        DocumentProcessor.shutdown_pools()
+        if self.rag_service is not None:
+            self.rag_service.close()
+        if self._writer_lock is not None:
+            self._writer_lock.close()
+            self._writer_lock = None
+
+    def _load_or_create_index(self, rag_service):
+        """Učitava postojeći indeks (snapshot + WAL) ili kreira novi"""
+        try:
+            rag_service.load_index(self.index_path, read_only=self.role == "reader")
+        except Exception as e:
+            # Ne nastavljamo sa praznim indeksom: sledeći snapshot bi prepisao postojeće podatke
+            logger.error(f"Greška pri učitavanju indeksa: {str(e)}")
+            raise
+
+    def parse_document(self, file_path: str, filename: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Izvlači tekst iz fajla (blokirajuće, poziva se van event loop-a).
+
+        Vraća (strane, delove): strane se čuvaju u Supabase, delovi idu u indeks.
+        """
+        pages = []
+        documents = list(self.iter_document(file_path, filename, on_page=pages.append))
+        if not documents:
+            logger.error("Nijedan deo teksta nije uspešno procesiran")
+            raise Exception("Nije moguće izvući tekst iz dokumenta")
+        return pages, documents
+
+    def iter_document(self, file_path: str, filename: str,
+                      on_page: Optional[Callable[[Dict[str, Any]], None]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Vraća delove dokumenta čim budu izvučeni; `on_page` dobija ceo tekst svake
+        strane pre njenih delova.
+        """
+        started = time.perf_counter()
+        count = 0
+
+        def sections():
+            for section in DocumentProcessor.iter_sections(file_path, workers=config.INGEST_PDF_WORKERS):
+                # U Supabase i indeksu čuvamo ime fajla, ne putanju privremenog fajla
+                section["metadata"]["source"] = filename
+                if on_page is not None:
+                    on_page(section)
+                yield section
+
+        for doc in self.chunker.split_documents(sections()):
+            count += 1
+            yield doc
+        self._record_parse(filename, count, started)
+
+    @staticmethod
+    def _record_parse(filename: str, chunks: int, started: float):
+        file_type = os.path.splitext(filename)[1].lower().lstrip(".") or "unknown"
+        metrics.DOCUMENT_PARSE_SECONDS.observe(time.perf_counter() - started, file_type=file_type)
+        metrics.DOCUMENT_CHUNKS.inc(chunks, file_type=file_type)
+
+    @staticmethod
+    def count_pages(file_path: str) -> int:
+        """Broj strana PDF fajla (0 ako se ne zna unapred)"""
+        if os.path.splitext(file_path)[1].lower() == ".pdf":
+            return DocumentProcessor.count_pdf_pages(file_path)
+        return 0
+
+    def create_document_record(self, document_id: str, filename: str, total_pages: int, status: str):
+        """Čuva osnovne informacije o dokumentu u Supabase"""
+        document_data = {
+            "id": document_id,
+            "filename": filename,
+            "file_type": os.path.splitext(filename)[1].lower(),
+            "total_pages": total_pages,
+            "status": status
+        }
+        logger.info(f"Čuvam osnovne informacije o dokumentu: {document_data}")
+        result = supabase.table("documents").insert(document_data).execute()
+        logger.info(f"Osnovne informacije uspešno sačuvane. Result: {result}")
+
+    def update_document_record(self, document_id: str, **fields):
+        """Ažurira status (i ostala polja) dokumenta u Supabase"""
+        supabase.table("documents").update(fields).eq("id", document_id).execute()
+
+    def save_pages(self, document_id: str, pages: List[Dict[str, Any]],
+                   on_progress: Optional[Callable[[int], None]] = None):
+        """Čuva tekst stranica dokumenta u Supabase (u paketima; pri grešci briše dokument)"""
+        logger.info("Započinjem čuvanje sadržaja stranica...")
+        self.page_writer.write(document_id, pages, on_progress)
+        logger.info(f"Dokument uspešno sačuvan u Supabase sa ID: {document_id}")
+
+    def filter_new_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Izbacuje delove čiji je sadržaj već u indeksu (pre skupog embedding-a)"""
+        return self.rag_service.filter_new_documents(documents)
+
+    def add_references(self, documents: List[Dict[str, Any]]):
+        """Beleži sve delove upload-a, i one koji su već bili u indeksu (blokirajuće)"""
+        self.rag_service.add_references(documents)
+
+    async def embed_documents(self, documents: List[Dict[str, Any]]) -> np.ndarray:
+        """Računa embedding-e u niti embedding worker-a (deli je sa pretragama)"""
+        return await self.batcher.run(self.rag_service.embed_documents, documents)
+
+    async def index_documents(self, documents: List[Dict[str, Any]], embeddings: Optional[np.ndarray] = None):
+        """Dodaje dokumente u RAG indeks (WAL) i po potrebi pravi snapshot"""
+        logger.info("Dodajem dokument u RAG indeks...")
+        await self.batcher.run(self.rag_service.add_documents, documents, embeddings)
+        # Vektori su već u WAL-u; snapshot se pravi tek kada WAL dovoljno naraste (writer ga
+        # za reader procese objavljuje i periodično, vidi _publish_snapshots)
+        await self.batcher.run(self.rag_service.checkpoint_if_needed, config.RAG_WAL_SNAPSHOT_BYTES)
+        logger.info("RAG indeks uspešno sačuvan")
+
+    async def remove_document(self, document_id: str, filename: Optional[str] = None) -> int:
+        """Uklanja delove dokumenta iz pretrage; indeks se kompaktira u pozadini kada ima previše tombstone-a"""
+        removed = await self.batcher.run(self.rag_service.remove_document, document_id, filename)
+        self._schedule_compaction()
+        return removed
+
+    def _schedule_compaction(self):
+        if self._compaction is not None and not self._compaction.done():
+            return
+        if self.rag_service.tombstone_ratio() < config.RAG_COMPACT_TOMBSTONE_RATIO:
+            return
+        # Posebna nit, da bi embedding worker za to vreme nastavio sa pretragama
+        self._compaction = asyncio.get_running_loop().run_in_executor(None, self._compact)
+
+    def _compact(self):
+        try:
+            self.rag_service.compact_if_needed(config.RAG_COMPACT_TOMBSTONE_RATIO)
+        except Exception as e:
+            logger.error(f"Greška pri kompakciji indeksa: {str(e)}")
 
     async def process_document(self, file: UploadFile) -> Dict[str, Any]:
-        """Procesira uploadovani dokument"""
-        temp_file_path = os.path.join(self.temp_dir, file.filename)
+        """Procesira uploadovani dokument u celosti, unutar jednog poziva"""
+        temp_file_path = os.path.join(self.temp_dir, f"{uuid.uuid4()}_{file.filename}")
         logger.info(f"Započinjem procesiranje dokumenta: {file.filename}")
+        loop = asyncio.get_running_loop()
         
         try:
             # Čuvamo fajl u privremeni direktorijum
             logger.info("Čuvam fajl u privremeni direktorijum...")
-            content = await file.read()
-            with open(temp_file_path, 'wb') as f:
-                f.write(content)
+            with metrics.timed(metrics.INGEST_STAGE_SECONDS, "upload_read"):
+                content = await file.read()
+                with open(temp_file_path, 'wb') as f:
+                    f.write(content)
             logger.info(f"Fajl uspešno sačuvan u: {temp_file_path}")
             
             # Procesiramo dokument
             logger.info("Započinjem procesiranje dokumenta...")
-            documents = DocumentProcessor.process_file(temp_file_path)
-            logger.info(f"Dokument uspešno procesiran. Broj stranica: {len(documents)}")
+            with metrics.timed(metrics.INGEST_STAGE_SECONDS, "parse"):
+                pages, documents = await loop.run_in_executor(
+                    None, self.parse_document, temp_file_path, file.filename
+                )
+                total_pages = self.count_pages(temp_file_path) or len(pages)
+            logger.info(f"Dokument uspešno procesiran. Broj stranica: {total_pages}, delova: {len(documents)}")
+            # Generišemo UUID za dokument; delovi u indeksu ga pamte radi kasnijeg brisanja
+            document_id = str(uuid.uuid4())
+            for doc in documents:
+                doc["metadata"]["document_id"] = document_id
             
             # Čuvamo dokument u Supabase
             try:
                 logger.info("Pokušavam da sačuvam dokument u Supabase...")
-                # Generišemo UUID za dokument
-                document_id = str(uuid.uuid4())
-                
-                # Prvo čuvamo osnovne informacije o dokumentu
-                document_data = {
-                    "id": document_id,
-                    "filename": file.filename,
-                    "file_type": os.path.splitext(file.filename)[1].lower(),
-                    "total_pages": len(documents),
-                    "status": "processed"
-                }
-                
-                logger.info(f"Čuvam osnovne informacije o dokumentu: {document_data}")
-                # Čuvamo dokument u Supabase
-                result = supabase.table("documents").insert(document_data).execute()
-                logger.info(f"Osnovne informacije uspešno sačuvane. Result: {result}")
-                
-                # Čuvamo sadržaj stranica
-                logger.info("Započinjem čuvanje sadržaja stranica...")
-                for i, doc in enumerate(documents):
-                    page_data = {
-                        "id": str(uuid.uuid4()),
-                        "document_id": document_id,
-                        "page_number": i + 1,
-                        "content": doc["content"],
-                        "metadata": doc["metadata"]
-                    }
-                    page_result = supabase.table("document_pages").insert(page_data).execute()
-                    logger.info(f"Stranica {i+1} uspešno sačuvana")
-                
-                logger.info(f"Dokument uspešno sačuvan u Supabase sa ID: {document_id}")
+                with metrics.timed(metrics.INGEST_STAGE_SECONDS, "persist"):
+                    await loop.run_in_executor(
+                        None, self.create_document_record, document_id, file.filename, total_pages, "processed"
+                    )
+                    await loop.run_in_executor(None, self.save_pages, document_id, pages)
             except Exception as e:
                 logger.error(f"Greška pri čuvanju dokumenta u Supabase: {str(e)}")
                 raise
             
-            # Dodajemo u indeks
-            logger.info("Dodajem dokument u RAG indeks...")
-            self.rag_service.add_documents(documents)
-            
-            # Čuvamo indeks
-            logger.info("Čuvam RAG indeks...")
-            self.rag_service.save_index(self.index_path)
-            logger.info("RAG indeks uspešno sačuvan")
+            with metrics.timed(metrics.INGEST_STAGE_SECONDS, "index"):
+                await self.index_documents(documents)
             
             return {
                 "status": "success",
                 "message": f"Uspešno procesiran dokument: {file.filename}",
                 "documents_processed": len(documents),
+                "pages_processed": len(pages),
                 "document_id": document_id
             }
         except Exception as e:
@@ -111,23 +468,51 @@ class RAGClient:
                 os.remove(temp_file_path)
                 logger.info("Privremeni fajl obrisan")
 
-    def search_documents(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
-        """Pretražuje dokumente na osnovu upita"""
-        return self.rag_service.search(query, k)
+    async def search_documents(self, query: str, k: int = 3, mode: Optional[str] = None,
+                               search_filter: Optional[SearchFilter] = None) -> List[Dict[str, Any]]:
+        """Pretražuje dokumente na osnovu upita (opciono samo delove koji odgovaraju filteru)"""
+        return await self._retrieve(query, k, mode=mode, search_filter=search_filter)
 
-    def get_context_for_query(self, query: str, k: int = 8) -> Dict[str, Any]:
-        results = self.search_documents(query, k)
-        
-        # Filtriramo rezultate sa niskim skorom
-        filtered_results = [doc for doc in results if doc.get("score", 0) > 0.3]
-        
-        if not filtered_results:
-            return {
-                "context": "",
-                "sources": []
-            }
-        
-        context = "\n\n".join([doc["content"] for doc in filtered_results])
+    async def _retrieve(self, query: str, k: int, score_threshold: Optional[float] = None,
+                        mode: Optional[str] = None,
+                        search_filter: Optional[SearchFilter] = None) -> List[Dict[str, Any]]:
+        """
+        Vektorska ili hibridna pretraga. U hibridnoj se vektorska (sa pragom skora) i
+        leksička pretraga izvršavaju istovremeno, pa je kašnjenje blizu sporije od njih.
+        """
+        mode = mode or config.RAG_RETRIEVAL_MODE
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Nepodržan način pretrage: {mode}")
+        if mode == "vector":
+            return await self.batcher.search(query, k, score_threshold=score_threshold, search_filter=search_filter)
+        depth = max(k, config.RAG_HYBRID_CANDIDATES)
+        vector, lexical = await asyncio.gather(
+            self.batcher.search(query, depth, score_threshold=score_threshold, search_filter=search_filter),
+            asyncio.get_running_loop().run_in_executor(
+                self.lexical_executor, self.rag_service.lexical_search,
+                query, depth, config.RAG_LEXICAL_MAX_TERM_RATIO, search_filter
+            )
+        )
+        return reciprocal_rank_fusion([vector, lexical], k, rrf_k=config.RAG_RRF_K)
+
+    async def get_context_for_query(self, query: str, k: int = 8,
+                                    search_filter: Optional[SearchFilter] = None) -> Dict[str, Any]:
+        # Verzija indeksa nad kojom je kontekst nastao (za keš odgovora)
+        index_version = self.rag_service.index_version
+        # Vektorski rezultati sa niskim skorom se odbacuju već u pretrazi, prema pragu indeksa;
+        # leksički pogoci retkih termina ulaze u kontekst i bez sličnih vektora
+        filtered_results = await self._retrieve(
+            query, k, score_threshold=self.rag_service.score_threshold, search_filter=search_filter
+        )
+        with metrics.timed(metrics.RAG_STAGE_SECONDS, "context_build"):
+            built = self.context_builder.build(filtered_results)
+        used = built["documents"]
+        logger.info(
+            f"Kontekst: {len(used)} od {len(filtered_results)} delova, {built['tokens']} tokena"
+            + (" (skraćeno na budžet)" if built["truncated"] else "")
+        )
+        # Skup izvora: keširani odgovor važi samo za isti kontekst
+        source_key = frozenset(content_hash(doc["content"]) for doc in used)
         sources = [
             {
                 "filename": doc["metadata"].get("source", "Unknown"),
@@ -135,9 +520,28 @@ class RAGClient:
                 "content": doc["content"][:200] + "..." if len(doc["content"]) > 200 else doc["content"],
                 "relevance_score": round(doc.get("score", 0) * 100, 2)
             }
-            for doc in filtered_results
+            for doc in used
         ]
         return {
-            "context": context,
-            "sources": sources
-        } 
\ No newline at end of file
+            "context": built["context"],
+            "sources": sources,
+            "source_key": source_key,
+            "index_version": index_version,
+            "context_tokens": built["tokens"],
+            "context_truncated": built["truncated"]
+        }
+
+    async def lookup_answer(self, query: str, rag_result: Dict[str, Any]) -> Optional[str]:
+        """Keširan odgovor na slično pitanje sa istim izvorima, ili None"""
+        if self.answer_cache is None:
+            return None
+        embedding = await self.batcher.run(self.rag_service.embed_query, query)
+        return self.answer_cache.get(embedding, rag_result["source_key"], rag_result["index_version"])
+
+    async def remember_answer(self, query: str, rag_result: Dict[str, Any], response: str):
+        if self.answer_cache is None:
+            return
+        embedding = await self.batcher.run(self.rag_service.embed_query, query)
+        self.answer_cache.put(
+            embedding, rag_result["source_key"], response, rag_result["index_version"]
+        ) 
\ No newline at end of file
@@ -1,5 +1,5 @@
 import os
-from supabase import create_client, Client
+import threading
 from dotenv import load_dotenv
 import logging
 
@@ -12,17 +12,40 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
-logger.info(f"Učitavam Supabase konfiguraciju...")
-logger.info(f"SUPABASE_URL je postavljen: {'Da' if SUPABASE_URL else 'Ne'}")
-logger.info(f"SUPABASE_SERVICE_KEY je postavljen: {'Da' if SUPABASE_SERVICE_KEY else 'Ne'}")
+def create_supabase_client():
+    """Pravi Supabase klijenta (biblioteka se uvozi tek ovde, jer je njen import spor)"""
+    logger.info(f"Učitavam Supabase konfiguraciju...")
+    logger.info(f"SUPABASE_URL je postavljen: {'Da' if SUPABASE_URL else 'Ne'}")
+    logger.info(f"SUPABASE_SERVICE_KEY je postavljen: {'Da' if SUPABASE_SERVICE_KEY else 'Ne'}")
 
-if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
-    raise ValueError("SUPABASE_URL i SUPABASE_SERVICE_KEY moraju biti postavljeni u .env fajlu")
+    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+        raise ValueError("SUPABASE_URL i SUPABASE_SERVICE_KEY moraju biti postavljeni u .env fajlu")
 
-try:
-    logger.info("Pokušavam da inicijalizujem Supabase klijenta...")
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-    logger.info("Supabase klijent je uspešno inicijalizovan!")
-except Exception as e:
-    logger.error(f"Greška pri inicijalizaciji Supabase klijenta: {str(e)}")
-    raise 
\ No newline at end of file
+    try:
+        logger.info("Pokušavam da inicijalizujem Supabase klijenta...")
+        from supabase import create_client
+        client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+        logger.info("Supabase klijent je uspešno inicijalizovan!")
+        return client
+    except Exception as e:
+        logger.error(f"Greška pri inicijalizaciji Supabase klijenta: {str(e)}")
+        raise
+
+class _LazySupabase:
+    """Supabase klijent koji se pravi pri prvoj upotrebi, a ne pri importu modula"""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = create_supabase_client()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+supabase = _LazySupabase()
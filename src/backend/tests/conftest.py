@@ -0,0 +1,61 @@
+import importlib.util
+import os
+import sys
+import types
+import zlib
+import pytest
+
+# Moduli backend-a se uvoze kao u aplikaciji (main.py se pokreće iz src/backend)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class FakeEncoder:
+    """Zamena za SentenceTransformer: vektor teksta zavisi samo od njegovog sadržaja"""
+
+    DIMENSION = 16
+
+    def __init__(self, model_name: str = ""):
+        self.model_name = model_name
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.DIMENSION
+
+    def encode(self, texts, convert_to_numpy: bool = True):
+        import numpy as np
+        return np.stack([
+            np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(self.DIMENSION)
+            for text in texts
+        ]).astype("float32")
+
+@pytest.fixture
+def make_service(monkeypatch):
+    """RAGService sa lažnim modelom (bez preuzimanja sentence-transformers modela)"""
+    pytest.importorskip("numpy")
+    pytest.importorskip("faiss")
+    if importlib.util.find_spec("sentence_transformers") is None:
+        # Model se ionako zamenjuje lažnim, pa testovi ne zavise od torch-a
+        module = types.ModuleType("sentence_transformers")
+        module.SentenceTransformer = FakeEncoder
+        monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    from rag import rag_service
+    monkeypatch.setattr(rag_service, "SentenceTransformer", FakeEncoder)
+    services = []
+
+    def make(**kwargs):
+        kwargs.setdefault("pq_m", 4)
+        service = rag_service.RAGService(**kwargs)
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.close()
+
+def make_documents(count: int, document_id: str, start: int = 0):
+    """Delovi jednog upload-a, po jedan na strani"""
+    return [
+        {
+            "content": f"{document_id} deo {i}",
+            "metadata": {"document_id": document_id, "source": f"{document_id}.pdf", "type": "pdf", "page": i + 1}
+        }
+        for i in range(start, start + count)
+    ]
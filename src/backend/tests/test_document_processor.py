@@ -0,0 +1,20 @@
+from benchmarks.synthetic_docs import write_pdf
+from rag.document_processor import DocumentProcessor
+
+def test_pdf_pages_from_shared_spawn_pool(tmp_path):
+    first, second = str(tmp_path / "a.pdf"), str(tmp_path / "b.pdf")
+    write_pdf(first, pages=20, seed=1)
+    write_pdf(second, pages=12, seed=2)
+    try:
+        pages = list(DocumentProcessor.iter_pdf_pages(first, workers=2))
+        assert pages == list(DocumentProcessor.iter_pdf_pages(first, workers=1))
+        assert [page["metadata"]["page"] for page in pages] == list(range(1, 21))
+
+        pool = DocumentProcessor._pdf_pool(2)
+        assert pool._mp_context.get_start_method() == "spawn"
+        # Drugi dokument koristi isti pul umesto novih procesa
+        assert len(list(DocumentProcessor.iter_pdf_pages(second, workers=2))) == 12
+        assert DocumentProcessor._pdf_pool(2) is pool
+    finally:
+        DocumentProcessor.shutdown_pools()
+    assert DocumentProcessor._pdf_pools == {}
@@ -0,0 +1,28 @@
+import sqlite3
+import pytest
+from conftest import make_documents
+from rag.document_store import DocumentStore, SearchFilter, MAX_FILTER_DOCUMENTS
+
+def test_filter_uses_every_document_id():
+    store = DocumentStore()
+    store.append(make_documents(2, "zzz"))
+    document_ids = [f"doc-{i:04d}" for i in range(MAX_FILTER_DOCUMENTS - 1)] + ["zzz"]
+
+    assert len(store.matching_ids(SearchFilter(document_ids=document_ids))) == 2
+
+def test_oversized_filter_is_rejected():
+    with pytest.raises(ValueError):
+        SearchFilter(document_ids=[f"doc-{i}" for i in range(MAX_FILTER_DOCUMENTS + 1)])
+
+def test_full_filter_fits_old_sqlite_parameter_limit():
+    store = DocumentStore()
+    # Granica parametara starijih SQLite verzija
+    store._conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    store.append(make_documents(2, "zzz"))
+    # Isti sadržaj u drugom upload-u je samo referenca na postojeći deo
+    store.add_references("kopija", make_documents(1, "zzz"))
+    document_ids = [f"doc-{i:04d}" for i in range(MAX_FILTER_DOCUMENTS - 1)]
+    search_filter = SearchFilter(document_ids=document_ids + ["kopija"], file_types=["pdf"], page_from=1)
+
+    assert len(store.matching_ids(search_filter)) == 1
+    assert len(store.lexical_search("zzz deo", k=5, search_filter=search_filter)) == 1
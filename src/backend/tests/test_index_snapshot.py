@@ -0,0 +1,43 @@
+import os
+import pytest
+from conftest import make_documents
+
+@pytest.mark.parametrize("index_type", ("flat", "ivf_flat", "ivf_pq", "hnsw"))
+def test_reader_loads_snapshot(make_service, tmp_path, index_type):
+    from rag import index_factory
+    path = str(tmp_path)
+    writer = make_service(ann_index_type=index_type, ann_promotion_threshold=400)
+    writer.add_documents(make_documents(400, "a"))
+    assert writer.index_type == index_type
+    writer.save_index(path)
+
+    snapshot = os.path.join(path, writer._read_meta(path)["snapshot"])
+    assert index_factory.index_type_of(index_factory.read_index(snapshot, mmap=True)) == index_type
+
+    reader = make_service(ann_index_type=index_type)
+    reader.load_index(path, read_only=True)
+    assert reader.index_type == index_type
+    assert reader.index.ntotal == 400
+    assert reader.search("a deo 12", k=3)
+
+def test_checkpoint_publishes_after_max_age(make_service, tmp_path, monkeypatch):
+    from rag import rag_service
+    path = str(tmp_path)
+    writer = make_service()
+    writer.load_index(path)
+    assert writer.checkpoint_if_needed(1 << 30, max_age_seconds=0)
+
+    now = [1000.0]
+    monkeypatch.setattr(rag_service.time, "monotonic", lambda: now[0])
+    writer.add_documents(make_documents(3, "a"))
+    writer.add_documents(make_documents(3, "b"))
+    # Promene su u WAL-u, ali se snapshot ne pravi po zahtevu
+    assert not writer.checkpoint_if_needed(1 << 30)
+    assert not writer.checkpoint_if_needed(1 << 30, max_age_seconds=5)
+    now[0] += 5
+    assert writer.checkpoint_if_needed(1 << 30, max_age_seconds=5)
+    assert not writer.checkpoint_if_needed(1 << 30, max_age_seconds=5)
+
+    reader = make_service()
+    reader.load_index(path, read_only=True)
+    assert reader.index.ntotal == 6
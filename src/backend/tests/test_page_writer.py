@@ -0,0 +1,51 @@
+import pytest
+from benchmarks.fake_services import FakeSupabase
+from page_writer import BulkPageWriter
+
+def _pages(count):
+    return [
+        {"content": f"Strana {i + 1}", "metadata": {"source": "a.pdf", "page": i + 1, "type": "pdf"}}
+        for i in range(count)
+    ]
+
+def _client():
+    client = FakeSupabase()
+    client.table("documents").insert({"id": "doc"}).execute()
+    client.requests = 0
+    return client
+
+def test_write_inserts_pages_in_batches():
+    client = _client()
+    progress = []
+    BulkPageWriter(client, batch_size=50, concurrency=4).write("doc", _pages(120), on_progress=progress.append)
+
+    pages = client.tables["document_pages"]
+    assert client.requests == 3
+    assert sorted(progress) == [20, 50, 50]
+    assert sorted(row["page_number"] for row in pages) == list(range(1, 121))
+    assert {row["document_id"] for row in pages} == {"doc"}
+    assert len({row["id"] for row in pages}) == 120
+    assert client.tables["documents"] == [{"id": "doc"}]
+
+def test_docx_pages_are_numbered_in_order():
+    client = _client()
+    documents = [{"content": f"Deo {i}", "metadata": {"source": "a.docx", "type": "docx"}} for i in range(3)]
+    BulkPageWriter(client, batch_size=2).write("doc", documents)
+    assert sorted(row["page_number"] for row in client.tables["document_pages"]) == [1, 2, 3]
+
+def test_failed_batch_rolls_back_document():
+    client = _client()
+    client.fail_on_request = 2
+    writer = BulkPageWriter(client, batch_size=50, concurrency=1)
+
+    with pytest.raises(RuntimeError, match="zahteva 2"):
+        writer.write("doc", _pages(120))
+
+    # Već upisani paketi se brišu kaskadno zajedno sa dokumentom
+    assert client.tables["documents"] == []
+    assert client.tables["document_pages"] == []
+
+def test_empty_document_sends_no_requests():
+    client = _client()
+    BulkPageWriter(client).write("doc", [])
+    assert client.requests == 0
@@ -0,0 +1,42 @@
+from benchmarks.fake_services import FakeSupabase
+from pagination import KeysetPager
+
+def _messages(timestamps):
+    client = FakeSupabase()
+    client.table("messages").insert([
+        {"content": f"poruka {i}", "sender": "user", "timestamp": timestamp}
+        for i, timestamp in enumerate(timestamps)
+    ]).execute()
+    pager = KeysetPager(client, "messages", key="timestamp",
+                        columns=("id", "content", "sender", "timestamp"), tiebreak="id")
+    return client, pager
+
+def test_page_boundary_inside_equal_timestamps():
+    # Tri poruke u istom trenutku, granica strane pada između njih
+    timestamps = ["2024-01-01T10:00:00", "2024-01-01T10:00:01.5", "2024-01-01T10:00:01.5",
+                  "2024-01-01T10:00:01.5", "2024-01-01T10:00:02"]
+    client, pager = _messages(timestamps)
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = pager.page({}, cursor, limit=2)
+        seen += [row["id"] for row in rows]
+        if cursor is None:
+            break
+
+    assert seen == [row["id"] for row in client.tables["messages"]]
+
+def test_export_does_not_skip_equal_timestamps():
+    client, pager = _messages(["2024-01-01T10:00:00+00:00"] * 5)
+
+    rows = list(pager.iter_rows({}, None, batch_size=2))
+
+    assert [row["id"] for row in rows] == [row["id"] for row in client.tables["messages"]]
+
+def test_timestamp_only_cursor_is_still_accepted():
+    _, pager = _messages(["2024-01-01T10:00:00", "2024-01-01T10:00:01"])
+
+    rows, cursor = pager.page({}, "2024-01-01T10:00:00", limit=10)
+
+    assert [row["timestamp"] for row in rows] == ["2024-01-01T10:00:01"]
+    assert cursor is None
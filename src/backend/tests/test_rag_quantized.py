@@ -0,0 +1,45 @@
+import pytest
+from conftest import make_documents
+
+@pytest.mark.parametrize("codec", ("sq8", "pq"))
+def test_hnsw_promotion_with_codes_survives_restart(make_service, tmp_path, codec):
+    path = str(tmp_path)
+    settings = dict(ann_index_type="hnsw", ann_promotion_threshold=400, vector_codec=codec, quantize_threshold=400)
+    service = make_service(**settings)
+    service.load_index(path)
+    service.add_documents(make_documents(400, "a"))
+
+    assert (service.index_type, service.index_codec) == ("hnsw", codec)
+    assert service.search("a deo 5", k=1)[0]["content"] == "a deo 5"
+
+    # Posle snapshot-a: dodavanje u istrenirani indeks ide i u WAL
+    service.save_index(path)
+    service.add_documents(make_documents(20, "b"))
+    service.close()
+
+    restarted = make_service(**settings)
+    restarted.load_index(path)
+    assert (restarted.index_type, restarted.index_codec) == ("hnsw", codec)
+    assert restarted.index.ntotal == 420
+    assert restarted.search("b deo 3", k=1)[0]["content"] == "b deo 3"
+
+def test_ivf_pq_without_float_vectors_survives_restart(make_service, tmp_path):
+    path = str(tmp_path)
+    settings = dict(ann_index_type="ivf_pq", ann_promotion_threshold=400)
+    service = make_service(**settings)
+    service.load_index(path)
+    service.add_documents(make_documents(400, "a"))
+    assert service.index_type == "ivf_pq"
+    before = service.search("a deo 5", k=1)[0]
+    service.save_index(path)
+    service.close()
+
+    restarted = make_service(**settings)
+    restarted.load_index(path)
+
+    # Tip indeksa ivf_pq nije kvantizacija sa skladištem: nema ponovnog rangiranja po praznom fajlu
+    assert restarted.vectors is None
+    after = restarted.search("a deo 5", k=1)[0]
+    assert after["content"] == before["content"]
+    assert after["score"] == pytest.approx(before["score"])
+    assert after["score"] > 0.3
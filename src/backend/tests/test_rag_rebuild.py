@@ -0,0 +1,33 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from conftest import make_documents
+
+def test_search_and_add_run_while_promotion_builds(make_service):
+    service = make_service(ann_index_type="hnsw", ann_promotion_threshold=600)
+    service.add_documents(make_documents(300, "a"))
+    building, release = threading.Event(), threading.Event()
+    build = service._build_index
+
+    def slow_build(*args, **kwargs):
+        building.set()
+        release.wait(10)
+        return build(*args, **kwargs)
+
+    service._build_index = slow_build
+    promoting = threading.Thread(target=service.add_documents, args=(make_documents(300, "b"),))
+    promoting.start()
+    try:
+        assert building.wait(10)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            # Ni pretraga ni upload ne čekaju da se novi indeks izgradi
+            results = pool.submit(service.search, "a deo 7", 1).result(timeout=5)
+            pool.submit(service.add_documents, make_documents(10, "c")).result(timeout=5)
+    finally:
+        release.set()
+        promoting.join()
+
+    assert results[0]["content"] == "a deo 7"
+    assert service.index_type == "hnsw"
+    # Delovi dodati tokom gradnje prenose se u novi indeks
+    assert service.index.ntotal == 610
+    assert service.search("c deo 3", k=1)[0]["content"] == "c deo 3"
@@ -0,0 +1,48 @@
+import pytest
+from conftest import make_documents
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+def _promoted(make_service, index_type: str, per_document: int = 300):
+    service = make_service(ann_index_type=index_type, ann_promotion_threshold=2 * per_document)
+    service.add_documents(make_documents(per_document, "a"))
+    service.add_documents(make_documents(per_document, "b"))
+    assert service.index_type == index_type
+    return service
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_filtered_search_per_index_type(make_service, index_type):
+    from rag.document_store import SearchFilter
+    service = _promoted(make_service, index_type)
+
+    results = service.search("b deo 7", k=5, search_filter=SearchFilter(document_ids=["a"]))
+
+    assert results
+    assert all(result["metadata"]["document_id"] == "a" for result in results)
+    if index_type != "ivf_pq":
+        exact = service.search("a deo 7", k=1, search_filter=SearchFilter(document_ids=["a"]))
+        assert exact[0]["content"] == "a deo 7"
+
+@pytest.mark.parametrize("index_type", ("ivf_flat", "hnsw"))
+def test_search_parameters_keep_nprobe_and_ef_search(make_service, index_type):
+    import faiss
+    from rag import index_factory
+    service = _promoted(make_service, index_type)
+    selector = faiss.IDSelectorRange(0, 10)
+
+    params = index_factory.search_parameters(service.index, selector, nprobe=4, ef_search=77)
+
+    if index_type == "hnsw":
+        assert params.efSearch == 77
+    else:
+        assert params.nprobe == min(4, faiss.extract_index_ivf(index_factory.unwrap(service.index)).nlist)
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_tombstones_do_not_crowd_out_live_results(make_service, index_type):
+    service = _promoted(make_service, index_type)
+    service.remove_document("a")
+
+    results = service.search("a deo 7", k=10)
+
+    assert len(results) == 10
+    assert all(result["metadata"]["document_id"] == "b" for result in results)
@@ -73,12 +73,19 @@ export async function sendChatMessage(content: string): Promise<ApiResponse<{
 
 export async function fetchMessages(): Promise<ApiResponse<Message[]>> {
   try {
-    const response = await fetch(`${API_BASE_URL}/messages`);
-    if (!response.ok) {
-      const errorData = await response.json();
-      throw new Error(errorData.detail || 'Greška pri čitanju poruka');
-    }
-    const data = await response.json();
+    // Backend vraća poruke stranu po stranu; kursor sledeće strane je u X-Next-Cursor zaglavlju
+    const data: Message[] = [];
+    let cursor: string | null = null;
+    do {
+      const query: string = cursor ? `?after=${encodeURIComponent(cursor)}` : '';
+      const response: Response = await fetch(`${API_BASE_URL}/messages${query}`);
+      if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.detail || 'Greška pri čitanju poruka');
+      }
+      data.push(...(await response.json()));
+      cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
     return { data };
   } catch (error) {
     return {
@@ -127,12 +134,21 @@ export async function fetchDocuments(): Promise<ApiResponse<Document[]>> {
 
 export async function fetchDocumentPages(documentId: string): Promise<ApiResponse<DocumentPage[]>> {
   try {
-    const response = await fetch(`${API_BASE_URL}/document_pages/${documentId}`);
-    if (!response.ok) {
-      const errorData = await response.json();
-      throw new Error(errorData.detail || 'Greška pri dohvatanju stranica dokumenta');
-    }
-    const data = await response.json();
+    // Stranice stižu u delovima kao i poruke; kursor (broj poslednje strane) je u X-Next-Cursor zaglavlju
+    const data: DocumentPage[] = [];
+    let cursor: string | null = null;
+    do {
+      const query: string = cursor ? `?after=${encodeURIComponent(cursor)}` : '';
+      const response: Response = await fetch(
+        `${API_BASE_URL}/documents/${encodeURIComponent(documentId)}/pages${query}`
+      );
+      if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.detail || 'Greška pri dohvatanju stranica dokumenta');
+      }
+      data.push(...(await response.json()));
+      cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
     return { data };
   } catch (error) {
     return {